@@ -0,0 +1,222 @@
+import math
+import numpy as np
+
+from csr_graph import CSRGraph
+from eccentricity import split_components, component_graph
+from instrumentation import traced
+from memo import memoize
+
+# Universal constant of the Riondato-Kornaropoulos sample size bound
+RK_CONSTANT = 0.5
+
+
+def _top_k(values, k):
+    """Returns the ids of the k largest values, as a tuple in descending order."""
+    return tuple(np.argsort(-values, kind='stable')[:k].tolist())
+
+
+def _vertex_diameter_bound(csr, component):
+    """
+    Upper bound on the number of nodes of any shortest path: 2 * eccentricity + 1 of one node
+    per connected component (any two nodes are within twice its eccentricity).
+    """
+    bound = 1
+    _, roots = np.unique(component, return_index=True)
+    for root in roots:
+        bound = max(bound, 2 * int(csr.bfs(int(root)).max()) + 1)
+    return bound
+
+
+def _sample_shortest_path(csr, rng, source, target):
+    """
+    Samples one shortest path between source and target uniformly at random.
+
+    Returns:
+        list: The interior node ids of the path (without source and target).
+    """
+    dist, sigma, _ = csr.shortest_path_dag(source, target=target)
+    interior = []
+    v = target
+    while dist[v] > 1:
+        neighbors = csr.neighbors(v)
+        previous = neighbors[dist[neighbors] == dist[v] - 1]
+        weights = sigma[previous]
+        # Predecessor u is on a fraction sigma[u] / sigma[v] of the shortest paths to v
+        v = int(previous[rng.choice(len(previous), p=weights / weights.sum())])
+        interior.append(v)
+    return interior
+
+
+@traced
+@memoize(version=2)
+def approximate_betweenness(G, epsilon=0.01, delta=0.1, top_k=10, batch_size=None, patience=3, seed=42):
+    """
+    Approximates betweenness centrality by shortest-path sampling (Riondato-Kornaropoulos).
+
+    Each sample picks an ordered pair of distinct nodes uniformly at random and one of their shortest
+    paths uniformly at random; the interior nodes of the path get a hit. With
+    r = (c / epsilon^2) * (floor(log2(VD - 2)) + 1 + ln(1 / delta)) samples, where VD bounds the number
+    of nodes of a shortest path, every estimate is within epsilon of the true value with probability
+    at least 1 - delta. Samples are drawn in batches and the run stops early once the top-k ranking has
+    not changed for `patience` batches. Since the stopping point depends on the samples, the reported
+    bound splits delta over every batch where the run may stop (a union bound), so it holds with
+    probability at least 1 - delta wherever the run stops, and is slightly above epsilon after a full run.
+
+    Args:
+        G (networkx.Graph or CSRGraph): Input graph.
+        epsilon (float, optional): Target additive error, on the normalized scale. Defaults to 0.01.
+        delta (float, optional): Failure probability. Defaults to 0.1.
+        top_k (int, optional): Size of the ranking checked for early stopping. Defaults to 10.
+        batch_size (int, optional): Samples per batch. Defaults to None (1/20 of the full sample size).
+        patience (int, optional): Stable batches required to stop early. Defaults to 3.
+        seed (int, optional): Random seed. Defaults to 42.
+
+    Returns:
+        tuple: (centrality, info) where centrality maps nodes to estimates on the scale of
+               nx.betweenness_centrality(G, normalized=True), and info holds 'samples', 'max_samples',
+               'epsilon' (achieved bound valid under the early stop, same scale), 'delta' and
+               'stopped_early'.
+    """
+    csr = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+    n = csr.number_of_nodes
+    nodes = csr.ids.tolist()
+    if n <= 2:
+        return dict.fromkeys(nodes, 0.0), {'samples': 0, 'max_samples': 0, 'epsilon': 0.0,
+                                           'delta': delta, 'stopped_early': False}
+
+    component = csr.connected_components()
+    vertex_diameter = _vertex_diameter_bound(csr, component)
+    bound_term = math.floor(math.log2(max(vertex_diameter - 2, 1))) + 1 + math.log(1 / delta)
+    max_samples = math.ceil(RK_CONSTANT / epsilon ** 2 * bound_term)
+    batch_size = batch_size or max(1, max_samples // 20)
+
+    rng = np.random.default_rng(seed)
+    hits = np.zeros(n, dtype=np.float64)
+    samples = 0
+    stable_batches = 0
+    ranking = None
+    while samples < max_samples:
+        for _ in range(min(batch_size, max_samples - samples)):
+            source = int(rng.integers(n))
+            target = int(rng.integers(n - 1))
+            target += target >= source
+            samples += 1
+            if component[source] == component[target]:
+                hits[_sample_shortest_path(csr, rng, source, target)] += 1
+
+        current = _top_k(hits, top_k)
+        stable_batches = stable_batches + 1 if current == ranking else 0
+        ranking = current
+        if stable_batches >= patience:
+            break
+
+    # Ordered-pair estimates rescaled to the NetworkX normalization 1 / ((n - 1)(n - 2))
+    scale = n / (n - 2)
+    # Union bound over the batches where the run may stop
+    checks = math.ceil(max_samples / batch_size)
+    achieved = math.sqrt(RK_CONSTANT * (bound_term + math.log(checks)) / samples)
+    info = {'samples': samples, 'max_samples': max_samples, 'epsilon': achieved * scale,
+            'delta': delta, 'stopped_early': samples < max_samples}
+    return dict(zip(nodes, (hits / samples * scale).tolist())), info
+
+
+@traced
+@memoize(version=3)
+def approximate_closeness(G, epsilon=0.05, delta=0.1, top_k=10, batch_size=None, patience=3, seed=42):
+    """
+    Approximates closeness centrality by pivot sampling (Eppstein-Wang).
+
+    The average distance from each node to the rest of its component is estimated from BFS runs
+    started at randomly chosen pivots of that component. By Hoeffding's inequality and a union bound,
+    k = ln(2n / delta) / (2 epsilon^2) pivots give every average distance within epsilon * D of the
+    true one with probability at least 1 - delta, D being the component diameter. Components with at
+    most k nodes are computed exactly, from all their nodes, before any stopping check. Pivots of the
+    larger components are processed in batches and the run stops early once the top-k ranking has not
+    changed for `patience` batches. As for approximate_betweenness, the reported bound splits delta
+    over every batch where the run may stop, so it stays valid under the early stop.
+
+    Args:
+        G (networkx.Graph or CSRGraph): Input graph.
+        epsilon (float, optional): Target error on the average distance, relative to the diameter. Defaults to 0.05.
+        delta (float, optional): Failure probability. Defaults to 0.1.
+        top_k (int, optional): Size of the ranking checked for early stopping. Defaults to 10.
+        batch_size (int, optional): Pivots per batch. Defaults to None (1/20 of the full pivot count).
+        patience (int, optional): Stable batches required to stop early. Defaults to 3.
+        seed (int, optional): Random seed. Defaults to 42.
+
+    Returns:
+        tuple: (centrality, info) where centrality maps nodes to estimates on the scale of
+               nx.closeness_centrality(G), and info holds 'samples' (pivots per large component),
+               'max_samples', 'epsilon' (achieved bound on the average distance, relative to the
+               diameter, valid under the early stop), 'delta' and 'stopped_early'.
+    """
+    csr = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+    n = csr.number_of_nodes
+    nodes = csr.ids.tolist()
+    max_samples = math.ceil(math.log(2 * max(n, 1) / delta) / (2 * epsilon ** 2))
+    batch_size = batch_size or max(1, max_samples // 20)
+
+    component = csr.connected_components()
+    sizes = np.bincount(component)
+    rng = np.random.default_rng(seed)
+
+    distance_sum = np.zeros(n, dtype=np.float64)
+    pivot_count = np.zeros(n, dtype=np.int64)
+    is_pivot = np.zeros(n, dtype=bool)
+
+    # Pivots of each large component, drawn without replacement. Small components are exhausted
+    # before the stopping rule is checked, with BFS runs on their own renumbered graph, so they stay exact
+    pivot_order = {}
+    local = np.empty(n, dtype=np.int64)
+    for label, members in enumerate(split_components(component)):
+        if len(members) > max_samples:
+            pivot_order[label] = rng.permutation(members)[:max_samples]
+            continue
+        graph = component_graph(csr, members, local)
+        for pivot in range(len(members)):
+            distance_sum[members] += graph.bfs(pivot)
+        pivot_count[members] += len(members)
+        is_pivot[members] = True
+
+    def accumulate(pivots):
+        for pivot in pivots:
+            dist = csr.bfs(int(pivot))
+            reached = dist >= 0
+            distance_sum[reached] += dist[reached]
+            pivot_count[reached] += 1
+            is_pivot[pivot] = True
+
+    def closeness_estimate():
+        # Average distance to the other nodes of the component, excluding a node's own BFS
+        others = pivot_count - is_pivot
+        average = np.divide(distance_sum, others, out=np.zeros(n), where=others > 0)
+        reachable = sizes[component] - 1
+        return np.divide(1.0, average, out=np.zeros(n), where=average > 0) * reachable / max(n - 1, 1)
+
+    estimate = closeness_estimate()
+
+    samples = 0
+    stable_batches = 0
+    ranking = None
+    while pivot_order:
+        batch = np.concatenate([pivots[samples:samples + batch_size] for pivots in pivot_order.values()])
+        if len(batch) == 0:
+            break
+        accumulate(batch)
+        samples += batch_size
+        estimate = closeness_estimate()
+
+        current = _top_k(estimate, top_k)
+        stable_batches = stable_batches + 1 if current == ranking else 0
+        ranking = current
+        if stable_batches >= patience:
+            break
+
+    samples = min(samples, max_samples) if pivot_order else 0
+    exact = not pivot_order
+    # Union bound over the batches where the run may stop
+    checks = math.ceil(max_samples / batch_size)
+    achieved = 0.0 if exact else math.sqrt(math.log(2 * max(n, 1) * checks / delta) / (2 * samples))
+    info = {'samples': samples, 'max_samples': max_samples, 'epsilon': achieved,
+            'delta': delta, 'stopped_early': samples < max_samples and not exact}
+    return dict(zip(nodes, estimate.tolist())), info
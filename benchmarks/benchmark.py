@@ -0,0 +1,325 @@
+import sys
+import os
+import io
+import gc
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.join(ROOT_DIR, 'structures'))
+from utils import load_graph_from_dataset
+from csr_graph import CSRGraph
+from graph import print_graph_metrics
+from parallel_centrality import parallel_centralities
+from group_centralities import (HOUSES, group_degree_centralities, group_closeness_centralities,
+                                group_betweenness_centralities)
+from cliques import print_top_10_weighted_cliques_with_contributions
+from triades import print_top_10_weighted_triads_with_contributions
+from k_core import print_k_core_details
+from ego_net import ego_statistics
+from memo import set_memo_enabled
+
+# Graph sizes (number of nodes) of a default run
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+
+# Default result file, and relative slowdown or memory growth reported as a regression
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results.json')
+DEFAULT_TOLERANCE = 0.25
+
+# Differences below these are measurement noise, never regressions
+MIN_SECONDS = 0.05
+MIN_BYTES = 1 << 20
+
+
+def fit_got_distributions(nodes_path=None, edges_path=None):
+    """
+    Reads the empirical degree and edge weight distributions of the bundled dataset.
+
+    Returns:
+        tuple: (degrees, weights) NumPy arrays, one degree per node and one weight per edge.
+    """
+    G = load_graph_from_dataset(nodes_path, edges_path)
+    degrees = np.array([d for _, d in G.degree()], dtype=np.int64)
+    weights = np.array([w for _, _, w in G.edges(data='weight', default=1)], dtype=np.int64)
+    return degrees, weights
+
+
+def generate_got_like_graph(n, degrees, weights, seed=42):
+    """
+    Generates a reproducible weighted graph whose degree and weight distributions follow the GOT ones.
+
+    Expected degrees are drawn from the empirical degree distribution and edges from the Chung-Lu
+    model: both endpoints of each of the sum(degrees) / 2 edges are drawn with probability proportional
+    to their expected degree, then self-loops and repeated edges are dropped. Edge weights are drawn
+    from the empirical weight distribution.
+
+    Args:
+        n (int): Number of nodes.
+        degrees (numpy.ndarray): Empirical degrees, as returned by fit_got_distributions.
+        weights (numpy.ndarray): Empirical edge weights, as returned by fit_got_distributions.
+        seed (int, optional): Random seed. Defaults to 42.
+
+    Returns:
+        tuple: (nodes_df, edges_df) DataFrames in the layout of the dataset CSV files.
+    """
+    rng = np.random.default_rng(seed)
+    expected = rng.choice(degrees, size=n).astype(np.float64)
+    probabilities = expected / expected.sum()
+    m = int(round(expected.sum() / 2))
+
+    u = rng.choice(n, size=m, p=probabilities)
+    v = rng.choice(n, size=m, p=probabilities)
+    keys = np.unique(np.minimum(u, v) * n + np.maximum(u, v))
+    sources, targets = keys // n, keys % n
+    kept = sources != targets
+    sources, targets = sources[kept], targets[kept]
+
+    ids = np.char.add('C', np.arange(n).astype(str)).astype(object)
+    nodes_df = pd.DataFrame({'Id': ids, 'Label': ids})
+    edges_df = pd.DataFrame({'Source': ids[sources], 'Target': ids[targets],
+                             'Weight': rng.choice(weights, size=len(sources))})
+    return nodes_df, edges_df
+
+
+def random_groups(G, seed=42):
+    """
+    Draws one random group per house, with the size of the house, to benchmark the group centralities.
+    """
+    rng = np.random.default_rng(seed)
+    nodes = np.array(list(G), dtype=object)
+    return {name: rng.choice(nodes, size=min(len(members), len(nodes)), replace=False).tolist()
+            for name, members in HOUSES.items()}
+
+
+# Benchmarked functions: name -> (call on the context, largest graph it is run on by default).
+# The limits skip the O(n * m) analyses (all-pairs BFS) on graphs where they take hours.
+BENCHMARKS = {
+    'load_graph_from_dataset': (lambda c: load_graph_from_dataset(c['nodes_path'], c['edges_path'], use_cache=False), None),
+    'load_graph_from_dataset (snapshot)': (lambda c: load_graph_from_dataset(c['nodes_path'], c['edges_path']), None),
+    'print_graph_metrics': (lambda c: print_graph_metrics(c['graph']), 100000),
+    'degree_centrality': (lambda c: parallel_centralities(c['graph'], c['workers'], ('degree',)), None),
+    'closeness_centrality': (lambda c: parallel_centralities(c['graph'], c['workers'], ('closeness',)), 10000),
+    'betweenness_centrality': (lambda c: parallel_centralities(c['graph'], c['workers'], ('betweenness',)), 10000),
+    'eigenvector_centrality': (lambda c: parallel_centralities(c['graph'], c['workers'], ('eigenvector',)), 100000),
+    'group_degree_centrality': (lambda c: group_degree_centralities(c['csr'], c['groups']), None),
+    'group_closeness_centrality': (lambda c: group_closeness_centralities(c['csr'], c['groups']), None),
+    'group_betweenness_centrality': (lambda c: group_betweenness_centralities(c['csr'], c['groups']), 10000),
+    'cliques': (lambda c: print_top_10_weighted_cliques_with_contributions(c['graph']), 100000),
+    'triads': (lambda c: print_top_10_weighted_triads_with_contributions(c['graph']), None),
+    'k_core': (lambda c: print_k_core_details(c['graph']), None),
+    'ego': (lambda c: ego_statistics(c['csr'], n_workers=c['workers']), None),
+}
+
+
+def measure(function, context, repeat=1, memory=True):
+    """
+    Times a benchmark and measures its peak Python heap allocation.
+
+    The time is the best of `repeat` untraced runs; the peak memory comes from one more run under
+    tracemalloc, which sees NumPy buffers but not the memory of worker processes. Output printed
+    by the function is discarded.
+
+    Returns:
+        dict: 'seconds' and 'peak_bytes' (None if memory is False).
+    """
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            function(context)
+            times.append(time.perf_counter() - start)
+
+        peak = None
+        if memory:
+            gc.collect()
+            tracemalloc.start()
+            try:
+                function(context)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+    return {'seconds': min(times), 'peak_bytes': peak}
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, functions=None, repeat=1, memory=True, n_workers=None,
+                   seed=42, limits=True):
+    """
+    Runs every benchmark on GOT-like graphs of the given sizes.
+
+    Args:
+        sizes (iterable, optional): Numbers of nodes of the generated graphs. Defaults to DEFAULT_SIZES.
+        functions (iterable, optional): Names of the benchmarks to run. Defaults to None (all of BENCHMARKS).
+        repeat (int, optional): Timed runs per benchmark; the best one is kept. Defaults to 1.
+        memory (bool, optional): Whether to also measure the peak memory. Defaults to True.
+        n_workers (int, optional): Worker processes of the parallel analyses. Defaults to None (os.cpu_count()).
+        seed (int, optional): Random seed of the graph generator. Defaults to 42.
+        limits (bool, optional): Whether to skip benchmarks above their size limit. Defaults to True.
+
+    Returns:
+        dict: 'meta' (environment and parameters) and 'results', a list with one entry per benchmark
+              and size: 'function', 'nodes', 'edges', 'status' ('ok', 'skipped' or 'error'),
+              'seconds', 'peak_bytes' and, on errors, 'error'.
+    """
+    functions = list(functions or BENCHMARKS)
+    unknown = [name for name in functions if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    # Every run must compute its result, not read a memoized one
+    set_memo_enabled(False)
+    degrees, weights = fit_got_distributions()
+    results = []
+    data_dir = tempfile.mkdtemp(prefix='got-benchmark-')
+    try:
+        for n in sizes:
+            nodes_df, edges_df = generate_got_like_graph(n, degrees, weights, seed)
+            context = {'nodes_path': os.path.join(data_dir, f'nodes-{n}.csv'),
+                       'edges_path': os.path.join(data_dir, f'edges-{n}.csv'),
+                       'workers': n_workers}
+            nodes_df.to_csv(context['nodes_path'], index=False)
+            edges_df.to_csv(context['edges_path'], index=False)
+            # Writes the snapshot read by the cached load benchmark
+            context['graph'] = load_graph_from_dataset(context['nodes_path'], context['edges_path'])
+            context['csr'] = CSRGraph.from_networkx(context['graph'])
+            context['groups'] = random_groups(context['graph'], seed)
+            print(f"Graph with {n} nodes and {len(edges_df)} edges")
+
+            for name in functions:
+                function, limit = BENCHMARKS[name]
+                entry = {'function': name, 'nodes': n, 'edges': len(edges_df),
+                         'status': 'ok', 'seconds': None, 'peak_bytes': None}
+                if limits and limit is not None and n > limit:
+                    entry['status'] = 'skipped'
+                else:
+                    try:
+                        entry.update(measure(function, context, repeat, memory))
+                    except Exception as e:
+                        entry.update(status='error', error=str(e))
+                results.append(entry)
+                print(f"   {_format_entry(entry)}")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    meta = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'networkx': nx.__version__,
+        'pandas': pd.__version__,
+        'seed': seed,
+        'repeat': repeat,
+        'workers': n_workers,
+    }
+    return {'meta': meta, 'results': results}
+
+
+def _format_entry(entry):
+    if entry['status'] != 'ok':
+        return f"{entry['function']}: {entry['status']}" + (f" ({entry['error']})" if 'error' in entry else '')
+    memory = f", peak {entry['peak_bytes'] / 2 ** 20:.1f} MiB" if entry['peak_bytes'] is not None else ''
+    return f"{entry['function']}: {entry['seconds']:.3f}s{memory}"
+
+
+def compare_results(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compares two benchmark runs, matching results by function and graph size.
+
+    A result regresses when its time or peak memory grows by more than `tolerance` (relative) and by
+    more than MIN_SECONDS or MIN_BYTES (absolute), so that noise on fast benchmarks is not reported.
+
+    Args:
+        current (dict): Benchmark run, as returned by run_benchmarks.
+        baseline (dict): Stored benchmark run to compare with.
+        tolerance (float, optional): Allowed relative growth. Defaults to DEFAULT_TOLERANCE.
+
+    Returns:
+        list: One dict per result present in both runs with 'function', 'nodes', 'seconds' and
+              'baseline_seconds', 'peak_bytes' and 'baseline_peak_bytes', the 'time_ratio' and
+              'memory_ratio' (None when not measured) and 'regression' (bool).
+    """
+    previous = {(r['function'], r['nodes']): r for r in baseline['results'] if r['status'] == 'ok'}
+    comparison = []
+    for result in current['results']:
+        old = previous.get((result['function'], result['nodes']))
+        if result['status'] != 'ok' or old is None:
+            continue
+        time_ratio = result['seconds'] / old['seconds'] if old['seconds'] > 0 else None
+        regression = (time_ratio is not None and time_ratio > 1 + tolerance
+                      and result['seconds'] - old['seconds'] > MIN_SECONDS)
+
+        memory_ratio = None
+        if result['peak_bytes'] is not None and old['peak_bytes']:
+            memory_ratio = result['peak_bytes'] / old['peak_bytes']
+            regression |= memory_ratio > 1 + tolerance and result['peak_bytes'] - old['peak_bytes'] > MIN_BYTES
+
+        comparison.append({'function': result['function'], 'nodes': result['nodes'],
+                           'seconds': result['seconds'], 'baseline_seconds': old['seconds'],
+                           'peak_bytes': result['peak_bytes'], 'baseline_peak_bytes': old['peak_bytes'],
+                           'time_ratio': time_ratio, 'memory_ratio': memory_ratio, 'regression': bool(regression)})
+    return comparison
+
+
+def print_comparison(comparison):
+    """
+    Prints the comparison with the baseline, one line per result, regressions marked.
+    """
+    print("\nComparison with the baseline (time ratio, memory ratio):")
+    for row in comparison:
+        memory = f"{row['memory_ratio']:.2f}x" if row['memory_ratio'] is not None else '-'
+        timing = f"{row['time_ratio']:.2f}x" if row['time_ratio'] is not None else '-'
+        flag = "  REGRESSION" if row['regression'] else ""
+        print(f"   {row['function']} ({row['nodes']} nodes): {timing} time, {memory} memory{flag}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the analyses on GOT-like graphs of increasing size.")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated numbers of nodes (default: 1000,10000,100000,1000000).")
+    parser.add_argument('--functions', default=None,
+                        help=f"Comma-separated benchmarks to run (default: all of {', '.join(BENCHMARKS)}).")
+    parser.add_argument('--repeat', type=int, default=1, help="Timed runs per benchmark (default: 1).")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc run.")
+    parser.add_argument('--no-limits', action='store_true',
+                        help="Run the O(n * m) benchmarks on every size, however long it takes.")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes of the parallel analyses (default: number of CPUs).")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed of the graph generator (default: 42).")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="JSON file of the results (default: benchmarks/results.json).")
+    parser.add_argument('--baseline', default=None, help="JSON file of a previous run to compare with.")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Relative growth reported as a regression (default: 0.25).")
+    args = parser.parse_args()
+
+    try:
+        sizes = [int(size) for size in args.sizes.split(',') if size]
+        functions = [name.strip() for name in args.functions.split(',')] if args.functions else None
+        results = run_benchmarks(sizes, functions, repeat=args.repeat, memory=not args.no_memory,
+                                 n_workers=args.workers, seed=args.seed, limits=not args.no_limits)
+
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {len(results['results'])} results to {args.output}")
+
+        if args.baseline:
+            with open(args.baseline) as f:
+                comparison = compare_results(results, json.load(f), args.tolerance)
+            print_comparison(comparison)
+            if any(row['regression'] for row in comparison):
+                sys.exit(1)
+
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(2)
@@ -1,107 +1,204 @@
+import os
+import argparse
 import networkx as nx
 import matplotlib.pyplot as plt
 import seaborn as sns
-from utils import load_graph_from_dataset
-
-# Load the graph using the load_graph_from_dataset function
-G = load_graph_from_dataset()
-
-# Check if the graph is loaded successfully
-if G:
-    # Function to print the top 10 elements in a centrality measure
-    def print_top_10(centrality, title):
-        """
-        Prints the top 10 nodes based on their centrality measure.
-
-        Args:
-            centrality (dict): A dictionary where keys are node identifiers and values are their centrality values.
-            title (str): The title describing the centrality measure (e.g., 'Degree Centrality').
-
-        Prints:
-            The top 10 nodes with their centrality values in descending order.
-        """
-        sorted_centrality = sorted(centrality.items(), key=lambda x: x[1], reverse=True)[:10]
-        print(f"\n{title} - Top 10 Best Nodes:")
-        for i, (node, centrality_value) in enumerate(sorted_centrality, 1):
-            print(f"{i}. {G.nodes[node]['label']}: {centrality_value}")
-
-        sorted_centrality_worst = sorted(centrality.items(), key=lambda x: x[1])[:10]
-        print(f"\n{title} - Top 10 Worst Nodes:")
-        for i, (node, centrality_value) in enumerate(sorted_centrality_worst, 1):
-            print(f"{i}. {G.nodes[node]['label']}: {centrality_value}")
-
-    # Function to plot distribution for a centrality measure
-    def plot_centrality_distribution(centrality, title):
-        """
-        Plots a histogram with a kernel density estimate (KDE) for the distribution of centrality values.
-
-        Args:
-            centrality (dict): A dictionary where keys are node identifiers and values are their centrality values.
-            title (str): The title of the plot.
-
-        Displays:
-            A histogram with KDE representing the distribution of centrality values.
-        """
-        values = list(centrality.values())
-        plt.figure(figsize=(10, 6))
-        sns.histplot(values, kde=True, bins=30)
-        plt.title(f"{title} Distribution")
-        plt.xlabel("Centrality Value")
-        plt.ylabel("Frequency")
-        plt.show()
-
-    # Function to plot a heatmap-like graph visualization for a centrality measure
-    def plot_heatmap_centrality(G, centrality, title, cmap='plasma'):
-        """
-        Plots a heatmap-like visualization of the graph nodes based on a centrality measure.
-
-        Args:
-            G (networkx.Graph): The graph object.
-            centrality (dict): A dictionary where keys are node identifiers and values are their centrality values.
-            title (str): The title of the plot.
-            cmap (str, optional): The colormap to be used for node colors. Defaults to 'plasma'.
-
-        Displays:
-            A graph visualization with nodes colored based on centrality values, with a colorbar indicating the centrality values.
-        """
-        plt.figure(figsize=(12, 8))
-        node_colors = list(centrality.values())
-        pos = nx.spring_layout(G, seed=42)  # Layout for consistent positioning
-
-        # Draw the graph without labels
-        nx.draw_networkx_nodes(G, pos, node_color=node_colors, cmap=cmap, node_size=100, edgecolors="black")
-        nx.draw_networkx_edges(G, pos, edge_color="gray")
-
-        # Add colorbar explicitly to the current Axes
-        sm = plt.cm.ScalarMappable(cmap=cmap, norm=plt.Normalize(vmin=min(node_colors), vmax=max(node_colors)))
-        sm.set_array([])
-        plt.colorbar(sm, ax=plt.gca(), label="Centrality Value")  # Explicitly link to current Axes
-
-        plt.title(f"{title} Heatmap")
-        plt.show()
-
-    # Calculate and print centrality measures
-    degree_centrality = nx.degree_centrality(G)
-    closeness_centrality = nx.closeness_centrality(G)
-    betweenness_centrality = nx.betweenness_centrality(G)
-    eigenvector_centrality = nx.eigenvector_centrality(G)
-
-    # Print top 10 and plot distributions and heatmaps for each centrality measure
-    print_top_10(degree_centrality, "Degree Centrality")
-    plot_centrality_distribution(degree_centrality, "Degree Centrality")
-    plot_heatmap_centrality(G, degree_centrality, "Degree Centrality")
-
-    print_top_10(closeness_centrality, "Closeness Centrality")
-    plot_centrality_distribution(closeness_centrality, "Closeness Centrality")
-    plot_heatmap_centrality(G, closeness_centrality, "Closeness Centrality")
-
-    print_top_10(betweenness_centrality, "Betweenness Centrality")
-    plot_centrality_distribution(betweenness_centrality, "Betweenness Centrality")
-    plot_heatmap_centrality(G, betweenness_centrality, "Betweenness Centrality")
-
-    print_top_10(eigenvector_centrality, "Eigenvector Centrality")
-    plot_centrality_distribution(eigenvector_centrality, "Eigenvector Centrality")
-    plot_heatmap_centrality(G, eigenvector_centrality, "Eigenvector Centrality")
-
-else:
-    print("Error: Graph not loaded successfully.")
+from utils import load_graph_from_dataset, DATASET_DIR
+from parallel_centrality import parallel_centralities
+from approximate_centrality import approximate_betweenness, approximate_closeness
+from spectral_centrality import SpectralCentrality, load_warm_start, save_warm_start
+from rendering import show_figure, set_output_dir, render_figures, GRAPH
+from layout_cache import get_layout
+from instrumentation import traced
+
+
+@traced
+def spectral_centralities(G, weighted=False):
+    """
+    Computes eigenvector, PageRank and Katz centrality with the sparse-matrix backend, warm-started
+    from the results of the previous run stored in the dataset cache folder.
+
+    Args:
+        G (networkx.Graph): The graph object.
+        weighted (bool, optional): Whether to use the 'weight' edge attribute. Defaults to False.
+
+    Returns:
+        dict: Maps 'eigenvector', 'pagerank' and 'katz' to dicts of node -> centrality value.
+    """
+    suffix = 'weighted' if weighted else 'unweighted'
+    warm_start_path = os.path.join(DATASET_DIR, '.cache', f"spectral-warm-start-{suffix}.npz")
+    previous = load_warm_start(warm_start_path)
+
+    spectral = SpectralCentrality(G, weight='weight' if weighted else None)
+    results = {
+        'eigenvector': spectral.eigenvector(nstart=previous.get('eigenvector')),
+        'pagerank': spectral.pagerank(nstart=previous.get('pagerank')),
+    }
+    # Katz warm starts need the unnormalized fixed point
+    katz = spectral.katz(nstart=previous.get('katz'), normalized=False)
+    save_warm_start(warm_start_path, {**results, 'katz': katz})
+
+    norm = sum(value ** 2 for value in katz.values()) ** 0.5 or 1
+    results['katz'] = {node: value / norm for node, value in katz.items()}
+    print(f"Spectral centralities converged in {spectral.iterations} iterations")
+    return results
+
+
+# Function to print the top 10 elements in a centrality measure
+@traced
+def print_top_10(G, centrality, title):
+    """
+    Prints the top 10 nodes based on their centrality measure.
+
+    Args:
+        G (networkx.Graph): The graph object, used for the node labels.
+        centrality (dict): A dictionary where keys are node identifiers and values are their centrality values.
+        title (str): The title describing the centrality measure (e.g., 'Degree Centrality').
+
+    Prints:
+        The top 10 nodes with their centrality values in descending order.
+    """
+    sorted_centrality = sorted(centrality.items(), key=lambda x: x[1], reverse=True)[:10]
+    print(f"\n{title} - Top 10 Best Nodes:")
+    for i, (node, centrality_value) in enumerate(sorted_centrality, 1):
+        print(f"{i}. {G.nodes[node]['label']}: {centrality_value}")
+
+    sorted_centrality_worst = sorted(centrality.items(), key=lambda x: x[1])[:10]
+    print(f"\n{title} - Top 10 Worst Nodes:")
+    for i, (node, centrality_value) in enumerate(sorted_centrality_worst, 1):
+        print(f"{i}. {G.nodes[node]['label']}: {centrality_value}")
+
+
+# Function to plot distribution for a centrality measure
+@traced(category='render')
+def plot_centrality_distribution(centrality, title):
+    """
+    Plots a histogram with a kernel density estimate (KDE) for the distribution of centrality values.
+
+    Args:
+        centrality (dict): A dictionary where keys are node identifiers and values are their centrality values.
+        title (str): The title of the plot.
+
+    Displays:
+        A histogram with KDE representing the distribution of centrality values.
+    """
+    values = list(centrality.values())
+    plt.figure(figsize=(10, 6))
+    sns.histplot(values, kde=True, bins=30)
+    plt.title(f"{title} Distribution")
+    plt.xlabel("Centrality Value")
+    plt.ylabel("Frequency")
+    show_figure()
+
+
+# Function to plot a heatmap-like graph visualization for a centrality measure
+@traced(category='render')
+def plot_heatmap_centrality(G, centrality, title, cmap='plasma'):
+    """
+    Plots a heatmap-like visualization of the graph nodes based on a centrality measure.
+
+    Args:
+        G (networkx.Graph): The graph object.
+        centrality (dict): A dictionary where keys are node identifiers and values are their centrality values.
+        title (str): The title of the plot.
+        cmap (str, optional): The colormap to be used for node colors. Defaults to 'plasma'.
+
+    Displays:
+        A graph visualization with nodes colored based on centrality values, with a colorbar indicating the centrality values.
+    """
+    plt.figure(figsize=(12, 8))
+    node_colors = list(centrality.values())
+    pos = get_layout(G, 'spring', seed=42)  # Cached layout, shared by every heatmap
+
+    # Draw the graph without labels
+    nx.draw_networkx_nodes(G, pos, node_color=node_colors, cmap=cmap, node_size=100, edgecolors="black")
+    nx.draw_networkx_edges(G, pos, edge_color="gray")
+
+    # Add colorbar explicitly to the current Axes
+    sm = plt.cm.ScalarMappable(cmap=cmap, norm=plt.Normalize(vmin=min(node_colors), vmax=max(node_colors)))
+    sm.set_array([])
+    plt.colorbar(sm, ax=plt.gca(), label="Centrality Value")  # Explicitly link to current Axes
+
+    plt.title(f"{title} Heatmap")
+    show_figure()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Centrality measures of the Game of Thrones network.")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes for closeness and betweenness (default: number of CPUs).")
+    parser.add_argument('--approximate', action='store_true',
+                        help="Estimate closeness and betweenness by sampling instead of computing them exactly.")
+    parser.add_argument('--epsilon', type=float, default=0.01,
+                        help="Target additive error of the approximate mode (default: 0.01).")
+    parser.add_argument('--delta', type=float, default=0.1,
+                        help="Failure probability of the approximate mode (default: 0.1).")
+    parser.add_argument('--spectral', action='store_true',
+                        help="Compute eigenvector, PageRank and Katz centrality with the sparse-matrix backend.")
+    parser.add_argument('--weighted', action='store_true',
+                        help="Use edge weights in the sparse-matrix backend.")
+    parser.add_argument('--weighted-distances', action='store_true',
+                        help="Use 1/weight edge lengths in exact closeness and betweenness instead of hop counts.")
+    parser.add_argument('--output-dir', default=None,
+                        help="Write the figures to this folder instead of showing them (headless mode).")
+    parser.add_argument('--formats', default='png',
+                        help="Comma-separated figure formats of the headless mode (default: png).")
+    parser.add_argument('--render-workers', type=int, default=None,
+                        help="Worker processes rendering the figures in headless mode (default: number of CPUs).")
+    args = parser.parse_args()
+
+    # Load the graph using the load_graph_from_dataset function
+    G = load_graph_from_dataset()
+
+    # Check if the graph is loaded successfully
+    if G:
+        # The sparse-matrix backend replaces the NetworkX eigenvector centrality
+        exact_measures = ['degree', 'closeness', 'betweenness'] + ([] if args.spectral else ['eigenvector'])
+
+        if args.approximate:
+            # Exact degree and eigenvector, sampled closeness and betweenness with their error bounds
+            exact_measures = [m for m in exact_measures if m not in ('closeness', 'betweenness')]
+            centralities = parallel_centralities(G, n_workers=args.workers, measures=tuple(exact_measures))
+            centralities['closeness'], closeness_info = approximate_closeness(G, args.epsilon, args.delta)
+            centralities['betweenness'], betweenness_info = approximate_betweenness(G, args.epsilon, args.delta)
+            print(f"Approximate closeness: {closeness_info['samples']} pivots, average distance within "
+                  f"{closeness_info['epsilon']:.4f} x diameter with probability {1 - args.delta:.2f}")
+            print(f"Approximate betweenness: {betweenness_info['samples']} sampled paths, values within "
+                  f"{betweenness_info['epsilon']:.4f} with probability {1 - args.delta:.2f}")
+        else:
+            # Calculate the centrality measures concurrently
+            centralities = parallel_centralities(G, n_workers=args.workers, measures=tuple(exact_measures),
+                                                 weight='weight' if args.weighted_distances else None)
+
+        # Print top 10 and plot distributions and heatmaps for each centrality measure
+        titles = {
+            'degree': "Degree Centrality",
+            'closeness': "Closeness Centrality",
+            'betweenness': "Betweenness Centrality",
+            'eigenvector': "Eigenvector Centrality",
+        }
+        if args.spectral:
+            centralities.update(spectral_centralities(G, weighted=args.weighted))
+            titles['pagerank'] = "PageRank"
+            titles['katz'] = "Katz Centrality"
+
+        for measure, title in titles.items():
+            print_top_10(G, centralities[measure], title)
+
+        if args.output_dir:
+            # Headless mode: the figures are rendered concurrently by Agg worker processes
+            formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+            set_output_dir(args.output_dir, formats)
+            jobs = []
+            for measure, title in titles.items():
+                jobs.append(('centrality:plot_centrality_distribution', (centralities[measure], title), {}))
+                jobs.append(('centrality:plot_heatmap_centrality', (GRAPH, centralities[measure], title), {}))
+            written = render_figures(jobs, args.output_dir, formats, n_workers=args.render_workers)
+            print(f"\nWrote {sum(len(paths) for paths in written)} figure files to {args.output_dir}")
+        else:
+            for measure, title in titles.items():
+                plot_centrality_distribution(centralities[measure], title)
+                plot_heatmap_centrality(G, centralities[measure], title)
+
+    else:
+        print("Error: Graph not loaded successfully.")
@@ -0,0 +1,181 @@
+import heapq
+import numpy as np
+import pandas as pd
+
+from csr_graph import CSRGraph
+from instrumentation import traced
+
+
+def _core_number_array(csr):
+    """
+    Batagelj-Zaversnik bucket algorithm: core number of every node id in O(n + m).
+    Self-loops are ignored.
+    """
+    n = csr.number_of_nodes
+    indptr = csr.indptr.tolist()
+    indices = csr.indices.tolist()
+    rows = np.repeat(np.arange(n), np.diff(csr.indptr))
+    degree = np.bincount(rows[rows != csr.indices], minlength=n).tolist()
+
+    # Nodes sorted by degree (vert), position of each node in vert (pos) and bucket starts (start)
+    max_degree = max(degree, default=0)
+    counts = [0] * (max_degree + 1)
+    for d in degree:
+        counts[d] += 1
+    start = [0] * (max_degree + 1)
+    for d in range(1, max_degree + 1):
+        start[d] = start[d - 1] + counts[d - 1]
+    vert = [0] * n
+    pos = [0] * n
+    fill = start[:]
+    for v in range(n):
+        pos[v] = fill[degree[v]]
+        vert[pos[v]] = v
+        fill[degree[v]] += 1
+
+    for i in range(n):
+        v = vert[i]
+        dv = degree[v]
+        for j in range(indptr[v], indptr[v + 1]):
+            u = indices[j]
+            du = degree[u]
+            if du > dv:
+                # Move u to the front of its bucket, then shrink the bucket by one
+                w = vert[start[du]]
+                if u != w:
+                    pu, pw = pos[u], start[du]
+                    vert[pu], vert[pw] = w, u
+                    pos[u], pos[w] = pw, pu
+                start[du] += 1
+                degree[u] = du - 1
+    return np.array(degree, dtype=np.int64)
+
+
+@traced
+def core_numbers(G):
+    """
+    Computes the core number of every node in one bucket pass (Batagelj and Zaversnik).
+
+    The core number of a node is the largest k such that the node belongs to the k-core, the maximal
+    subgraph in which every node has degree at least k. Self-loops are ignored.
+
+    Args:
+        G (networkx.Graph or CSRGraph): Input graph.
+
+    Returns:
+        dict: Maps nodes to their core number, as nx.core_number does.
+    """
+    csr = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+    return dict(zip(csr.ids.tolist(), _core_number_array(csr).tolist()))
+
+
+@traced
+def k_core_subgraph(G, k, core=None):
+    """
+    Returns the k-core of G as a new graph, like nx.k_core, from precomputed core numbers.
+
+    Args:
+        G (networkx.Graph): Input graph.
+        k (int): The degree threshold.
+        core (dict, optional): Core numbers, as returned by core_numbers. Defaults to None (computed).
+
+    Returns:
+        networkx.Graph: The subgraph induced by the nodes with core number at least k.
+    """
+    core = core if core is not None else core_numbers(G)
+    return G.subgraph([v for v in G if core[v] >= k]).copy()
+
+
+@traced
+def shell_hierarchy(G, core=None, weight='weight'):
+    """
+    Describes every k-core and k-shell of the graph from a single core decomposition.
+
+    Args:
+        G (networkx.Graph or CSRGraph): Input graph.
+        core (dict, optional): Core numbers, as returned by core_numbers. Defaults to None (computed).
+        weight (str, optional): Edge attribute summed in the 'weight' column. Defaults to 'weight'.
+
+    Returns:
+        pandas.DataFrame: One row per k from 0 to the maximum core number, with 'shell_nodes' (nodes
+                          with core number exactly k) and the 'nodes', 'edges', total edge 'weight' and
+                          'density' of the k-core.
+    """
+    csr = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G, weight=weight)
+    if core is None:
+        core_array = _core_number_array(csr)
+    else:
+        core_array = np.array([core[node] for node in csr.ids.tolist()], dtype=np.int64)
+    max_core = int(core_array.max(initial=0))
+
+    u, v, w = csr.edge_arrays()
+    not_loop = u != v
+    # An edge belongs to the k-cores up to the smaller core number of its endpoints
+    edge_core = np.minimum(core_array[u], core_array[v])[not_loop]
+    w = w[not_loop].astype(np.float64)
+
+    shell_nodes = np.bincount(core_array, minlength=max_core + 1)
+    shell_edges = np.bincount(edge_core, minlength=max_core + 1)
+    shell_weight = np.bincount(edge_core, weights=w, minlength=max_core + 1)
+    # k-core totals: suffix sums over k
+    nodes = np.cumsum(shell_nodes[::-1])[::-1]
+    edges = np.cumsum(shell_edges[::-1])[::-1]
+    weights = np.cumsum(shell_weight[::-1])[::-1]
+    pairs = nodes * (nodes - 1) / 2
+    density = np.divide(edges, pairs, out=np.zeros(max_core + 1), where=pairs > 0)
+
+    if np.issubdtype(csr.weights.dtype, np.integer):
+        weights = weights.astype(np.int64)
+    table = pd.DataFrame({'shell_nodes': shell_nodes, 'nodes': nodes, 'edges': edges,
+                          'weight': weights, 'density': density})
+    table.index.name = 'k'
+    return table
+
+
+@traced
+def weighted_core_numbers(G, weight='weight'):
+    """
+    Computes the weighted s-core number of every node by strength peeling.
+
+    The s-core is the maximal subgraph in which every node has strength (sum of the weights of its
+    edges inside the subgraph) at least s. Nodes are removed in order of their current strength with a
+    heap; the s-core number of a node is the largest current strength seen at a removal up to its own.
+    With unit weights this gives the ordinary core numbers. Self-loops are ignored.
+
+    Args:
+        G (networkx.Graph or CSRGraph): Input graph.
+        weight (str, optional): Edge attribute holding the weight. Defaults to 'weight'.
+
+    Returns:
+        dict: Maps nodes to their s-core number.
+    """
+    csr = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G, weight=weight)
+    n = csr.number_of_nodes
+    indptr = csr.indptr.tolist()
+    indices = csr.indices.tolist()
+    weights = csr.weights.tolist()
+
+    strength = [0] * n
+    for v in range(n):
+        strength[v] = sum(weights[j] for j in range(indptr[v], indptr[v + 1]) if indices[j] != v)
+
+    heap = [(s, v) for v, s in enumerate(strength)]
+    heapq.heapify(heap)
+    removed = [False] * n
+    core = [0] * n
+    level = None
+    while heap:
+        s, v = heapq.heappop(heap)
+        # Skip stale entries left by strength updates
+        if removed[v] or s != strength[v]:
+            continue
+        removed[v] = True
+        level = s if level is None else max(level, s)
+        core[v] = level
+        for j in range(indptr[v], indptr[v + 1]):
+            u = indices[j]
+            if not removed[u] and u != v:
+                strength[u] -= weights[j]
+                heapq.heappush(heap, (strength[u], u))
+
+    return dict(zip(csr.ids.tolist(), core))
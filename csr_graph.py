@@ -0,0 +1,329 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+import networkx as nx
+
+from instrumentation import count
+
+
+class CSRGraph:
+    """
+    Compact, integer-indexed representation of an undirected weighted graph.
+
+    Node names are interned to contiguous ids 0..n-1 and adjacency is stored in
+    compressed sparse row (CSR) form: the neighbors of node v are
+    indices[indptr[v]:indptr[v + 1]], sorted by id, with the matching edge weights in
+    weights[indptr[v]:indptr[v + 1]]. Every undirected edge appears in both rows.
+
+    Attributes:
+        ids (numpy.ndarray): Node names (object array), indexed by node id.
+        labels (numpy.ndarray): Node 'label' attributes (object array), indexed by node id.
+        indptr (numpy.ndarray): Row offsets, length n + 1.
+        indices (numpy.ndarray): Neighbor ids, length 2m (m self-loops count once).
+        weights (numpy.ndarray): Edge weights aligned with indices.
+    """
+
+    def __init__(self, ids, labels, indptr, indices, weights):
+        self.ids = np.asarray(ids, dtype=object)
+        self.labels = np.asarray(labels, dtype=object)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32 if len(self.ids) < 2**31 else np.int64)
+        self.weights = np.asarray(weights)
+        self._index = None
+
+    @classmethod
+    def from_edges(cls, ids, labels, sources, targets, weights):
+        """
+        Builds the CSR arrays from an undirected edge list given as node ids.
+        Duplicate edges keep the last weight, as nx.Graph.add_edge does.
+
+        Args:
+            ids (list): Node names, indexed by node id.
+            labels (list): Node labels, indexed by node id.
+            sources (numpy.ndarray): Source node id of each edge.
+            targets (numpy.ndarray): Target node id of each edge.
+            weights (numpy.ndarray): Weight of each edge.
+
+        Returns:
+            CSRGraph: The compact graph.
+        """
+        n = len(ids)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        weights = np.asarray(weights)
+
+        # Canonical (low, high) pairs; keep the last occurrence of duplicated edges
+        low, high = np.minimum(sources, targets), np.maximum(sources, targets)
+        keys = low * n + high
+        _, last = np.unique(keys[::-1], return_index=True)
+        keep = np.sort(len(keys) - 1 - last)
+        low, high, weights = low[keep], high[keep], weights[keep]
+
+        # Store both directions, self-loops only once
+        loops = low == high
+        rows = np.concatenate([low, high[~loops]])
+        cols = np.concatenate([high, low[~loops]])
+        vals = np.concatenate([weights, weights[~loops]])
+
+        order = np.lexsort((cols, rows))
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        return cls(ids, labels, indptr, cols[order], vals[order])
+
+    @classmethod
+    def from_networkx(cls, G, weight='weight', default=1):
+        """
+        Builds the compact graph from a NetworkX graph, e.g. the output of load_graph_from_dataset.
+
+        Args:
+            G (networkx.Graph): Input graph.
+            weight (str, optional): Edge attribute holding the weight. Defaults to 'weight'.
+            default (int, optional): Weight of edges without the attribute. Defaults to 1.
+
+        Returns:
+            CSRGraph: The compact graph, with node ids following the order of G.nodes().
+        """
+        ids = list(G.nodes())
+        labels = [data.get('label') for _, data in G.nodes(data=True)]
+        index = {node: i for i, node in enumerate(ids)}
+
+        edges = list(G.edges(data=weight, default=default))
+        sources = np.fromiter((index[u] for u, _, _ in edges), dtype=np.int64, count=len(edges))
+        targets = np.fromiter((index[v] for _, v, _ in edges), dtype=np.int64, count=len(edges))
+        weights = np.array([w for _, _, w in edges]) if edges else np.zeros(0)
+
+        csr = cls.from_edges(ids, labels, sources, targets, weights)
+        csr._index = index
+        return csr
+
+    def to_networkx(self):
+        """
+        Converts the compact graph back to a NetworkX graph, e.g. for plotting.
+
+        Returns:
+            networkx.Graph: Graph with the 'label' node attribute and the 'weight' edge attribute.
+        """
+        G = nx.Graph()
+        G.add_nodes_from((node, {'label': label}) for node, label in zip(self.ids.tolist(), self.labels.tolist()))
+        u, v, w = self.edge_arrays()
+        ids = self.ids
+        G.add_weighted_edges_from(zip(ids[u].tolist(), ids[v].tolist(), w.tolist()))
+        return G
+
+    @property
+    def number_of_nodes(self):
+        return len(self.ids)
+
+    @property
+    def number_of_edges(self):
+        loops = np.count_nonzero(self.indices == np.repeat(np.arange(self.number_of_nodes), np.diff(self.indptr)))
+        return (len(self.indices) + loops) // 2
+
+    @property
+    def index(self):
+        """Maps node names to node ids."""
+        if self._index is None:
+            self._index = {node: i for i, node in enumerate(self.ids.tolist())}
+        return self._index
+
+    def node_ids(self, nodes):
+        """Returns the ids of the given node names as an int64 array; unknown names raise KeyError."""
+        index = self.index
+        return np.fromiter((index[node] for node in nodes), dtype=np.int64)
+
+    def neighbors(self, v):
+        """Returns the sorted neighbor ids of node id v."""
+        return self.indices[self.indptr[v]:self.indptr[v + 1]]
+
+    def neighbor_weights(self, v):
+        """Returns the edge weights towards the neighbors of node id v, aligned with neighbors(v)."""
+        return self.weights[self.indptr[v]:self.indptr[v + 1]]
+
+    def degree(self, v=None):
+        """Returns the degree of node id v, or the degrees of all nodes as an array."""
+        if v is None:
+            return np.diff(self.indptr)
+        return int(self.indptr[v + 1] - self.indptr[v])
+
+    def strength(self):
+        """Returns the weighted degree of every node as an array."""
+        rows = np.repeat(np.arange(self.number_of_nodes), np.diff(self.indptr))
+        strength = np.zeros(self.number_of_nodes, dtype=self.weights.dtype)
+        np.add.at(strength, rows, self.weights)
+        return strength
+
+    def edge_weight(self, u, v, default=None):
+        """
+        Looks up the weight of edge (u, v) by binary search in the sorted row of u.
+
+        Returns:
+            The edge weight, or default if u and v are not adjacent.
+        """
+        start, end = self.indptr[u], self.indptr[u + 1]
+        pos = start + np.searchsorted(self.indices[start:end], v)
+        if pos < end and self.indices[pos] == v:
+            return self.weights[pos].item()
+        return default
+
+    def edge_arrays(self):
+        """
+        Returns each undirected edge once as (u, v, weight) arrays with u <= v.
+        """
+        rows = np.repeat(np.arange(self.number_of_nodes), np.diff(self.indptr))
+        mask = rows <= self.indices
+        return rows[mask], self.indices[mask].astype(np.int64), self.weights[mask]
+
+    def expand(self, frontier):
+        """
+        Gathers the adjacency of a set of nodes in one vectorized step.
+
+        Args:
+            frontier (numpy.ndarray): Node ids.
+
+        Returns:
+            tuple: (sources, neighbors) arrays with one entry per edge leaving the frontier,
+                   where sources[i] is the frontier node the edge neighbors[i] was reached from.
+        """
+        starts = self.indptr[frontier]
+        counts = self.indptr[frontier + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=self.indices.dtype)
+        sources = np.repeat(frontier, counts)
+        # Position of each gathered entry inside indices: row start plus offset within the row
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        return sources, self.indices[np.repeat(starts, counts) + offsets]
+
+    def bfs(self, source, max_depth=None):
+        """
+        Level-synchronous breadth-first search from one node.
+
+        Args:
+            source (int): Source node id.
+            max_depth (int, optional): Stop after this many levels. Defaults to None (no limit).
+
+        Returns:
+            numpy.ndarray: Hop distance of every node from the source, -1 for unreached nodes.
+        """
+        return self.multi_source_bfs([source], max_depth)
+
+    def multi_source_bfs(self, sources, max_depth=None):
+        """
+        Breadth-first search seeded at several nodes at once.
+
+        Args:
+            sources (iterable): Source node ids, all at distance 0.
+            max_depth (int, optional): Stop after this many levels. Defaults to None (no limit).
+
+        Returns:
+            numpy.ndarray: Hop distance of every node from the nearest source, -1 for unreached nodes.
+        """
+        dist = np.full(self.number_of_nodes, -1, dtype=np.int32)
+        frontier = np.unique(np.asarray(list(sources), dtype=np.int64))
+        dist[frontier] = 0
+        visited = len(frontier)
+        depth = 0
+        while len(frontier) and (max_depth is None or depth < max_depth):
+            depth += 1
+            _, reached = self.expand(frontier)
+            reached = np.unique(reached[dist[reached] < 0])
+            dist[reached] = depth
+            visited += len(reached)
+            frontier = reached.astype(np.int64)
+        count('bfs_runs')
+        count('nodes_visited', visited)
+        return dist
+
+    def shortest_path_dag(self, source, target=None):
+        """
+        Breadth-first search from one node that also counts shortest paths (Brandes' first phase).
+
+        Args:
+            source (int): Source node id.
+            target (int, optional): Stop once the level containing this node id is complete. Defaults to None.
+
+        Returns:
+            tuple: (dist, sigma, levels) where dist is the hop distance of every node (-1 if unreached),
+                   sigma the number of shortest paths from the source to every node (float64), and
+                   levels a list with, for each depth d >= 1, the (parents, children) arrays of the
+                   shortest-path DAG edges from depth d - 1 to depth d, grouped by child with the
+                   children in the order a queue-based BFS over the rows discovers them (as
+                   nx.betweenness_centrality does when the rows follow the NetworkX adjacency order).
+        """
+        n = self.number_of_nodes
+        dist = np.full(n, -1, dtype=np.int32)
+        sigma = np.zeros(n, dtype=np.float64)
+        dist[source] = 0
+        sigma[source] = 1.0
+        frontier = np.array([source], dtype=np.int64)
+        # Discovery rank of the nodes within their level
+        rank = np.zeros(n, dtype=np.int64)
+        levels = []
+        visited = 1
+        depth = 0
+        while len(frontier):
+            depth += 1
+            parents, children = self.expand(frontier)
+            new = np.flatnonzero(dist[children] < 0)
+            if len(new) == 0:
+                break
+            # New nodes in order of their first appearance, i.e. their discovery order
+            _, first = np.unique(children[new], return_index=True)
+            reached = children[new[np.sort(first)]].astype(np.int64)
+            dist[reached] = depth
+            visited += len(reached)
+            on_dag = dist[children] == depth
+            parents, children = parents[on_dag], children[on_dag].astype(np.int64)
+            rank[reached] = np.arange(len(reached))
+            order = np.argsort(rank[children], kind='stable')
+            parents, children = parents[order], children[order]
+            starts = np.flatnonzero(np.r_[True, children[1:] != children[:-1]])
+            sigma[children[starts]] = np.add.reduceat(sigma[parents], starts)
+            levels.append((parents, children))
+            if target is not None and dist[target] >= 0:
+                break
+            frontier = reached
+        count('bfs_runs')
+        count('nodes_visited', visited)
+        return dist, sigma, levels
+
+    def dependencies(self, sigma, levels):
+        """
+        Accumulates Brandes' pair dependencies backwards over a shortest-path DAG.
+
+        Children are visited from the deepest level, in reverse order within a level, and each parent
+        receives sigma[parent] * (1 + delta[child]) / sigma[child] in that order, exactly as
+        nx.betweenness_centrality accumulates them, so the results round the same way.
+
+        Args:
+            sigma (numpy.ndarray): Shortest-path counts, as returned by shortest_path_dag.
+            levels (list): DAG levels, as returned by shortest_path_dag.
+
+        Returns:
+            numpy.ndarray: delta[v] = sum over targets t of sigma_st(v) / sigma_st, for every node v.
+        """
+        n = self.number_of_nodes
+        delta = np.zeros(n, dtype=np.float64)
+        for parents, children in reversed(levels):
+            parents, children = parents[::-1], children[::-1]
+            contribution = sigma[parents] * ((1.0 + delta[children]) / sigma[children])
+            # Scatter into the parents only, in edge order, so each level costs its own size rather than n
+            np.add.at(delta, parents, contribution)
+        return delta
+
+    def connected_components(self):
+        """
+        Labels the connected components.
+
+        Returns:
+            numpy.ndarray: Component number of every node, numbered in order of their lowest node id.
+        """
+        n = self.number_of_nodes
+        # One linear traversal of the CSR arrays, instead of one length-n BFS per component
+        adjacency = sp.csr_matrix((np.ones(len(self.indices), dtype=np.int8), self.indices, self.indptr), shape=(n, n))
+        _, labels = csgraph.connected_components(adjacency, directed=False)
+        # Renumber the labels by the lowest node id of each component
+        _, first = np.unique(labels, return_index=True)
+        order = np.empty(len(first), dtype=np.int64)
+        order[np.argsort(first, kind='stable')] = np.arange(len(first))
+        return order[labels]
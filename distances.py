@@ -0,0 +1,401 @@
+import os
+import json
+import heapq
+import weakref
+import tempfile
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from csr_graph import CSRGraph
+from instrumentation import traced, count
+from memo import fingerprint
+
+# Source chunks handed out per worker, to balance uneven traversal costs
+CHUNKS_PER_WORKER = 4
+# Upper bound on the number of matrix cells read at once by the block readers
+BLOCK_CELLS = 1 << 24
+
+# Edge weight to edge length transforms: strong ties (high weights) make short distances with 'inverse'
+TRANSFORMS = {
+    'inverse': lambda weights: 1.0 / weights,
+    'identity': lambda weights: weights.astype(np.float64),
+}
+
+# Graph, edge lengths and writable matrix of the worker processes building the matrix
+_worker_csr = None
+_worker_lengths = None
+_worker_matrix = None
+# Distance matrix opened read-only by the worker processes of the readers
+_worker_distances = None
+
+
+def _remove_file(path):
+    for name in (path, f"{path}.json"):
+        try:
+            os.remove(name)
+        except OSError:
+            pass
+
+
+def _init_build_worker(csr, lengths, path, dtype):
+    """
+    Pool initializer: keeps the graph and the edge lengths (as lists, for the Dijkstra loop) and opens
+    the matrix file for writing, so every worker stores its rows directly.
+    """
+    global _worker_csr, _worker_lengths, _worker_matrix
+    n = csr.number_of_nodes
+    _worker_csr = csr
+    _worker_lengths = (csr.indptr.tolist(), csr.indices.tolist(), lengths.tolist()) if lengths is not None else None
+    _worker_matrix = np.memmap(path, dtype=dtype, mode='r+', shape=(n, n))
+
+
+def _dijkstra(indptr, indices, lengths, source, n):
+    """
+    Heap-based Dijkstra from one node over CSR lists.
+
+    Returns:
+        list: Length of the shortest path to every node, inf if unreachable.
+    """
+    dist = [float('inf')] * n
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        d, v = heapq.heappop(heap)
+        if d > dist[v]:
+            continue
+        for i in range(indptr[v], indptr[v + 1]):
+            u = indices[i]
+            length = d + lengths[i]
+            if length < dist[u]:
+                dist[u] = length
+                heapq.heappush(heap, (length, u))
+    return dist
+
+
+def _distance_chunk(sources):
+    """
+    Computes the rows of a chunk of sources (BFS hop counts, or Dijkstra lengths when the worker has
+    edge lengths) and writes them into the matrix file.
+
+    Returns:
+        int: Number of rows written.
+    """
+    csr, matrix = _worker_csr, _worker_matrix
+    n = csr.number_of_nodes
+    if np.issubdtype(matrix.dtype, np.integer):
+        unreachable = np.iinfo(matrix.dtype).max
+    else:
+        unreachable = np.inf
+
+    for source in sources:
+        if _worker_lengths is None:
+            dist = csr.bfs(source)
+            if dist.max(initial=0) >= unreachable:
+                raise ValueError(f"Hop distances do not fit in {matrix.dtype}, use a wider dtype")
+            matrix[source] = np.where(dist < 0, unreachable, dist)
+        else:
+            dist = np.array(_dijkstra(*_worker_lengths, source, n))
+            matrix[source] = np.where(np.isinf(dist), unreachable, dist)
+    matrix.flush()
+    return len(sources)
+
+
+def _init_reader_worker(distances):
+    global _worker_distances
+    _worker_distances = distances
+
+
+def _betweenness_chunk(sources):
+    """
+    Runs Brandes' accumulation for a chunk of sources over the DAGs read from the matrix.
+
+    Returns:
+        numpy.ndarray: The unnormalized betweenness contributions of these sources to every node.
+    """
+    distances = _worker_distances
+    betweenness = np.zeros(distances.n, dtype=np.float64)
+    for source in sources:
+        _, sigma, levels = distances.dag(source)
+        delta = distances.csr.dependencies(sigma, levels)
+        delta[source] = 0.0
+        betweenness += delta
+    return betweenness
+
+
+class DistanceMatrix:
+    """
+    All-pairs shortest-path lengths computed once and shared by every distance-based metric:
+    closeness, betweenness, eccentricity (radius, diameter, center, periphery), group closeness and
+    group betweenness.
+
+    Distances are hop counts (one BFS per source) or, with a weight attribute, sums of edge lengths
+    derived from the weights by a transform (one heap-based Dijkstra per source, 1/weight by default, so
+    that frequent interactions make close characters). Sources are split across worker processes, which
+    write their rows straight into a memory-mapped (n, n) matrix: uint16 hop counts (2 bytes per pair)
+    or float64 lengths (8 bytes per pair) by default, with the largest value (resp. inf) marking
+    unreachable pairs. Readers scan it in blocks of rows, so it can exceed the available memory.
+
+    Shortest-path counts are not stored: the shortest-path DAG of a source is rebuilt from its row
+    (dag), matching weighted path lengths up to the rounding of the stored dtype. A float32 matrix
+    halves the file but merges paths whose lengths differ by less than its rounding, which shifts
+    the weighted betweenness values.
+
+    Args:
+        G (networkx.Graph or CSRGraph): Input graph.
+        weight (str, optional): Edge attribute holding the weights (with a CSRGraph, any value uses its
+            weights). Defaults to None (hop counts).
+        transform (str, optional): Weight to length transform, a key of TRANSFORMS. Defaults to 'inverse'.
+        dtype (str or numpy.dtype, optional): Type of the stored distances. Defaults to None (uint16 for
+            hop counts, float64 for lengths).
+        path (str, optional): File holding the matrix; a file left by an earlier run on the same graph with
+            the same parameters is reused. Defaults to None (a temporary file removed with the object).
+        n_workers (int, optional): Worker processes. Defaults to None (os.cpu_count()).
+    """
+
+    @traced
+    def __init__(self, G, weight=None, transform='inverse', dtype=None, path=None, n_workers=None):
+        if transform not in TRANSFORMS:
+            raise ValueError(f"Unknown transform '{transform}', expected one of {', '.join(TRANSFORMS)}")
+        if isinstance(G, CSRGraph):
+            self.csr = G
+        else:
+            self.csr = CSRGraph.from_networkx(G, weight=weight or 'weight')
+        self.n = n = self.csr.number_of_nodes
+        self.weight = weight
+        self.transform = transform
+        self.dtype = np.dtype(dtype or (np.float64 if weight else np.uint16))
+        if np.issubdtype(self.dtype, np.integer):
+            if weight:
+                raise ValueError("Weighted distances need a floating-point dtype")
+            self.unreachable = np.iinfo(self.dtype).max
+        else:
+            self.unreachable = np.inf
+
+        self.lengths = None
+        if weight:
+            self.lengths = np.asarray(TRANSFORMS[transform](np.asarray(self.csr.weights, dtype=np.float64)))
+            if np.any(~(self.lengths > 0)):
+                raise ValueError("Edge lengths must be positive, check the weights and the transform")
+
+        # Directed edge list, used to rebuild the shortest-path DAG of any source
+        self._tails = np.repeat(np.arange(n, dtype=np.int64), np.diff(self.csr.indptr))
+        self._heads = self.csr.indices.astype(np.int64)
+        # Relative slack of the weighted DAG test, for the rounding of the stored lengths
+        self._tolerance = 64 * np.finfo(self.dtype).eps if self.lengths is not None else 0
+
+        self._graph_key = None
+        if path is None:
+            handle, path = tempfile.mkstemp(prefix='got-distances-', suffix='.dist')
+            os.close(handle)
+            weakref.finalize(self, _remove_file, path)
+            metadata = None
+        else:
+            self._graph_key = fingerprint(self.csr)
+            metadata = {'graph': self._graph_key, 'weight': weight, 'transform': transform,
+                        'dtype': self.dtype.str, 'nodes': n}
+        self.path = path
+
+        if metadata is None or not self._reusable(metadata):
+            self._compute(n_workers)
+            if metadata is not None:
+                with open(f"{path}.json", 'w') as f:
+                    json.dump(metadata, f)
+        self.matrix = self._open()
+
+    def _open(self):
+        # An empty file cannot be memory-mapped
+        if self.n == 0:
+            return np.zeros((0, 0), dtype=self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode='r', shape=(self.n, self.n))
+
+    def _reusable(self, metadata):
+        try:
+            with open(f"{self.path}.json") as f:
+                stored = json.load(f)
+            size = os.path.getsize(self.path)
+        except (OSError, ValueError):
+            return False
+        return stored == metadata and size == self.n * self.n * self.dtype.itemsize
+
+    def _compute(self, n_workers):
+        n = self.n
+        if n == 0:
+            return
+        # Allocates the file without writing it; every row is filled by a worker
+        np.memmap(self.path, dtype=self.dtype, mode='w+', shape=(n, n)).flush()
+
+        n_workers = max(1, min(n_workers or os.cpu_count() or 1, n or 1))
+        chunks = [chunk.tolist() for chunk in np.array_split(np.arange(n), n_workers * CHUNKS_PER_WORKER) if len(chunk)]
+        initargs = (self.csr, self.lengths, self.path, self.dtype)
+        if n_workers == 1:
+            global _worker_csr, _worker_lengths, _worker_matrix
+            _init_build_worker(*initargs)
+            for chunk in chunks:
+                _distance_chunk(chunk)
+            _worker_csr = _worker_lengths = _worker_matrix = None
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_build_worker,
+                                     initargs=initargs) as executor:
+                list(executor.map(_distance_chunk, chunks))
+        # Traversals of the worker processes, which record no counts of their own; serial BFS runs count
+        # themselves, Dijkstra runs never do
+        if self.lengths is not None:
+            count('dijkstra_runs', n)
+        elif n_workers > 1:
+            count('bfs_runs', n)
+
+    def __getstate__(self):
+        # Workers reopen the file instead of receiving a copy of the matrix
+        state = self.__dict__.copy()
+        del state['matrix']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.matrix = self._open()
+
+    def __repr__(self):
+        return f"DistanceMatrix(weight={self.weight!r}, transform={self.transform!r}, dtype={self.dtype.name!r})"
+
+    def memo_key(self):
+        """Describes the matrix in the keys of memoized results: the fingerprint of its graph and its parameters."""
+        if self._graph_key is None:
+            self._graph_key = fingerprint(self.csr)
+        return {'graph': self._graph_key, 'weight': self.weight, 'transform': self.transform,
+                'dtype': self.dtype.str}
+
+    def _convert(self, values):
+        """Converts stored distances to int64 hop counts or float64 lengths, -1 for unreachable pairs."""
+        unreachable = values == self.unreachable
+        values = values.astype(np.float64 if self.lengths is not None else np.int64)
+        values[unreachable] = -1
+        return values
+
+    def _blocks(self):
+        """Yields (start, rows) for consecutive blocks of rows of at most BLOCK_CELLS cells."""
+        rows = max(1, BLOCK_CELLS // max(self.n, 1))
+        for start in range(0, self.n, rows):
+            yield start, self._convert(np.asarray(self.matrix[start:start + rows]))
+
+    def row(self, source):
+        """
+        Returns the distances from one node id to every node (int64 hop counts or float64 lengths,
+        -1 if unreachable).
+        """
+        return self._convert(np.asarray(self.matrix[source]))
+
+    def nearest(self, sources):
+        """
+        Returns the distance from every node to the nearest of several node ids, -1 if none is reachable.
+        """
+        rows = self._convert(np.asarray(self.matrix[np.unique(sources)]))
+        unreachable = np.all(rows < 0, axis=0)
+        largest = np.inf if self.lengths is not None else np.iinfo(np.int64).max
+        dist = np.where(rows < 0, largest, rows).min(axis=0)
+        dist[unreachable] = -1
+        return dist.astype(rows.dtype)
+
+    def eccentricity(self):
+        """Returns the eccentricity of every node id within its connected component."""
+        eccentricity = np.zeros(self.n, dtype=np.float64 if self.lengths is not None else np.int64)
+        for start, rows in self._blocks():
+            eccentricity[start:start + len(rows)] = rows.max(axis=1, initial=0)
+        return eccentricity
+
+    def closeness(self):
+        """
+        Returns the closeness centrality of every node id, with the formula of nx.closeness_centrality
+        (lengths as the 'distance' attribute when weighted).
+        """
+        n = self.n
+        closeness = np.zeros(n, dtype=np.float64)
+        for start, rows in self._blocks():
+            reached = rows >= 0
+            total_distance = np.where(reached, rows, 0).sum(axis=1)
+            reachable = reached.sum(axis=1)
+            positive = total_distance > 0
+            if n > 1:
+                block = closeness[start:start + len(rows)]
+                block[positive] = (reachable[positive] - 1.0) / total_distance[positive]
+                block[positive] *= (reachable[positive] - 1.0) / (n - 1)
+        return closeness
+
+    def dag(self, source):
+        """
+        Rebuilds the shortest-path DAG of a source from its row of distances, without a traversal.
+
+        An edge (u, v) is on the DAG when d(v) = d(u) + length(u, v), up to the rounding of the stored
+        lengths. Levels group the DAG edges by the depth of their child, the number of edges of its
+        longest shortest path from the source (its hop distance when unweighted), so the parents of a
+        level always belong to earlier levels and weighted DAGs get about as many levels as BFS ones,
+        instead of one level per distinct length.
+
+        Returns:
+            tuple: (dist, sigma, levels) as returned by CSRGraph.shortest_path_dag (float64 lengths in
+                   dist when weighted), so it can be used by CSRGraph.dependencies and
+                   group_betweenness_centralities.
+        """
+        dist = self.row(source)
+        tail_distance = dist[self._tails]
+        head_distance = dist[self._heads]
+        if self.lengths is None:
+            on_dag = (tail_distance >= 0) & (head_distance == tail_distance + 1)
+        else:
+            gap = np.abs(head_distance - (tail_distance + self.lengths))
+            on_dag = (tail_distance >= 0) & (head_distance > tail_distance) & (gap <= self._tolerance * head_distance)
+        parents, children = self._tails[on_dag], self._heads[on_dag]
+        if self.lengths is None:
+            key = dist[children]
+        else:
+            # Longest-path depth over the DAG, one vectorized relaxation per depth
+            depth = np.zeros(self.n, dtype=np.int64)
+            while True:
+                deeper = depth.copy()
+                np.maximum.at(deeper, children, depth[parents] + 1)
+                if np.array_equal(deeper, depth):
+                    break
+                depth = deeper
+            key = depth[children]
+        # By depth, then by child; parents of a child stay in increasing order
+        order = np.lexsort((children, key))
+        parents, children, key = parents[order], children[order], key[order]
+        bounds = np.r_[np.flatnonzero(np.r_[True, key[1:] != key[:-1]]), len(key)] if len(key) else []
+
+        sigma = np.zeros(self.n, dtype=np.float64)
+        sigma[source] = 1.0
+        levels = []
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            level_parents, level_children = parents[lo:hi], children[lo:hi]
+            starts = np.flatnonzero(np.r_[True, level_children[1:] != level_children[:-1]])
+            sigma[level_children[starts]] = np.add.reduceat(sigma[level_parents], starts)
+            levels.append((level_parents, level_children))
+        return dist, sigma, levels
+
+    @traced
+    def betweenness(self, n_workers=None):
+        """
+        Returns the betweenness centrality of every node id, normalized as nx.betweenness_centrality
+        (lengths as the 'weight' attribute when weighted). Sources are split across worker processes
+        that read the matrix file.
+
+        Args:
+            n_workers (int, optional): Worker processes. Defaults to None (os.cpu_count()).
+        """
+        n = self.n
+        n_workers = max(1, min(n_workers or os.cpu_count() or 1, n or 1))
+        chunks = [chunk.tolist() for chunk in np.array_split(np.arange(n), n_workers * CHUNKS_PER_WORKER) if len(chunk)]
+        betweenness = np.zeros(n, dtype=np.float64)
+        if n_workers == 1:
+            global _worker_distances
+            _init_reader_worker(self)
+            for part in map(_betweenness_chunk, chunks):
+                betweenness += part
+            _worker_distances = None
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_reader_worker,
+                                     initargs=(self,)) as executor:
+                for part in executor.map(_betweenness_chunk, chunks):
+                    betweenness += part
+        if n > 2:
+            betweenness *= 1 / ((n - 1) * (n - 2))
+        return betweenness
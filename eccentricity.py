@@ -0,0 +1,179 @@
+import numpy as np
+
+from csr_graph import CSRGraph
+from distances import DistanceMatrix
+from instrumentation import traced
+
+
+def _component_extrema(csr, nodes):
+    """
+    Computes radius, diameter, center and periphery of one connected component with the
+    bounding algorithm of Takes and Kosters.
+
+    Every BFS from a node v gives its exact eccentricity e(v) and, for every other node w,
+    the bounds max(d(v, w), e(v) - d(v, w)) <= e(w) <= e(v) + d(v, w). BFS sources alternate
+    between the node with the largest upper bound and the node with the smallest lower bound.
+    A node is settled once its eccentricity is known, or once its bounds prove that it can be
+    neither in the center nor in the periphery; the loop stops when every node is settled.
+
+    Args:
+        csr (CSRGraph): The graph.
+        nodes (numpy.ndarray): Node ids of the component.
+
+    Returns:
+        dict: 'radius', 'diameter', 'center' and 'periphery' (node ids), and 'bfs_runs'.
+    """
+    size = len(nodes)
+    if size == 1:
+        return {'radius': 0, 'diameter': 0, 'center': nodes.tolist(), 'periphery': nodes.tolist(), 'bfs_runs': 0}
+
+    degree = csr.degree()[nodes]
+    lower = np.zeros(size, dtype=np.int64)
+    upper = np.full(size, size - 1, dtype=np.int64)
+    exact = np.zeros(size, dtype=bool)
+    undecided = np.ones(size, dtype=bool)
+    pick_upper = True
+    bfs_runs = 0
+
+    while undecided.any():
+        candidates = np.flatnonzero(undecided)
+        # Largest upper bound (resp. smallest lower bound), ties broken by the highest degree
+        if pick_upper:
+            key = np.lexsort((-degree[candidates], -upper[candidates]))
+        else:
+            key = np.lexsort((-degree[candidates], lower[candidates]))
+        chosen = candidates[key[0]]
+        pick_upper = not pick_upper
+
+        dist = csr.bfs(int(nodes[chosen]))[nodes].astype(np.int64)
+        bfs_runs += 1
+        eccentricity = int(dist.max())
+        lower = np.maximum(lower, np.maximum(dist, eccentricity - dist))
+        upper = np.minimum(upper, eccentricity + dist)
+        lower[chosen] = upper[chosen] = eccentricity
+
+        exact = lower == upper
+        diameter_lower = lower.max()
+        radius_upper = upper.min()
+        # Not in the periphery (e < diameter) and not in the center (e > radius)
+        irrelevant = (upper < diameter_lower) & (lower > radius_upper)
+        undecided = ~exact & ~irrelevant
+
+    radius = int(lower[exact].min())
+    diameter = int(upper[exact].max())
+    return {
+        'radius': radius,
+        'diameter': diameter,
+        'center': nodes[exact & (lower == radius)].tolist(),
+        'periphery': nodes[exact & (upper == diameter)].tolist(),
+        'bfs_runs': bfs_runs,
+    }
+
+
+@traced
+def eccentricity_summary(G):
+    """
+    Computes radius, diameter, center and periphery in a single pass, per connected component.
+
+    Args:
+        G (networkx.Graph or CSRGraph): Input graph.
+
+    Returns:
+        dict: 'connected' (bool) and 'components', a list sorted by decreasing size of dicts with
+              'nodes' (component size), 'radius', 'diameter', 'center', 'periphery' (node names) and
+              'bfs_runs'. When the graph is connected, 'radius', 'diameter', 'center' and 'periphery'
+              of the whole graph are also set at the top level.
+    """
+    csr = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+    groups = split_components(csr.connected_components())
+    if len(groups) == 1:
+        return _summary([_component_entry(csr, groups[0], _component_extrema(csr, groups[0]))])
+
+    # Each component gets its own compact graph, so its BFS runs only touch its own nodes
+    local = np.empty(csr.number_of_nodes, dtype=np.int64)
+    components = []
+    for nodes in groups:
+        extrema = _component_extrema(component_graph(csr, nodes, local), np.arange(len(nodes)))
+        extrema['center'] = nodes[extrema['center']]
+        extrema['periphery'] = nodes[extrema['periphery']]
+        components.append(_component_entry(csr, nodes, extrema))
+    return _summary(components)
+
+
+def split_components(component):
+    """
+    Groups the node ids by component label with one stable sort.
+
+    Returns:
+        list: One array of increasing node ids per component, in label order.
+    """
+    if len(component) == 0:
+        return []
+    order = np.argsort(component, kind='stable')
+    return np.split(order, np.flatnonzero(np.diff(component[order])) + 1)
+
+
+def component_graph(csr, nodes, local):
+    """
+    Builds the CSR graph of one component with its nodes renumbered 0..size-1, in time proportional
+    to its size. local is a length-n scratch array that receives the new number of every node.
+    """
+    local[nodes] = np.arange(len(nodes))
+    counts = csr.indptr[nodes + 1] - csr.indptr[nodes]
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    positions = np.repeat(csr.indptr[nodes], counts) + offsets
+    indptr = np.r_[0, np.cumsum(counts)]
+    return CSRGraph(nodes, np.full(len(nodes), None), indptr, local[csr.indices[positions]], np.ones(0))
+
+
+def _component_entry(csr, nodes, extrema):
+    """Describes one component with node names, from the node ids of its extrema."""
+    return {
+        'nodes': len(nodes),
+        'radius': extrema['radius'],
+        'diameter': extrema['diameter'],
+        'center': csr.ids[extrema['center']].tolist(),
+        'periphery': csr.ids[extrema['periphery']].tolist(),
+        'bfs_runs': extrema['bfs_runs'],
+    }
+
+
+def _summary(components):
+    """Sorts the components by decreasing size and lifts the values of a connected graph to the top level."""
+    components.sort(key=lambda c: c['nodes'], reverse=True)
+    summary = {'connected': len(components) == 1, 'components': components}
+    if summary['connected']:
+        summary.update({key: components[0][key] for key in ('radius', 'diameter', 'center', 'periphery')})
+    return summary
+
+
+@traced
+def distance_summary(G, distances):
+    """
+    Computes the same summary as eccentricity_summary from precomputed all-pairs distances,
+    without any BFS run.
+
+    Args:
+        G (networkx.Graph or CSRGraph): Input graph.
+        distances (numpy.ndarray or DistanceMatrix): (n, n) hop distances between node ids, -1 for
+            unreachable pairs, or a DistanceMatrix (whose weighted lengths give weighted radius and diameter).
+
+    Returns:
+        dict: As returned by eccentricity_summary, with 'bfs_runs' set to 0.
+    """
+    csr = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+    component = csr.connected_components()
+    if isinstance(distances, DistanceMatrix):
+        eccentricity = distances.eccentricity()
+    else:
+        # Unreachable pairs (-1) never reach the maximum, so every row gives the eccentricity in its component
+        eccentricity = distances.max(axis=1, initial=0)
+
+    components = []
+    for nodes in split_components(component):
+        ecc = eccentricity[nodes]
+        radius, diameter = ecc.min().item(), ecc.max().item()
+        extrema = {'radius': radius, 'diameter': diameter, 'center': nodes[ecc == radius],
+                   'periphery': nodes[ecc == diameter], 'bfs_runs': 0}
+        components.append(_component_entry(csr, nodes, extrema))
+    return _summary(components)
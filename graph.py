@@ -1,20 +1,32 @@
 import networkx as nx
 import matplotlib.pyplot as plt
 from utils import load_graph_from_dataset
+from eccentricity import eccentricity_summary
+from rendering import show_figure, draw_figures, GRAPH
+from layout_cache import get_layout, LARGE_GRAPH_NODES
+from instrumentation import traced
 
-def print_graph_metrics(G):
+@traced
+def print_graph_metrics(G, summary=None, avg_clustering_coef=None):
     """
     Prints general graph metrics like number of nodes, edges, density, etc.
+
+    Args:
+        G (networkx.Graph): Input graph with edge weights.
+        summary (dict, optional): Eccentricity summary, as returned by eccentricity_summary, or by
+            distance_summary over a DistanceMatrix (e.g. for weighted radius and diameter). Defaults to None (computed).
+        avg_clustering_coef (float, optional): Average clustering coefficient. Defaults to None (computed).
     """
     # Calculate and print general metrics
     num_nodes = G.number_of_nodes()
     num_edges = G.number_of_edges()
     density = nx.density(G)
-    radius = nx.radius(G) if nx.is_connected(G) else float('inf')
-    diameter = nx.diameter(G) if nx.is_connected(G) else float('inf')
-    periphery = nx.periphery(G) if nx.is_connected(G) else []
-    avg_clustering_coef = nx.average_clustering(G)
-    connectivity = nx.is_connected(G)
+    # Radius, diameter, center and periphery of every component with a few BFS runs
+    if summary is None:
+        summary = eccentricity_summary(G)
+    if avg_clustering_coef is None:
+        avg_clustering_coef = nx.average_clustering(G)
+    connectivity = summary['connected']
 
     # Calculate weighted density
     total_weight = sum(data['weight'] for _, _, data in G.edges(data=True) if 'weight' in data)
@@ -26,27 +38,36 @@ def print_graph_metrics(G):
     print(f"Number of Edges: {num_edges}")
     print(f"Density: {density}")
     print(f"Weighted Density: {weighted_density}")
-    print(f"Radius: {radius}")
-    print(f"Diameter: {diameter}")
-    print(f"Periphery: {periphery}")
+    if connectivity:
+        print(f"Radius: {summary['radius']}")
+        print(f"Diameter: {summary['diameter']}")
+        print(f"Center: {summary['center']}")
+        print(f"Periphery: {summary['periphery']}")
+    else:
+        # Radius and diameter are infinite on a disconnected graph: report them per component
+        print(f"Connected Components: {len(summary['components'])}")
+        for i, component in enumerate(summary['components'], 1):
+            print(f"Component {i} ({component['nodes']} nodes): Radius: {component['radius']}, "
+                  f"Diameter: {component['diameter']}, Center: {component['center']}, "
+                  f"Periphery: {component['periphery']}")
     print(f"Average Clustering Coefficient: {avg_clustering_coef}")
     print(f"Connectivity: {connectivity}")
 
 
+@traced(category='render')
 def plot_graph(G):
     """
     Plots the graph using multiple layouts for visualization.
     """
     layouts = ['spring', 'circular', 'kamada_kawai']
-    layout_functions = {
-        'spring': nx.spring_layout,
-        'circular': nx.circular_layout,
-        'kamada_kawai': nx.kamada_kawai_layout
-    }
+    # Kamada-Kawai needs O(n^2) memory: large graphs get the sparse stress layout instead
+    if G.number_of_nodes() > LARGE_GRAPH_NODES:
+        layouts[-1] = 'pivot_mds'
+    layout_params = {'spring': {'seed': 42, 'iterations': 50}}
 
     for layout in layouts:
         plt.figure(figsize=(14, 12))  # Increase the plot size for better spacing
-        pos = layout_functions[layout](G, seed=42, iterations=50) if layout == 'spring' else layout_functions[layout](G)
+        pos = get_layout(G, layout, **layout_params.get(layout, {}))
 
         # Draw nodes
         nx.draw_networkx_nodes(G, pos, node_size=300, node_color='skyblue', alpha=0.8)
@@ -60,8 +81,9 @@ def plot_graph(G):
 
         plt.title(f"Game of Thrones Character Relationship Graph - {layout.capitalize()} Layout", fontsize=16)
         plt.axis('off')  # Remove axis for better clarity
-        plt.show()
+        show_figure()
 
+@traced(category='render')
 def plot_edge_weight_distribution(G):
     """
     Plots the distribution of edge weights in the graph and prints the top 10 weights.
@@ -90,7 +112,7 @@ def plot_edge_weight_distribution(G):
     plt.xlabel("Weight", fontsize=14)
     plt.ylabel("Frequency", fontsize=14)
     plt.grid(axis='y', alpha=0.75)
-    plt.show()
+    show_figure()
 
 if __name__ == "__main__":
     # Load the graph using the refactored function
@@ -100,8 +122,7 @@ if __name__ == "__main__":
         # Print the general graph metrics
         print_graph_metrics(G)
 
-        # Plot the graph using different layouts
-        plot_graph(G)
-
-        # Plot the edge weight distribution
-        plot_edge_weight_distribution(G)
+        # Plot the graph using different layouts and the edge weight distribution
+        # (concurrently in headless mode)
+        draw_figures([('graph:plot_graph', (GRAPH,), {}),
+                      ('graph:plot_edge_weight_distribution', (GRAPH,), {})], G)
@@ -0,0 +1,238 @@
+import networkx as nx
+
+from triangles import triangle_counts
+from core_decomposition import core_numbers
+
+
+class IncrementalGraph:
+    """
+    Graph that keeps its statistics up to date under edge insertions, deletions and weight changes.
+
+    Degree, weighted degree (strength), per-node triangle counts, the number of triangles and of
+    connected triples (hence local clustering and transitivity) are updated from the neighborhoods of
+    the changed edge only. Core numbers follow the subcore algorithm of Sariyuce et al.: an inserted
+    or deleted edge can only change by one the core number of nodes in the subcore of its endpoints,
+    the nodes with the same core number reachable through nodes with that core number.
+
+    The initial statistics are computed once with the triangle and core decomposition engines.
+    Self-loops are not supported.
+
+    Args:
+        G (networkx.Graph): Initial graph, e.g. from load_graph_from_dataset. It is copied.
+        weight (str, optional): Edge attribute holding the weight. Defaults to 'weight'.
+    """
+
+    def __init__(self, G, weight='weight'):
+        if nx.number_of_selfloops(G):
+            raise ValueError("IncrementalGraph does not support self-loops")
+        self.G = G.copy()
+        self.weight = weight
+        self._degree = dict(self.G.degree())
+        self._strength = dict(self.G.degree(weight=weight))
+        self._triangles, self._total_triangles = triangle_counts(self.G) if len(self.G) else ({}, 0)
+        self._triples = sum(d * (d - 1) // 2 for d in self._degree.values())
+        self._core = core_numbers(self.G) if len(self.G) else {}
+
+    def _add_node(self, node):
+        if node not in self.G:
+            self.G.add_node(node)
+            self._degree[node] = 0
+            self._strength[node] = 0
+            self._triangles[node] = 0
+            self._core[node] = 0
+
+    def add_edge(self, u, v, weight=1):
+        """
+        Inserts edge (u, v), adding missing nodes; an existing edge only gets the new weight.
+        """
+        if u == v:
+            raise ValueError("IncrementalGraph does not support self-loops")
+        if self.G.has_edge(u, v):
+            self.set_weight(u, v, weight)
+            return
+        self._add_node(u)
+        self._add_node(v)
+
+        common = set(self.G[u]) & set(self.G[v])
+        for w in common:
+            self._triangles[w] += 1
+        self._triangles[u] += len(common)
+        self._triangles[v] += len(common)
+        self._total_triangles += len(common)
+        # New connected triples centered at u and at v
+        self._triples += self._degree[u] + self._degree[v]
+
+        self.G.add_edge(u, v, **{self.weight: weight})
+        self._degree[u] += 1
+        self._degree[v] += 1
+        self._strength[u] += weight
+        self._strength[v] += weight
+        self._insert_core_update(u, v)
+
+    def remove_edge(self, u, v):
+        """
+        Deletes edge (u, v); its endpoints stay in the graph.
+
+        Raises:
+            networkx.NetworkXError: If the edge is not in the graph.
+        """
+        if not self.G.has_edge(u, v):
+            raise nx.NetworkXError(f"The edge {u}-{v} is not in the graph.")
+        weight = self.G[u][v].get(self.weight, 1)
+        self.G.remove_edge(u, v)
+
+        common = set(self.G[u]) & set(self.G[v])
+        for w in common:
+            self._triangles[w] -= 1
+        self._triangles[u] -= len(common)
+        self._triangles[v] -= len(common)
+        self._total_triangles -= len(common)
+        self._degree[u] -= 1
+        self._degree[v] -= 1
+        self._triples -= self._degree[u] + self._degree[v]
+
+        self._strength[u] -= weight
+        self._strength[v] -= weight
+        self._remove_core_update(u, v)
+
+    def set_weight(self, u, v, weight):
+        """
+        Changes the weight of edge (u, v); only the strengths of u and v change.
+
+        Raises:
+            networkx.NetworkXError: If the edge is not in the graph.
+        """
+        if not self.G.has_edge(u, v):
+            raise nx.NetworkXError(f"The edge {u}-{v} is not in the graph.")
+        delta = weight - self.G[u][v].get(self.weight, 1)
+        self.G[u][v][self.weight] = weight
+        self._strength[u] += delta
+        self._strength[v] += delta
+
+    def apply_batch(self, added=(), removed=(), reweighted=()):
+        """
+        Applies a batch of edge changes, e.g. the delta of one episode: deletions first,
+        then weight changes, then insertions.
+
+        Args:
+            added (iterable, optional): (u, v, weight) edges to insert.
+            removed (iterable, optional): (u, v) edges to delete.
+            reweighted (iterable, optional): (u, v, weight) new weights of existing edges.
+        """
+        for u, v in removed:
+            self.remove_edge(u, v)
+        for u, v, weight in reweighted:
+            self.set_weight(u, v, weight)
+        for u, v, weight in added:
+            self.add_edge(u, v, weight)
+
+    def _insert_core_update(self, u, v):
+        """
+        After inserting (u, v), raises by one the core number of the nodes of the subcore of the
+        endpoint(s) with the smaller core number that keep more than K neighbors in the (K+1)-core candidates.
+        """
+        core = self._core
+        k = min(core[u], core[v])
+        roots = [r for r in (u, v) if core[r] == k]
+
+        # Subcore: nodes with core number k reachable from the roots through such nodes
+        subcore = set(roots)
+        stack = list(roots)
+        while stack:
+            w = stack.pop()
+            for x in self.G[w]:
+                if core[x] == k and x not in subcore:
+                    subcore.add(x)
+                    stack.append(x)
+
+        # Peel the candidates that cannot have more than k neighbors in the (k + 1)-core
+        support = {w: sum(1 for x in self.G[w] if core[x] >= k) for w in subcore}
+        stack = [w for w in subcore if support[w] <= k]
+        evicted = set(stack)
+        while stack:
+            w = stack.pop()
+            for x in self.G[w]:
+                if x in subcore and x not in evicted:
+                    support[x] -= 1
+                    if support[x] <= k:
+                        evicted.add(x)
+                        stack.append(x)
+
+        for w in subcore - evicted:
+            core[w] = k + 1
+
+    def _remove_core_update(self, u, v):
+        """
+        After deleting (u, v), lowers by one the core number of the nodes of the subcore of the
+        endpoint(s) with the smaller core number that are left with fewer than K neighbors in the K-core.
+        Supports are computed lazily, so only the part of the subcore that actually changes is visited.
+        """
+        core = self._core
+        k = min(core[u], core[v])
+        if k == 0:
+            return
+        support = {}
+
+        def current_support(w):
+            if w not in support:
+                support[w] = sum(1 for x in self.G[w] if core[x] >= k)
+            return support[w]
+
+        stack = [r for r in (u, v) if core[r] == k]
+        while stack:
+            w = stack.pop()
+            if core[w] != k or current_support(w) >= k:
+                continue
+            # Supports of the neighbors must count w before it leaves the k-core
+            neighbors = [x for x in self.G[w] if core[x] == k]
+            for x in neighbors:
+                current_support(x)
+            core[w] = k - 1
+            for x in neighbors:
+                support[x] -= 1
+                if support[x] < k:
+                    stack.append(x)
+
+    def degree(self):
+        """Returns the degree of every node."""
+        return dict(self._degree)
+
+    def strength(self):
+        """Returns the weighted degree of every node."""
+        return dict(self._strength)
+
+    def degree_centrality(self):
+        """Returns the degree centrality of every node, as nx.degree_centrality does."""
+        n = len(self._degree)
+        scale = 1.0 / (n - 1) if n > 1 else 1
+        return {node: d * scale for node, d in self._degree.items()}
+
+    def triangles(self):
+        """Returns the number of triangles through every node."""
+        return dict(self._triangles)
+
+    def total_triangles(self):
+        """Returns the number of triangles of the graph."""
+        return self._total_triangles
+
+    def clustering(self, node=None):
+        """
+        Returns the local clustering coefficient of a node, or of every node as a dict,
+        as nx.clustering does for unweighted graphs.
+        """
+        if node is not None:
+            d = self._degree[node]
+            return 2 * self._triangles[node] / (d * (d - 1)) if d > 1 else 0
+        return {v: self.clustering(v) for v in self._degree}
+
+    def average_clustering(self):
+        """Returns the average clustering coefficient."""
+        return sum(self.clustering().values()) / len(self._degree) if self._degree else 0
+
+    def transitivity(self):
+        """Returns the transitivity, 3 * triangles / connected triples."""
+        return 3 * self._total_triangles / self._triples if self._total_triangles else 0
+
+    def core_numbers(self):
+        """Returns the core number of every node."""
+        return dict(self._core)
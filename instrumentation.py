@@ -0,0 +1,232 @@
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+import functools
+import contextlib
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows: the peak RSS is then left out
+    resource = None
+
+# Enables tracing: the path of the trace file, or 1 for a timestamped file in the working directory
+TRACE_ENV = 'GOT_TRACE'
+# Also measures the peak traced (Python and NumPy) heap of every span, at a noticeable cost
+TRACE_MEMORY_ENV = 'GOT_TRACE_MEMORY'
+
+_enabled = False
+_memory = False
+_path = None
+_events = []
+_lock = threading.Lock()
+_local = threading.local()
+_origin = time.perf_counter_ns()
+
+
+def enable(path=None, memory=False):
+    """
+    Starts recording spans; the trace is written to path at exit (or by write_trace).
+
+    Args:
+        path (str, optional): Trace file. Defaults to None (got-trace-<time>-<pid>.json in the working directory).
+        memory (bool, optional): Whether to measure the peak heap allocation of every span with
+            tracemalloc, which slows allocation-heavy code down. Defaults to False.
+    """
+    global _enabled, _memory, _path
+    _path = path or time.strftime(f'got-trace-%Y%m%d-%H%M%S-{os.getpid()}.json')
+    _enabled = True
+    _memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    """Stops recording spans; the spans recorded so far are kept."""
+    global _enabled
+    _enabled = False
+    if _memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def is_enabled():
+    """Returns whether spans are being recorded."""
+    return _enabled
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _max_rss_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def count(name, value=1):
+    """
+    Adds value to a counter of the innermost open span (e.g. 'bfs_runs', 'nodes_visited',
+    'cliques'); counters also add up into the enclosing spans. Does nothing when tracing is off.
+    """
+    if not _enabled:
+        return
+    stack = _stack()
+    if stack:
+        counters = stack[-1]['counters']
+        counters[name] = counters.get(name, 0) + value
+
+
+@contextlib.contextmanager
+def span(name, category='analysis', **args):
+    """
+    Records the wall time, CPU time, peak RSS, peak traced memory and counters of a block of code.
+    Does nothing when tracing is off.
+
+    Args:
+        name (str): Span name shown in the trace.
+        category (str, optional): Span category, e.g. 'analysis', 'io', 'layout', 'render' or 'stage'.
+            Defaults to 'analysis'.
+        **args: Extra values stored with the span.
+    """
+    if not _enabled:
+        yield
+        return
+
+    stack = _stack()
+    frame = {'counters': {}, 'peak': 0}
+    if _memory and tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        # The enclosing spans keep the peak reached so far, since the inner span resets it
+        for outer in stack:
+            outer['peak'] = max(outer['peak'], peak)
+        tracemalloc.reset_peak()
+        frame['start_memory'] = current
+    stack.append(frame)
+    start_rss = _max_rss_kb()
+    start_cpu = time.thread_time_ns()
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter_ns() - start
+        cpu = time.thread_time_ns() - start_cpu
+        stack.pop()
+
+        event_args = dict(args)
+        event_args['cpu_ms'] = cpu / 1e6
+        end_rss = _max_rss_kb()
+        if end_rss is not None:
+            event_args['max_rss_kb'] = end_rss
+            event_args['rss_growth_kb'] = end_rss - start_rss
+        if 'start_memory' in frame and tracemalloc.is_tracing():
+            frame['peak'] = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+            event_args['peak_memory_bytes'] = frame['peak'] - frame['start_memory']
+        event_args.update(frame['counters'])
+
+        if stack:
+            parent = stack[-1]
+            parent['peak'] = max(parent['peak'], frame['peak'])
+            for key, value in frame['counters'].items():
+                parent['counters'][key] = parent['counters'].get(key, 0) + value
+
+        event = {'name': name, 'cat': category, 'ph': 'X',
+                 'ts': (start - _origin) / 1e3, 'dur': wall / 1e3,
+                 'pid': os.getpid(), 'tid': threading.get_ident(), 'args': event_args}
+        with _lock:
+            _events.append(event)
+
+
+def traced(function=None, *, name=None, category='analysis'):
+    """
+    Decorator recording every call of a function as a span (see span). When tracing is off the
+    wrapper only checks one flag before calling the function.
+
+    Args:
+        function (callable): The decorated function, when used as @traced.
+        name (str, optional): Span name. Defaults to None (the qualified function name).
+        category (str, optional): Span category. Defaults to 'analysis'.
+    """
+    def decorate(function):
+        label = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with span(label, category):
+                return function(*args, **kwargs)
+        return wrapper
+
+    return decorate(function) if function is not None else decorate
+
+
+def trace_events():
+    """Returns a copy of the spans recorded so far, as Chrome trace events."""
+    with _lock:
+        return list(_events)
+
+
+def write_trace(path=None):
+    """
+    Writes the recorded spans in the Chrome trace event format (loadable in chrome://tracing,
+    Perfetto or any JSON consumer): one complete ('X') event per span with its measurements in 'args'.
+
+    Args:
+        path (str, optional): Trace file. Defaults to None (the path given to enable or GOT_TRACE).
+
+    Returns:
+        str: The path written, or None if nothing was recorded.
+    """
+    events = trace_events()
+    path = path or _path
+    if not events or not path:
+        return None
+    trace = {
+        'traceEvents': events,
+        'displayTimeUnit': 'ms',
+        'otherData': {'command': ' '.join(sys.argv), 'pid': os.getpid(),
+                      'memory': _memory, 'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+    }
+    with open(path, 'w') as f:
+        json.dump(trace, f)
+    return path
+
+
+def summarize(events=None):
+    """
+    Aggregates spans by name.
+
+    Returns:
+        list: One dict per span name with 'name', 'category', 'calls', 'wall_ms' and 'cpu_ms' totals,
+              sorted by decreasing wall time.
+    """
+    totals = {}
+    for event in events if events is not None else trace_events():
+        entry = totals.setdefault(event['name'], {'name': event['name'], 'category': event['cat'],
+                                                  'calls': 0, 'wall_ms': 0.0, 'cpu_ms': 0.0})
+        entry['calls'] += 1
+        entry['wall_ms'] += event['dur'] / 1e3
+        entry['cpu_ms'] += event['args']['cpu_ms']
+    return sorted(totals.values(), key=lambda entry: entry['wall_ms'], reverse=True)
+
+
+def _write_at_exit():
+    # Only the process that enabled tracing writes the file, not forked workers
+    if _path and _events and _events[0]['pid'] == os.getpid():
+        write_trace()
+
+
+atexit.register(_write_at_exit)
+
+if os.environ.get(TRACE_ENV):
+    _value = os.environ[TRACE_ENV]
+    enable(None if _value == '1' else _value, memory=os.environ.get(TRACE_MEMORY_ENV, '') not in ('', '0'))
@@ -0,0 +1,202 @@
+import os
+import json
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import networkx as nx
+
+from csr_graph import CSRGraph
+from utils import DATASET_DIR, graph_fingerprint
+from instrumentation import traced, count
+
+# Layouts kept in memory, and total size of the .npz files kept on disk
+MEMORY_CACHE_SIZE = 32
+DISK_CACHE_BYTES = 256 * 1024 * 1024
+LAYOUT_CACHE_DIR = os.path.join(DATASET_DIR, '.cache', 'layouts')
+# Above this many nodes, plots use pivot_mds instead of the O(n^2) Kamada-Kawai layout
+LARGE_GRAPH_NODES = 2000
+
+_memory_cache = OrderedDict()
+
+
+def pivot_mds_layout(G, pivots=50, seed=42):
+    """
+    Computes a sparse stress layout by pivot multidimensional scaling (Brandes and Pich).
+
+    Hop distances are computed from a small set of pivots chosen by max-min sampling, double-centered
+    and projected on their two principal components. One BFS per pivot keeps the cost at
+    O(pivots * (n + m)) time and O(pivots * n) memory, where Kamada-Kawai needs O(n^2) for both.
+    Nodes unreachable from a pivot are placed one hop beyond its farthest node.
+
+    Args:
+        G (networkx.Graph): Input graph.
+        pivots (int, optional): Number of pivots. Defaults to 50.
+        seed (int, optional): Seed of the first pivot. Defaults to 42.
+
+    Returns:
+        dict: Maps nodes to (x, y) positions scaled to [-1, 1].
+    """
+    csr = CSRGraph.from_networkx(G)
+    n = csr.number_of_nodes
+    nodes = csr.ids.tolist()
+    if n <= 2:
+        return nx.circular_layout(G)
+
+    pivots = min(pivots, n)
+    rng = np.random.default_rng(seed)
+    distances = np.empty((n, pivots), dtype=np.float64)
+    nearest = np.full(n, np.inf)
+    pivot = int(rng.integers(n))
+    for i in range(pivots):
+        dist = csr.bfs(pivot).astype(np.float64)
+        dist[dist < 0] = dist.max() + 1
+        distances[:, i] = dist
+        # Next pivot: the node farthest from every pivot so far
+        nearest = np.minimum(nearest, dist)
+        pivot = int(np.argmax(nearest))
+
+    # Double centering of the squared distances, then the two leading singular vectors
+    squared = distances ** 2
+    centered = squared - squared.mean(axis=0) - squared.mean(axis=1, keepdims=True) + squared.mean()
+    centered *= -0.5
+    u, s, _ = np.linalg.svd(centered, full_matrices=False)
+    coordinates = u[:, :2] * s[:2]
+    if coordinates.shape[1] < 2:
+        coordinates = np.column_stack([coordinates, np.zeros(n)])
+
+    coordinates -= coordinates.mean(axis=0)
+    coordinates /= np.abs(coordinates).max() or 1
+    return dict(zip(nodes, coordinates))
+
+
+LAYOUT_ALGORITHMS = {
+    'spring': nx.spring_layout,
+    'circular': nx.circular_layout,
+    'kamada_kawai': nx.kamada_kawai_layout,
+    'spectral': nx.spectral_layout,
+    'forceatlas2': nx.forceatlas2_layout,
+    'pivot_mds': pivot_mds_layout,
+}
+
+
+def _cache_key(fingerprint, algorithm, params):
+    key = json.dumps({'graph': fingerprint, 'algorithm': algorithm, 'params': params}, sort_keys=True, default=repr)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _read_layout(path):
+    """Reads a cached layout file; returns (node reprs, positions) or None if it is missing or unreadable."""
+    try:
+        with np.load(path) as data:
+            layout = data['nodes'].tolist(), data['positions']
+        # Refresh the access time used by the disk eviction
+        os.utime(path)
+        return layout
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _write_layout(path, nodes, positions, max_bytes):
+    """Writes a layout file atomically, then evicts least recently used files over max_bytes."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, nodes=np.array(nodes, dtype=str), positions=positions)
+    os.replace(tmp_path, path)
+
+    entries = []
+    for name in os.listdir(os.path.dirname(path)):
+        if name.endswith('.npz') and '.tmp' not in name:
+            # Concurrent render workers may evict the same files
+            try:
+                stat = os.stat(os.path.join(os.path.dirname(path), name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        candidate = os.path.join(os.path.dirname(path), name)
+        if candidate != path:
+            try:
+                os.remove(candidate)
+            except OSError:
+                pass
+            total -= size
+
+
+@traced(category='layout')
+def get_layout(G, algorithm='spring', cache_dir=None, use_disk=True, graph_key=None, **params):
+    """
+    Returns node positions for a graph, computing them only if no cached copy exists.
+
+    Layouts are keyed by the graph fingerprint (nodes, edges and weights), the algorithm and its
+    parameters. They are kept as NumPy arrays in an in-memory LRU cache and in .npz files under
+    dataset/.cache/layouts, where the least recently used files are evicted beyond DISK_CACHE_BYTES.
+    Layouts computed without a seed are cached too, so they stay stable across calls.
+
+    Args:
+        G (networkx.Graph): The graph object.
+        algorithm (str, optional): One of 'spring', 'circular', 'kamada_kawai', 'spectral',
+            'forceatlas2' (ForceAtlas2 force-directed, dense O(n^2) per iteration, for small graphs only)
+            or 'pivot_mds' (sparse stress, the one meant for large graphs).
+            Defaults to 'spring'.
+        cache_dir (str, optional): Folder of the layout files. Defaults to dataset/.cache/layouts.
+        use_disk (bool, optional): Whether to read and write layout files. Defaults to True.
+        graph_key (str, optional): Precomputed graph_fingerprint(G), e.g. shared by the plots of one
+            unchanged graph. Defaults to None (computed on every call, so edits of the graph are seen).
+        **params: Keyword arguments of the layout function, e.g. seed=42 or iterations=50.
+
+    Returns:
+        dict: Maps nodes to (x, y) numpy arrays, as the NetworkX layout functions do.
+    """
+    if algorithm not in LAYOUT_ALGORITHMS:
+        raise ValueError(f"Unknown layout algorithm '{algorithm}', expected one of {sorted(LAYOUT_ALGORITHMS)}")
+
+    key = _cache_key(graph_key or graph_fingerprint(G), algorithm, params)
+    nodes = list(G.nodes())
+    by_repr = {repr(node): node for node in nodes}
+
+    if key in _memory_cache:
+        _memory_cache.move_to_end(key)
+        cached_nodes, positions = _memory_cache[key]
+        count('layout_memory_hits')
+        return dict(zip(cached_nodes, positions))
+
+    path = os.path.join(cache_dir or LAYOUT_CACHE_DIR, f"{key}.npz")
+    layout = _read_layout(path) if use_disk else None
+    if layout is not None and set(layout[0]) == set(by_repr):
+        cached_nodes = [by_repr[node] for node in layout[0]]
+        positions = layout[1]
+        count('layout_disk_hits')
+    else:
+        pos = LAYOUT_ALGORITHMS[algorithm](G, **params)
+        count('layouts_computed')
+        cached_nodes = nodes
+        positions = np.array([pos[node] for node in nodes], dtype=np.float64).reshape(len(nodes), 2)
+        if use_disk:
+            try:
+                _write_layout(path, [repr(node) for node in nodes], positions, DISK_CACHE_BYTES)
+            except OSError as e:
+                print(f"Warning: could not write the layout cache to {path}: {e}")
+
+    _memory_cache[key] = (cached_nodes, positions)
+    while len(_memory_cache) > MEMORY_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+    return dict(zip(cached_nodes, positions))
+
+
+def clear_layout_cache(cache_dir=None, disk=False):
+    """
+    Empties the in-memory layout cache and, optionally, deletes the layout files.
+
+    Args:
+        cache_dir (str, optional): Folder of the layout files. Defaults to dataset/.cache/layouts.
+        disk (bool, optional): Whether to delete the layout files too. Defaults to False.
+    """
+    _memory_cache.clear()
+    folder = cache_dir or LAYOUT_CACHE_DIR
+    if disk and os.path.isdir(folder):
+        for name in os.listdir(folder):
+            if name.endswith('.npz'):
+                os.remove(os.path.join(folder, name))
@@ -0,0 +1,348 @@
+import os
+import json
+import pickle
+import hashlib
+import inspect
+import functools
+import threading
+from collections import OrderedDict
+import numpy as np
+import networkx as nx
+
+from csr_graph import CSRGraph
+from utils import DATASET_DIR, graph_fingerprint
+from instrumentation import count
+
+# Total size of the pickled results kept in memory and of the result files kept on disk
+MEMORY_CACHE_BYTES = 128 * 1024 * 1024
+DISK_CACHE_BYTES = 512 * 1024 * 1024
+# Disk eviction frees space down to this fraction of DISK_CACHE_BYTES, so it runs once per many writes
+DISK_EVICTION_TARGET = 0.75
+RESULT_CACHE_DIR = os.path.join(DATASET_DIR, '.cache', 'results')
+# Set to 0 to turn memoization off
+MEMO_ENV = 'GOT_MEMO'
+
+# Graph attribute naming the dataset files a graph was loaded from (set by load_graph_from_dataset)
+DATASET_ATTRIBUTE = 'dataset'
+# Latest graph fingerprint of every dataset, used to drop the results of older versions
+SOURCES_FILE = 'sources.json'
+
+_enabled = os.environ.get(MEMO_ENV, '1') != '0'
+_memory_cache = OrderedDict()
+_memory_bytes = 0
+_lock = threading.Lock()
+# Serializes the dataset version checks, so concurrent calls invalidate an older version once
+_source_lock = threading.Lock()
+_known_sources = {}
+# Running size of the result files of every cache folder written by this process
+_disk_bytes = {}
+
+
+def set_memo_enabled(enabled):
+    """Turns memoization on or off for the whole process, e.g. off while benchmarking."""
+    global _enabled
+    _enabled = enabled
+
+
+def fingerprint(G):
+    """
+    Content hash of a NetworkX graph (see utils.graph_fingerprint) or of a CSRGraph (its id,
+    offset, neighbor and weight arrays).
+    """
+    if isinstance(G, CSRGraph):
+        digest = hashlib.sha256(b'csr')
+        digest.update('\0'.join(map(repr, G.ids.tolist())).encode())
+        for array in (G.indptr, G.indices, G.weights):
+            digest.update(np.ascontiguousarray(array).tobytes())
+            digest.update(array.dtype.str.encode())
+        return digest.hexdigest()
+    return graph_fingerprint(G)
+
+
+def _key_default(value):
+    """
+    Encodes the arguments JSON cannot: objects with a memo_key() method (e.g. DistanceMatrix) are
+    described by it. Anything else raises TypeError, since its repr may be ambiguous or unstable.
+    """
+    if callable(getattr(value, 'memo_key', None)):
+        return value.memo_key()
+    raise TypeError(f"Cannot key a memoized result on a {type(value).__name__} argument")
+
+
+def _function_name(function):
+    module = function.__module__
+    if module == '__main__':
+        # Scripts run directly share their results with their imported copy
+        module = os.path.splitext(os.path.basename(inspect.getfile(function)))[0]
+    return f"{module}.{function.__qualname__}"
+
+
+def _result_path(cache_dir, graph_key, key):
+    return os.path.join(cache_dir, graph_key[:16], f"{key}.pkl")
+
+
+def _remember(key, data):
+    """Stores pickled bytes in the in-memory LRU, evicting the least recently used beyond MEMORY_CACHE_BYTES."""
+    global _memory_bytes
+    with _lock:
+        if key in _memory_cache:
+            _memory_bytes -= len(_memory_cache.pop(key))
+        _memory_cache[key] = data
+        _memory_bytes += len(data)
+        while _memory_bytes > MEMORY_CACHE_BYTES and len(_memory_cache) > 1:
+            _, evicted = _memory_cache.popitem(last=False)
+            _memory_bytes -= len(evicted)
+
+
+def _recall(key):
+    with _lock:
+        data = _memory_cache.get(key)
+        if data is not None:
+            _memory_cache.move_to_end(key)
+        return data
+
+
+def _read_result(path):
+    """Reads a result file; returns its pickled bytes or None if it is missing or unreadable."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        # Refresh the access time used by the disk eviction
+        os.utime(path)
+        return data
+    except OSError:
+        return None
+
+
+def _disk_usage(root):
+    """Lists (mtime, size, path) for every result file under root."""
+    entries = []
+    for folder, _, names in os.walk(root):
+        for name in names:
+            if name.endswith('.pkl'):
+                try:
+                    stat = os.stat(os.path.join(folder, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, os.path.join(folder, name)))
+    return entries
+
+
+def _write_result(path, data, max_bytes):
+    """
+    Writes a result file atomically and adds its size to a running total of the cache folder. The
+    folder is only walked to measure it on the first write of the process and, once the running total
+    exceeds max_bytes, to evict least recently used files down to DISK_EVICTION_TARGET of it.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    root = os.path.dirname(os.path.dirname(path))
+    try:
+        replaced = os.path.getsize(path)
+    except OSError:
+        replaced = 0
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+    with _lock:
+        if root not in _disk_bytes:
+            _disk_bytes[root] = sum(size for _, size, _ in _disk_usage(root))
+        else:
+            _disk_bytes[root] += len(data) - replaced
+        if _disk_bytes[root] <= max_bytes:
+            return
+
+        # Other processes may share the folder: evict from its actual content
+        entries = _disk_usage(root)
+        total = sum(size for _, size, _ in entries)
+        for _, size, candidate in sorted(entries):
+            if total <= max_bytes * DISK_EVICTION_TARGET:
+                break
+            if candidate != path:
+                try:
+                    os.remove(candidate)
+                except OSError:
+                    pass
+                total -= size
+        _disk_bytes[root] = total
+
+
+def invalidate(graph_key, cache_dir=None):
+    """
+    Drops every memoized result of a graph, in memory and on disk.
+
+    Args:
+        graph_key (str): Graph fingerprint, as returned by fingerprint.
+        cache_dir (str, optional): Folder of the result files. Defaults to dataset/.cache/results.
+    """
+    global _memory_bytes
+    with _lock:
+        for key in [key for key in _memory_cache if key[0] == graph_key]:
+            _memory_bytes -= len(_memory_cache.pop(key))
+    folder = os.path.join(cache_dir or RESULT_CACHE_DIR, graph_key[:16])
+    with _lock:
+        _disk_bytes.pop(os.path.dirname(folder), None)
+    # Another thread or process may be dropping the same folder: missing files are ignored
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return
+    for name in names:
+        try:
+            os.remove(os.path.join(folder, name))
+        except OSError:
+            pass
+    try:
+        os.rmdir(folder)
+    except OSError:
+        pass
+
+
+def _track_source(G, graph_key, cache_dir):
+    """
+    Records which graph version a dataset currently holds. When the dataset files changed since the
+    last run, the results computed on the previous version are dropped.
+    """
+    source = getattr(G, 'graph', {}).get(DATASET_ATTRIBUTE)
+    if not source:
+        return
+    source = '|'.join(source)
+    with _source_lock:
+        if _known_sources.get((cache_dir, source)) == graph_key:
+            return
+        _update_source(source, graph_key, cache_dir)
+        _known_sources[(cache_dir, source)] = graph_key
+
+
+def _update_source(source, graph_key, cache_dir):
+    """Stores the graph version of a dataset in SOURCES_FILE, dropping the results of the previous one."""
+    path = os.path.join(cache_dir, SOURCES_FILE)
+    try:
+        with open(path) as f:
+            sources = json.load(f)
+    except (OSError, ValueError):
+        sources = {}
+    previous = sources.get(source)
+    if previous != graph_key:
+        if previous is not None:
+            invalidate(previous, cache_dir)
+        sources[source] = graph_key
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(sources, f, indent=1)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+
+def memoize(function=None, *, ignore=(), version=1, cache_dir=None, use_disk=True):
+    """
+    Decorator caching the results of a function of a graph.
+
+    Results are keyed by the content fingerprint of the graph argument (the first NetworkX graph or
+    CSRGraph among the arguments), the function name, a version number and the remaining arguments
+    (bound to the signature with their defaults, so positional and keyword calls share a key). Arguments
+    are keyed by their JSON encoding, or by their memo_key() method; calls with any other argument (e.g.
+    a set, whose repr is not stable) are computed without caching. Results are pickled into an in-memory
+    LRU bounded by MEMORY_CACHE_BYTES and into files under dataset/.cache/results, one folder per graph,
+    where the least recently used files are evicted beyond DISK_CACHE_BYTES.
+    Every hit returns a fresh copy, so callers may modify results freely.
+
+    When the graph was loaded from a dataset that has changed since the last run, the results of the
+    previous version are dropped, so dependent results never outlive their data.
+
+    Args:
+        function (callable): The decorated function, when used as @memoize.
+        ignore (tuple, optional): Names of the arguments left out of the key because they do not change
+            the result (e.g. 'n_workers'). Defaults to ().
+        version (int, optional): Bump to invalidate the stored results after changing the function. Defaults to 1.
+        cache_dir (str, optional): Folder of the result files. Defaults to dataset/.cache/results.
+        use_disk (bool, optional): Whether to persist the results to disk. Defaults to True.
+    """
+    def decorate(function):
+        signature = inspect.signature(function)
+        name = _function_name(function)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            graph_name = next((param for param, value in bound.arguments.items()
+                               if isinstance(value, (nx.Graph, CSRGraph))), None)
+            graph_key = fingerprint(bound.arguments[graph_name]) if graph_name else 'none'
+            params = {param: value for param, value in bound.arguments.items()
+                      if param != graph_name and param not in ignore}
+            try:
+                description = json.dumps({'function': name, 'version': version, 'params': params},
+                                         sort_keys=True, default=_key_default)
+            except TypeError:
+                # No reliable key for these arguments: compute without caching
+                count('memo_bypasses')
+                return function(*args, **kwargs)
+            key = (graph_key, hashlib.sha256(description.encode()).hexdigest())
+
+            folder = cache_dir or RESULT_CACHE_DIR
+            if graph_name and use_disk:
+                _track_source(bound.arguments[graph_name], graph_key, folder)
+
+            data = _recall(key)
+            path = _result_path(folder, *key)
+            if data is None and use_disk:
+                data = _read_result(path)
+                if data is not None:
+                    _remember(key, data)
+            if data is not None:
+                try:
+                    result = pickle.loads(data)
+                    count('memo_hits')
+                    return result
+                except Exception:
+                    # Unreadable entry (e.g. written by another version of a class): recompute it
+                    pass
+
+            count('memo_misses')
+            result = function(*args, **kwargs)
+            data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+            _remember(key, data)
+            if use_disk:
+                try:
+                    _write_result(path, data, DISK_CACHE_BYTES)
+                except OSError as e:
+                    print(f"Warning: could not write the result cache to {path}: {e}")
+            return result
+
+        wrapper.uncached = function
+        return wrapper
+
+    return decorate(function) if function is not None else decorate
+
+
+def clear_memo(cache_dir=None, disk=False):
+    """
+    Empties the in-memory result cache and, optionally, deletes the result files.
+
+    Args:
+        cache_dir (str, optional): Folder of the result files. Defaults to dataset/.cache/results.
+        disk (bool, optional): Whether to delete the result files too. Defaults to False.
+    """
+    global _memory_bytes
+    with _lock:
+        _memory_cache.clear()
+        _memory_bytes = 0
+    _known_sources.clear()
+    folder = cache_dir or RESULT_CACHE_DIR
+    with _lock:
+        _disk_bytes.pop(folder, None)
+    if disk and os.path.isdir(folder):
+        for root, _, names in os.walk(folder, topdown=False):
+            for name in names:
+                if name.endswith('.pkl') or name == SOURCES_FILE:
+                    os.remove(os.path.join(root, name))
+            if root != folder and not os.listdir(root):
+                os.rmdir(root)
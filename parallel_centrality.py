@@ -0,0 +1,248 @@
+import os
+from collections import deque
+from itertools import islice
+import numpy as np
+import networkx as nx
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from csr_graph import CSRGraph
+from distances import DistanceMatrix
+from instrumentation import traced, count
+from memo import memoize
+
+# Source chunks handed out per worker, to balance uneven BFS costs
+CHUNKS_PER_WORKER = 4
+# Upper bound on the cells of one block of per-source betweenness dependencies sent back by a worker
+BETWEENNESS_BLOCK_CELLS = 1 << 22
+
+# CSR arrays of the graph, attached from shared memory in each worker process
+_worker_graph = None
+_worker_segments = []
+
+
+def _share_array(array):
+    """
+    Copies an array into a new shared memory segment.
+
+    Returns:
+        tuple: (segment, descriptor) where the descriptor (name, shape, dtype) lets workers attach to it.
+    """
+    segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[...] = array
+    return segment, (segment.name, array.shape, array.dtype.str)
+
+
+def _attach_array(descriptor):
+    """
+    Attaches to a shared memory segment created by _share_array and views it as an array.
+    """
+    name, shape, dtype = descriptor
+    segment = shared_memory.SharedMemory(name=name)
+    # Keep a reference so the buffer stays mapped for the lifetime of the worker
+    _worker_segments.append(segment)
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf)
+
+
+def _init_worker(indptr_descriptor, indices_descriptor):
+    """
+    Pool initializer: rebuilds the CSR graph on top of the shared arrays, without copying them.
+    """
+    global _worker_graph
+    indptr = _attach_array(indptr_descriptor)
+    indices = _attach_array(indices_descriptor)
+    n = len(indptr) - 1
+    _worker_graph = CSRGraph(np.arange(n), np.full(n, None), indptr, indices, np.ones(0))
+
+
+def _closeness_chunk(sources):
+    """
+    Computes the closeness centrality of a chunk of nodes, with the same formula as
+    nx.closeness_centrality (Wasserman and Faust correction for disconnected graphs).
+
+    Returns:
+        tuple: (sources, closeness values).
+    """
+    csr = _worker_graph
+    n = csr.number_of_nodes
+    values = []
+    for source in sources:
+        dist = csr.bfs(source)
+        reached = dist[dist >= 0]
+        total_distance = int(reached.sum(dtype=np.int64))
+        reachable = len(reached)
+        if total_distance > 0 and n > 1:
+            closeness = (reachable - 1.0) / total_distance
+            closeness *= (reachable - 1.0) / (n - 1)
+        else:
+            closeness = 0.0
+        values.append(closeness)
+    return sources, values
+
+
+def _betweenness_chunk(sources):
+    """
+    Runs Brandes' accumulation for a chunk of sources.
+
+    Returns:
+        numpy.ndarray: One row per source with its dependencies on every node (0 for the source itself),
+                       left unsummed so that the caller can add them in source order.
+    """
+    csr = _worker_graph
+    block = np.empty((len(sources), csr.number_of_nodes), dtype=np.float64)
+    for row, source in zip(block, sources):
+        _, sigma, levels = csr.shortest_path_dag(source)
+        row[:] = csr.dependencies(sigma, levels)
+        row[source] = 0.0
+    return block
+
+
+def _networkx_order(G, csr):
+    """
+    Returns the neighbor ids of every row in the order of G's adjacency, so that BFS runs discover
+    nodes in the same order as the NetworkX traversals.
+    """
+    index = csr.index
+    return np.fromiter((index[u] for v in G for u in G[v]), dtype=csr.indices.dtype, count=len(csr.indices))
+
+
+def _submit_window(executor, fn, chunks, window):
+    """
+    Submits the first window tasks right away and returns a generator of their results in chunk order,
+    which submits the next task as each result is taken, so at most window results wait in memory.
+    """
+    chunks = iter(chunks)
+    pending = deque(executor.submit(fn, chunk) for chunk in islice(chunks, window))
+
+    def results():
+        while pending:
+            result = pending.popleft().result()
+            chunk = next(chunks, None)
+            if chunk is not None:
+                pending.append(executor.submit(fn, chunk))
+            yield result
+    return results()
+
+
+class _SerialExecutor:
+    """
+    Runs tasks in the calling process, for n_workers=1.
+    """
+
+    def __init__(self, csr):
+        global _worker_graph
+        _worker_graph = csr
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+@traced
+@memoize(ignore=('n_workers',))
+def parallel_centralities(G, n_workers=None, measures=('degree', 'closeness', 'betweenness', 'eigenvector'),
+                          weight=None, transform='inverse'):
+    """
+    Computes degree, closeness, betweenness and eigenvector centrality concurrently.
+
+    Closeness and betweenness are split by BFS source across a process pool; the CSR arrays of the
+    graph are placed in shared memory once, so workers attach to them instead of receiving a pickled
+    copy per task. Betweenness dependencies are merged and rescaled as nx.betweenness_centrality does.
+    Degree and eigenvector centrality run in the parent process (with NetworkX) while the pool works.
+    All four are identical to the serial NetworkX values: the BFS runs follow G's adjacency order and
+    accumulate dependencies as NetworkX does, and the per-source dependencies come back unsummed, in
+    bounded blocks, to be added in source order.
+
+    With a weight attribute, closeness and betweenness follow shortest paths over edge lengths derived
+    from the weights (1/weight by default) and are read from one DistanceMatrix, as
+    nx.closeness_centrality(distance=...) and nx.betweenness_centrality(weight=...) would compute them.
+
+    Args:
+        G (networkx.Graph): Input graph.
+        n_workers (int, optional): Number of worker processes. Defaults to None (os.cpu_count()).
+        measures (tuple, optional): Measures to compute. Defaults to all four.
+        weight (str, optional): Edge attribute holding the weights of closeness and betweenness.
+            Defaults to None (hop distances).
+        transform (str, optional): Weight to length transform, a key of distances.TRANSFORMS. Defaults to 'inverse'.
+
+    Returns:
+        dict: Maps each measure name to a dict of node -> centrality value, like the NetworkX functions.
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+    csr = CSRGraph.from_networkx(G)
+    n = csr.number_of_nodes
+    nodes = csr.ids.tolist()
+
+    if weight is not None:
+        results = {}
+        if 'closeness' in measures or 'betweenness' in measures:
+            distances = DistanceMatrix(G, weight=weight, transform=transform, n_workers=n_workers)
+            if 'closeness' in measures:
+                results['closeness'] = dict(zip(nodes, distances.closeness().tolist()))
+            if 'betweenness' in measures:
+                results['betweenness'] = dict(zip(nodes, distances.betweenness(n_workers).tolist()))
+        if 'degree' in measures:
+            results['degree'] = nx.degree_centrality(G)
+        if 'eigenvector' in measures:
+            results['eigenvector'] = nx.eigenvector_centrality(G)
+        return {measure: results[measure] for measure in measures}
+
+    chunks = [chunk for chunk in np.array_split(np.arange(n), n_workers * CHUNKS_PER_WORKER) if len(chunk)]
+    segments = []
+    if n_workers > 1:
+        indptr_segment, indptr_descriptor = _share_array(csr.indptr)
+        indices_segment, indices_descriptor = _share_array(_networkx_order(G, csr))
+        segments = [indptr_segment, indices_segment]
+        executor = ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                       initargs=(indptr_descriptor, indices_descriptor))
+    else:
+        executor = _SerialExecutor(CSRGraph(csr.ids, csr.labels, csr.indptr, _networkx_order(G, csr), np.ones(0)))
+
+    results = {}
+    try:
+        closeness_futures = [executor.submit(_closeness_chunk, chunk.tolist())
+                             for chunk in chunks] if 'closeness' in measures else []
+        betweenness_blocks = None
+        if 'betweenness' in measures:
+            rows = max(1, min(-(-n // (n_workers * CHUNKS_PER_WORKER)), BETWEENNESS_BLOCK_CELLS // max(n, 1)))
+            betweenness_blocks = _submit_window(executor, _betweenness_chunk,
+                                                (list(range(lo, min(lo + rows, n))) for lo in range(0, n, rows)),
+                                                2 * n_workers)
+
+        # Cheap or inherently sequential measures run here while the pool works
+        if 'degree' in measures:
+            results['degree'] = nx.degree_centrality(G)
+        if 'eigenvector' in measures:
+            results['eigenvector'] = nx.eigenvector_centrality(G)
+
+        # BFS runs of the worker processes, which record no counts of their own; serial runs count themselves
+        if n_workers > 1:
+            count('bfs_runs', n * (len(closeness_futures) > 0) + n * (betweenness_blocks is not None))
+
+        if closeness_futures:
+            closeness = np.zeros(n, dtype=np.float64)
+            for future in closeness_futures:
+                sources, values = future.result()
+                closeness[sources] = values
+            results['closeness'] = dict(zip(nodes, closeness.tolist()))
+
+        if betweenness_blocks is not None:
+            betweenness = np.zeros(n, dtype=np.float64)
+            for block in betweenness_blocks:
+                for row in block:
+                    betweenness += row
+            # Normalization of nx.betweenness_centrality(G, normalized=True) for undirected graphs
+            if n > 2:
+                betweenness *= 1 / ((n - 1) * (n - 2))
+            results['betweenness'] = dict(zip(nodes, betweenness.tolist()))
+    finally:
+        executor.shutdown(wait=True)
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+    return {measure: results[measure] for measure in measures}
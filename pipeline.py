@@ -0,0 +1,324 @@
+import os
+import sys
+import io
+import time
+import argparse
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import networkx as nx
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'structures'))
+from utils import load_graph_from_dataset
+from csr_graph import CSRGraph
+from core_decomposition import core_numbers
+from eccentricity import distance_summary
+from distances import DistanceMatrix
+from rendering import set_output_dir, draw_figures, GRAPH
+from instrumentation import span, enable, is_enabled, write_trace, summarize
+from graph import print_graph_metrics
+from centrality import print_top_10
+from cliques import print_top_10_weighted_cliques_with_contributions
+from ego_net import ego_statistics
+from group_centralities import HOUSES, group_centralities_table
+from k_core import print_k_core_details, print_shell_hierarchy
+from triades import print_top_10_weighted_triads_with_contributions
+from triades2 import triad_arrays, print_triad_statistics
+
+# A stage computes its result from the results of the stages it requires (run), may print while
+# doing so, and optionally lists the render jobs of its figures (plot), drawn once all stages are done
+Stage = namedtuple('Stage', ['requires', 'run', 'plot', 'description'])
+
+
+class _StageOutput(io.TextIOBase):
+    """
+    Stand-in for sys.stdout that collects what each stage thread prints in its own buffer,
+    so that concurrent stages do not interleave their reports.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self.local, 'buffer', None)
+        return (buffer if buffer is not None else self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def _centralities(context):
+    G, paths = context['graph'], context['shortest_paths']
+    nodes = paths.csr.ids.tolist()
+    centralities = {
+        "Degree Centrality": nx.degree_centrality(G),
+        "Closeness Centrality": dict(zip(nodes, paths.closeness().tolist())),
+        "Betweenness Centrality": dict(zip(nodes, paths.betweenness(context['workers']).tolist())),
+        "Eigenvector Centrality": nx.eigenvector_centrality(G),
+    }
+    for title, centrality in centralities.items():
+        print_top_10(G, centrality, title)
+    return centralities
+
+
+def _plot_centralities(context, centralities):
+    jobs = []
+    for title, centrality in centralities.items():
+        jobs.append(('centrality:plot_centrality_distribution', (centrality, title), {}))
+        jobs.append(('centrality:plot_heatmap_centrality', (GRAPH, centrality, title), {}))
+    return jobs
+
+
+def _metrics(context):
+    G, paths = context['graph'], context['shortest_paths']
+    print_graph_metrics(G, distance_summary(paths.csr, paths), context['triangles']['average_clustering'])
+
+
+def _plot_metrics(context, _):
+    return [('graph:plot_graph', (GRAPH,), {}), ('graph:plot_edge_weight_distribution', (GRAPH,), {})]
+
+
+def _group_centralities(context):
+    G, paths = context['graph'], context['shortest_paths']
+    groups = {name: [m for m in members if m in G] for name, members in HOUSES.items()}
+    groups = {name: members for name, members in groups.items() if members}
+    df = group_centralities_table(paths.csr, groups, distances=paths)
+    print("Group centralities (GDC, GCC, GBC):")
+    print(df.to_string())
+    return df
+
+
+def _k_core(context):
+    print_shell_hierarchy(context['graph'], context['core'])
+    return print_k_core_details(context['graph'], context['core'])
+
+
+def _plot_k_core(context, result):
+    return [('k_core:plot_k_core', (GRAPH, *result), {})] if result else []
+
+
+def _ego(context):
+    stats = ego_statistics(context['csr'], n_workers=context['workers'])
+    print("Largest ego networks:")
+    print(stats.sort_values(['nodes', 'total_weight'], ascending=False).head(10).to_string())
+    return stats
+
+
+def _plot_ego(context, _):
+    return [('ego_net:display_ego_network', (GRAPH, node), {})
+            for node in ['Jon', 'Daenerys'] if node in context['graph']]
+
+
+def _triad_statistics(context):
+    return print_triad_statistics(context['graph'], context['triangles'])
+
+
+def _plot_triad_statistics(context, result):
+    clustering_per_node, closed_triads, open_triads = result
+    return [('triades2:plot_clustering_distribution', (clustering_per_node,), {}),
+            ('triades2:plot_triads_pie', (closed_triads, open_triads), {})]
+
+
+STAGES = {
+    # Shared intermediates
+    'csr': Stage((), lambda c: CSRGraph.from_networkx(c['graph']), None,
+                 "Compact CSR copy of the graph"),
+    'shortest_paths': Stage(('csr',), lambda c: DistanceMatrix(c['csr'], weight=c['weight'], n_workers=c['workers']),
+                            None, "All-pairs shortest-path distances"),
+    'triangles': Stage(('csr',), lambda c: triad_arrays(c['csr']), None,
+                       "Triangles, clustering coefficients and triads of every node (one enumeration)"),
+    'core': Stage(('csr',), lambda c: core_numbers(c['csr']), None,
+                  "Core number of every node"),
+    # Analyses
+    'metrics': Stage(('shortest_paths', 'triangles'), _metrics, _plot_metrics,
+                     "General graph metrics (graph.py)"),
+    'centrality': Stage(('shortest_paths',), _centralities, _plot_centralities,
+                        "Degree, closeness, betweenness and eigenvector centrality (centrality.py)"),
+    'cliques': Stage((), lambda c: print_top_10_weighted_cliques_with_contributions(c['graph']),
+                     lambda c, cliques: [('cliques:plot_maximal_cliques', (GRAPH, cliques), {})],
+                     "Top 10 weighted cliques (cliques.py)"),
+    'ego': Stage(('csr',), _ego, _plot_ego,
+                 "Ego-network statistics of every node (ego_net.py)"),
+    'group_centralities': Stage(('shortest_paths',), _group_centralities,
+                                lambda c, df: [('group_centralities:plot_group_centralities_heatmap', (df,), {})],
+                                "Group centralities of the houses (group_centralities.py)"),
+    'k_core': Stage(('core',), _k_core, _plot_k_core,
+                    "Core hierarchy and innermost k-core (k_core.py)"),
+    'triads': Stage(('csr',), lambda c: print_top_10_weighted_triads_with_contributions(c['csr']), None,
+                    "Top 10 weighted triads (triades.py)"),
+    'clustering': Stage(('triangles',), _triad_statistics, _plot_triad_statistics,
+                        "Clustering, transitivity, open and closed triads (triades2.py)"),
+}
+
+ANALYSES = ['metrics', 'centrality', 'cliques', 'ego', 'group_centralities', 'k_core', 'triads', 'clustering']
+
+
+def resolve_stages(selected, stages=STAGES):
+    """
+    Lists the selected stages and every stage they depend on, dependencies first.
+
+    Args:
+        selected (iterable): Names of the stages to run.
+        stages (dict, optional): The stage graph. Defaults to STAGES.
+
+    Returns:
+        list: Stage names in a topological order.
+
+    Raises:
+        ValueError: If a stage is unknown or the dependencies have a cycle.
+    """
+    order, state = [], {}
+
+    def visit(name):
+        if name not in stages:
+            raise ValueError(f"Unknown stage '{name}', expected one of {', '.join(stages)}")
+        if state.get(name) == 'done':
+            return
+        if state.get(name) == 'visiting':
+            raise ValueError(f"Dependency cycle through stage '{name}'")
+        state[name] = 'visiting'
+        for dependency in stages[name].requires:
+            visit(dependency)
+        state[name] = 'done'
+        order.append(name)
+
+    for name in selected:
+        visit(name)
+    return order
+
+
+def run_pipeline(G, selected=ANALYSES, n_threads=None, n_workers=None, plots=False, stages=STAGES, weight=None,
+                 output_dir=None, formats=('png',), render_workers=None):
+    """
+    Runs the selected analyses on a graph loaded once, computing every shared intermediate
+    (CSR arrays, all-pairs shortest paths, triangle and triad statistics, core numbers) once.
+
+    Stages whose dependencies are complete run concurrently in a thread pool; the heavy kernels
+    release the GIL in NumPy/SciPy or fan out to worker processes. What a stage prints is buffered
+    and written as a block when it completes. Figures are drawn afterwards, since Matplotlib is not
+    thread-safe: with output_dir, the render jobs of all stages are rendered concurrently by a pool of
+    headless workers (rendering.render_figures), otherwise they are drawn in the main thread in stage order.
+
+    Args:
+        G (networkx.Graph): Input graph, e.g. from load_graph_from_dataset.
+        selected (iterable, optional): Stages to run, with their dependencies. Defaults to all analyses.
+        n_threads (int, optional): Stages running at once. Defaults to None (os.cpu_count()).
+        n_workers (int, optional): Worker processes of the stages that use a pool. Defaults to None (os.cpu_count()).
+        plots (bool, optional): Whether to draw the figures of the stages. Defaults to False.
+        stages (dict, optional): The stage graph. Defaults to STAGES.
+        weight (str, optional): Edge attribute whose inverse is the edge length of the shortest paths
+            (closeness, betweenness, radius/diameter, group closeness and betweenness). Defaults to None (hops).
+        output_dir (str, optional): Folder the figures are written to (implies plots). Defaults to None (shown).
+        formats (iterable, optional): File formats of the written figures. Defaults to ('png',).
+        render_workers (int, optional): Worker processes rendering the figures. Defaults to None (os.cpu_count()).
+
+    Returns:
+        tuple: (results, timings) mapping every stage run to its result and to its duration in seconds.
+    """
+    order = resolve_stages(selected, stages)
+    context = {'graph': G, 'workers': n_workers, 'weight': weight}
+    results, timings = {}, {}
+    pending = {name: set(stages[name].requires) for name in order}
+
+    output = _StageOutput(sys.stdout)
+
+    def execute(name):
+        output.local.buffer = io.StringIO()
+        start = time.perf_counter()
+        try:
+            with span(name, 'stage'):
+                result = stages[name].run(context)
+        finally:
+            timings[name] = time.perf_counter() - start
+            text = output.local.buffer.getvalue()
+            output.local.buffer = None
+        return result, text
+
+    saved_stdout, sys.stdout = sys.stdout, output
+    try:
+        with ThreadPoolExecutor(max_workers=n_threads or os.cpu_count() or 1) as executor:
+            running = {}
+            while pending or running:
+                for name in [name for name, requires in pending.items() if not requires]:
+                    del pending[name]
+                    running[executor.submit(execute, name)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    result, text = future.result()
+                    results[name] = context[name] = result
+                    if text:
+                        output.stream.write(f"\n===== {name} ({timings[name]:.2f}s) =====\n{text}")
+                    for requires in pending.values():
+                        requires.discard(name)
+    finally:
+        sys.stdout = saved_stdout
+
+    if plots or output_dir:
+        if output_dir:
+            set_output_dir(output_dir, formats)
+        jobs = [job for name in order if stages[name].plot is not None
+                for job in stages[name].plot(context, results[name])]
+        written = draw_figures(jobs, G, n_workers=render_workers)
+        if output_dir:
+            print(f"\nWrote {sum(len(paths) for paths in written)} figure files to {output_dir}")
+
+    return results, timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the analyses of the Game of Thrones network on a single graph load.")
+    parser.add_argument('stages', nargs='*', default=ANALYSES,
+                        help=f"Stages to run, with their dependencies (default: all of {', '.join(ANALYSES)}).")
+    parser.add_argument('--list', action='store_true', help="List the stages and exit.")
+    parser.add_argument('--threads', type=int, default=None,
+                        help="Stages running concurrently (default: number of CPUs).")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes of the shortest paths and ego stages (default: number of CPUs).")
+    parser.add_argument('--weighted-distances', action='store_true',
+                        help="Use 1/weight edge lengths in the shortest paths instead of hop counts.")
+    parser.add_argument('--plots', action='store_true', help="Draw the figures of the selected stages.")
+    parser.add_argument('--output-dir', default=None,
+                        help="Write the figures to this folder instead of showing them (headless mode).")
+    parser.add_argument('--formats', default='png',
+                        help="Comma-separated figure formats of the headless mode (default: png).")
+    parser.add_argument('--render-workers', type=int, default=None,
+                        help="Worker processes rendering the figures in headless mode (default: number of CPUs).")
+    parser.add_argument('--trace', nargs='?', const='', default=None, metavar='PATH',
+                        help="Record a Chrome trace of the run to PATH (default: got-trace-<time>-<pid>.json).")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Also record the peak traced memory of every span (slower).")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, stage in STAGES.items():
+            requires = f" (needs {', '.join(stage.requires)})" if stage.requires else ""
+            print(f"{name}: {stage.description}{requires}")
+        sys.exit(0)
+
+    try:
+        if args.trace is not None:
+            enable(args.trace or None, memory=args.trace_memory)
+
+        formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+
+        G = load_graph_from_dataset()
+        results, timings = run_pipeline(G, args.stages, n_threads=args.threads, n_workers=args.workers,
+                                        plots=args.plots, weight='weight' if args.weighted_distances else None,
+                                        output_dir=args.output_dir, formats=formats,
+                                        render_workers=args.render_workers)
+
+        print("\nStage timings:")
+        for name, seconds in timings.items():
+            print(f"   {name}: {seconds:.2f}s")
+
+        if is_enabled():
+            print("\nSlowest traced functions (calls, wall time, CPU time of the calling thread):")
+            for entry in summarize()[:15]:
+                print(f"   {entry['name']} [{entry['category']}]: {entry['calls']} calls, "
+                      f"{entry['wall_ms']:.1f} ms, CPU {entry['cpu_ms']:.1f} ms")
+            print(f"Trace written to {write_trace()}")
+
+    except Exception as e:
+        print(f"Error: {e}")
@@ -0,0 +1,202 @@
+import os
+import re
+import importlib
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+
+# Folder where figures are written instead of being shown, and the file formats to write
+OUTPUT_DIR_ENV = 'GOT_FIGURE_DIR'
+FORMATS_ENV = 'GOT_FIGURE_FORMATS'
+DEFAULT_FORMATS = ('png',)
+
+# Placeholder for the graph in the arguments of a render job, replaced by the worker's own copy
+GRAPH = '<graph>'
+
+_output_dir = os.environ.get(OUTPUT_DIR_ENV) or None
+_formats = tuple(f for f in os.environ.get(FORMATS_ENV, '').split(',') if f) or DEFAULT_FORMATS
+_written = {}
+_saved = []
+_worker_graph = None
+# File name prefix of the render job running in this worker, so that jobs never share a file name
+_job_prefix = None
+
+if _output_dir:
+    # Headless mode: no display needed
+    matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt  # noqa: E402
+from instrumentation import traced
+
+
+def set_output_dir(output_dir, formats=None):
+    """
+    Switches figures to headless mode: show_figure saves them to output_dir instead of showing them.
+
+    Args:
+        output_dir (str): Destination folder, created if needed; None restores interactive mode.
+        formats (iterable, optional): File formats, e.g. ('png', 'svg'). Defaults to None (keep the current ones).
+    """
+    global _output_dir, _formats
+    _output_dir = output_dir
+    if formats:
+        _formats = tuple(formats)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        plt.switch_backend('Agg')
+
+
+def get_output_dir():
+    """Returns the folder figures are written to, or None in interactive mode."""
+    return _output_dir
+
+
+def _figure_name(fig):
+    """File name of a figure: its suptitle or the title of its first titled axes, as a slug."""
+    title = fig._suptitle.get_text() if fig._suptitle is not None else ''
+    for ax in fig.axes:
+        if title:
+            break
+        title = ax.get_title()
+    return re.sub(r'[^A-Za-z0-9]+', '_', title).strip('_').lower() or 'figure'
+
+
+@traced(category='render')
+def show_figure(name=None, fig=None):
+    """
+    Shows a figure, or in headless mode saves it in every configured format and closes it,
+    so that runs producing many figures do not accumulate them in memory.
+
+    Args:
+        name (str, optional): File name without extension. Defaults to None (derived from the title).
+        fig (matplotlib.figure.Figure, optional): The figure. Defaults to None (the current figure).
+
+    Returns:
+        list: Paths of the written files; empty in interactive mode.
+    """
+    fig = fig or plt.gcf()
+    if not _output_dir:
+        plt.show()
+        return []
+
+    name = name or _figure_name(fig)
+    if _job_prefix:
+        name = f"{_job_prefix}_{name}"
+    # Repeated titles within a run (or within a render job) get a numeric suffix
+    count = _written.get(name, 0) + 1
+    _written[name] = count
+    stem = name if count == 1 else f"{name}_{count}"
+
+    os.makedirs(_output_dir, exist_ok=True)
+    paths = []
+    for fmt in _formats:
+        path = os.path.join(_output_dir, f"{stem}.{fmt}")
+        fig.savefig(path, format=fmt, bbox_inches='tight')
+        paths.append(path)
+    plt.close(fig)
+    _saved.extend(paths)
+    return paths
+
+
+def _init_render_worker(output_dir, formats, nodes_path, edges_path):
+    """Loads the graph once per worker and switches the worker to headless mode."""
+    global _worker_graph
+    from utils import load_graph_from_dataset
+
+    set_output_dir(output_dir, formats)
+    _worker_graph = load_graph_from_dataset(nodes_path, edges_path)
+
+
+def _resolve(target):
+    """Imports a 'module:function' target."""
+    module_name, function_name = target.split(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _run_job(job, G):
+    """Calls the plotting function of a render job, with G in place of the GRAPH placeholder."""
+    target, args, kwargs = job
+    args = [G if isinstance(arg, str) and arg == GRAPH else arg for arg in args]
+    _resolve(target)(*args, **kwargs)
+
+
+def _render_job(indexed_job):
+    """Runs one render job in a worker; returns the files its figures were written to."""
+    global _job_prefix
+    prefix, job = indexed_job
+    # The prefix makes the file names unique across workers; repeats within the job are numbered
+    _job_prefix = prefix
+    _written.clear()
+    start = len(_saved)
+    try:
+        _run_job(job, _worker_graph)
+    finally:
+        # Figures the function left open are saved too, then everything is released
+        for number in plt.get_fignums():
+            show_figure(fig=plt.figure(number))
+        plt.close('all')
+        _job_prefix = None
+    return _saved[start:]
+
+
+@traced(category='render')
+def draw_figures(jobs, G, n_workers=None):
+    """
+    Draws render jobs: in headless mode concurrently with render_figures, otherwise one after the
+    other in the calling process. The workers load G from its dataset files when it has them
+    (load_graph_from_dataset graphs); any other graph is sent with each job instead of GRAPH.
+
+    Args:
+        jobs (list): Render jobs, as for render_figures.
+        G (networkx.Graph): Graph passed in place of the GRAPH placeholder.
+        n_workers (int, optional): Worker processes of the headless mode. Defaults to None (number of CPUs).
+
+    Returns:
+        list: For each job, the list of files written; empty lists in interactive mode.
+    """
+    if not _output_dir:
+        for job in jobs:
+            _run_job(job, G)
+        return [[] for _ in jobs]
+
+    dataset = getattr(G, 'graph', {}).get('dataset')
+    if not dataset:
+        jobs = [(target, [G if isinstance(arg, str) and arg == GRAPH else arg for arg in args], kwargs)
+                for target, args, kwargs in jobs]
+    nodes_path, edges_path = dataset or (None, None)
+    return render_figures(jobs, _output_dir, _formats, n_workers=n_workers,
+                          nodes_path=nodes_path, edges_path=edges_path)
+
+
+@traced(category='render')
+def render_figures(jobs, output_dir, formats=DEFAULT_FORMATS, n_workers=None, nodes_path=None, edges_path=None):
+    """
+    Renders figures in parallel with a pool of headless (Agg) worker processes.
+
+    Each job is a (target, args, kwargs) tuple, where target names a plotting function as
+    'module:function' (e.g. 'centrality:plot_heatmap_centrality'). The GRAPH placeholder in args is
+    replaced by the graph, which every worker loads once from the dataset snapshot instead of
+    receiving it with each job. Plotting functions end in show_figure, which writes and closes the
+    figure in the workers. File names start with the job index (e.g. '03_degree_centrality.png'),
+    so jobs running in different workers never overwrite each other's figures.
+
+    Args:
+        jobs (list): Render jobs.
+        output_dir (str): Destination folder of the figures.
+        formats (iterable, optional): File formats. Defaults to ('png',).
+        n_workers (int, optional): Worker processes. Defaults to None (number of CPUs, at most one per job).
+        nodes_path (str, optional): Nodes CSV the workers load. Defaults to the dataset one.
+        edges_path (str, optional): Edges CSV the workers load. Defaults to the dataset one.
+
+    Returns:
+        list: For each job, the list of files written.
+    """
+    jobs = [(target, tuple(args), dict(kwargs)) for target, args, kwargs in jobs]
+    if not jobs:
+        return []
+    os.makedirs(output_dir, exist_ok=True)
+    n_workers = max(1, min(n_workers or os.cpu_count() or 1, len(jobs)))
+    width = len(str(len(jobs) - 1))
+    indexed_jobs = [(f"{index:0{width}d}", job) for index, job in enumerate(jobs)]
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_render_worker,
+                             initargs=(output_dir, tuple(formats), nodes_path, edges_path)) as executor:
+        return list(executor.map(_render_job, indexed_jobs))
@@ -0,0 +1,362 @@
+import os
+import sys
+import json
+import asyncio
+import argparse
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ProcessPoolExecutor
+import networkx as nx
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'structures'))
+from utils import load_graph_from_dataset
+from csr_graph import CSRGraph
+from parallel_centrality import parallel_centralities
+from core_decomposition import core_numbers
+from triangles import triangle_counts
+from group_centralities import (group_degree_centralities, group_closeness_centralities,
+                                group_betweenness_centralities)
+from cliques import top_k_weighted_cliques
+from instrumentation import traced
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Largest request head (request line and headers) and body accepted
+MAX_HEAD_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+
+CENTRALITY_MEASURES = ('degree', 'closeness', 'betweenness', 'eigenvector')
+
+# Graph of the worker processes, loaded once by the pool initializer
+_worker_graph = None
+
+
+class QueryError(Exception):
+    """A query that cannot be answered, with the HTTP status to report."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class GraphIndex:
+    """
+    The graph and the indexes the server answers from: centralities, core numbers, triangle counts,
+    degrees and strengths, all computed once at startup.
+
+    Args:
+        G (networkx.Graph): Input graph, e.g. from load_graph_from_dataset.
+        n_workers (int, optional): Worker processes of the startup centrality computation.
+            Defaults to None (os.cpu_count()).
+    """
+
+    @traced
+    def __init__(self, G, n_workers=None):
+        self.G = G
+        self.csr = CSRGraph.from_networkx(G)
+        self.centralities = parallel_centralities(G, n_workers=n_workers, measures=CENTRALITY_MEASURES)
+        self.core = core_numbers(self.csr)
+        self.triangles, self.total_triangles = triangle_counts(self.csr)
+        self.degree = dict(G.degree())
+        self.strength = dict(G.degree(weight='weight'))
+        # Sorted once, so top-k queries are slices
+        self.rankings = {measure: sorted(values.items(), key=lambda item: item[1], reverse=True)
+                         for measure, values in self.centralities.items()}
+
+    def node(self, name):
+        """Raises a 404 QueryError for nodes that are not in the graph."""
+        if name not in self.G:
+            raise QueryError(f"Unknown node '{name}'", 404)
+        return name
+
+    def top(self, measure, k=10):
+        """Returns the k most central nodes for a measure, as [node, value] pairs."""
+        if measure not in self.rankings:
+            raise QueryError(f"Unknown measure '{measure}', expected one of {', '.join(CENTRALITY_MEASURES)}")
+        return [[node, value] for node, value in self.rankings[measure][:k]]
+
+    def node_summary(self, name):
+        """Returns the precomputed statistics of one node."""
+        node = self.node(name)
+        d = self.degree[node]
+        return {
+            'node': node,
+            'label': self.G.nodes[node].get('label'),
+            'degree': d,
+            'strength': self.strength[node],
+            'core_number': self.core[node],
+            'triangles': self.triangles[node],
+            'clustering': 2 * self.triangles[node] / (d * (d - 1)) if d > 1 else 0,
+            'centrality': {measure: values[node] for measure, values in self.centralities.items()},
+        }
+
+    def ego(self, name):
+        """Returns the radius-1 ego network of a node from its adjacency."""
+        node = self.node(name)
+        ego = nx.ego_graph(self.G, node)
+        return _ego_summary(node, 1, ego)
+
+    def k_core(self, k=None):
+        """Returns the nodes and edges of the k-core (the innermost one by default) from the core numbers."""
+        k = max(self.core.values(), default=0) if k is None else k
+        nodes = [v for v in self.G if self.core[v] >= k]
+        subgraph = self.G.subgraph(nodes)
+        return {'k': k, 'nodes': nodes,
+                'edges': [[u, v, w] for u, v, w in subgraph.edges(data='weight', default=1)],
+                'weight': subgraph.size(weight='weight')}
+
+    def group(self, members, measures):
+        """Returns the cheap group centralities (degree, closeness) of a set of nodes."""
+        groups = {'group': [self.node(member) for member in members]}
+        result = {}
+        if 'degree' in measures:
+            result['degree'] = group_degree_centralities(self.csr, groups)['group']
+        if 'closeness' in measures:
+            result['closeness'] = group_closeness_centralities(self.csr, groups)['group']
+        return result
+
+
+def _ego_summary(node, radius, ego):
+    return {'node': node, 'radius': radius, 'nodes': list(ego.nodes()),
+            'edges': ego.number_of_edges(), 'weight': ego.size(weight='weight'),
+            'density': nx.density(ego)}
+
+
+def _init_worker(nodes_path, edges_path):
+    global _worker_graph
+    _worker_graph = load_graph_from_dataset(nodes_path, edges_path)
+
+
+def _worker_ego(node, radius):
+    return _ego_summary(node, radius, nx.ego_graph(_worker_graph, node, radius=radius))
+
+
+def _worker_group_betweenness(members):
+    return group_betweenness_centralities(_worker_graph, {'group': members})['group']
+
+
+def _worker_cliques(k, min_size):
+    top, stats = top_k_weighted_cliques(_worker_graph, k=k, min_size=min_size)
+    return {'cliques': [[nodes, weight] for nodes, weight in top], 'total': stats['cliques'],
+            'total_exact': stats['exact'], 'max_size': stats['max_size'], 'maximum_cliques': stats['maximum_cliques']}
+
+
+def _int_param(params, name, default, minimum=0):
+    value = params.get(name, [None])[0]
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise QueryError(f"Parameter '{name}' must be an integer")
+    if value < minimum:
+        raise QueryError(f"Parameter '{name}' must be at least {minimum}")
+    return value
+
+
+def _required_param(params, name):
+    if name not in params:
+        raise QueryError(f"Missing parameter '{name}'")
+    return params[name][0]
+
+
+class GraphServer:
+    """
+    Local HTTP service answering graph queries from a GraphIndex.
+
+    Lookups (top-k centralities, node statistics, radius-1 ego networks, k-cores, group degree and
+    closeness) run on the event loop from the in-memory indexes. CPU-heavy queries (ego networks of
+    radius > 1, group betweenness, cliques) are sent to a process pool whose workers load the graph
+    once, so the loop keeps serving lookups meanwhile.
+
+    Endpoints (GET, JSON responses):
+        /health
+        /centrality?measure=betweenness&k=10
+        /node?name=Tyrion
+        /ego?node=Tyrion&radius=1
+        /kcore?k=5
+        /group?members=Jon,Arya,Sansa&measures=degree,closeness,betweenness
+        /cliques?k=10&min_size=3
+
+    Args:
+        index (GraphIndex): The precomputed indexes.
+        n_workers (int, optional): Worker processes for heavy queries. Defaults to None (os.cpu_count()).
+        nodes_path (str, optional): Nodes CSV the workers load. Defaults to the dataset one.
+        edges_path (str, optional): Edges CSV the workers load. Defaults to the dataset one.
+    """
+
+    def __init__(self, index, n_workers=None, nodes_path=None, edges_path=None):
+        self.index = index
+        self.pool = ProcessPoolExecutor(max_workers=n_workers or os.cpu_count() or 1, initializer=_init_worker,
+                                        initargs=(nodes_path, edges_path))
+        self.routes = {
+            '/health': self.health,
+            '/centrality': self.centrality,
+            '/node': self.node,
+            '/ego': self.ego,
+            '/kcore': self.k_core,
+            '/group': self.group,
+            '/cliques': self.cliques,
+        }
+
+    async def offload(self, function, *args):
+        """Runs a function of the worker graph in the process pool."""
+        return await asyncio.get_running_loop().run_in_executor(self.pool, function, *args)
+
+    async def health(self, params):
+        G = self.index.G
+        return {'status': 'ok', 'nodes': G.number_of_nodes(), 'edges': G.number_of_edges()}
+
+    async def centrality(self, params):
+        measure = params.get('measure', ['degree'])[0]
+        return {'measure': measure, 'top': self.index.top(measure, _int_param(params, 'k', 10, 1))}
+
+    async def node(self, params):
+        return self.index.node_summary(_required_param(params, 'name'))
+
+    async def ego(self, params):
+        node = self.index.node(_required_param(params, 'node'))
+        radius = _int_param(params, 'radius', 1)
+        if radius <= 1:
+            return self.index.ego(node) if radius == 1 else _ego_summary(node, 0, self.index.G.subgraph([node]))
+        return await self.offload(_worker_ego, node, radius)
+
+    async def k_core(self, params):
+        return self.index.k_core(_int_param(params, 'k', None))
+
+    async def group(self, params):
+        members = [m for m in _required_param(params, 'members').split(',') if m]
+        if not members:
+            raise QueryError("Parameter 'members' must name at least one node")
+        measures = params.get('measures', ['degree,closeness,betweenness'])[0].split(',')
+        unknown = set(measures) - {'degree', 'closeness', 'betweenness'}
+        if unknown:
+            raise QueryError(f"Unknown group measures: {', '.join(sorted(unknown))}")
+        result = self.index.group(members, measures)
+        if 'betweenness' in measures:
+            result['betweenness'] = await self.offload(_worker_group_betweenness, members)
+        return {'members': members, 'centrality': result}
+
+    async def cliques(self, params):
+        return await self.offload(_worker_cliques, _int_param(params, 'k', 10, 1), _int_param(params, 'min_size', 3, 1))
+
+    async def dispatch(self, method, target):
+        """
+        Answers one request.
+
+        Returns:
+            tuple: (status, JSON-serializable body).
+        """
+        url = urlsplit(target)
+        handler = self.routes.get(url.path)
+        if handler is None:
+            return 404, {'error': f"Unknown endpoint '{url.path}'", 'endpoints': sorted(self.routes)}
+        if method != 'GET':
+            return 405, {'error': f"Method {method} not allowed"}
+        try:
+            return 200, await handler(parse_qs(url.query))
+        except QueryError as e:
+            return e.status, {'error': str(e)}
+        except Exception as e:
+            return 500, {'error': f"{type(e).__name__}: {e}"}
+
+    async def handle_connection(self, reader, writer):
+        """Serves HTTP/1.1 requests on one connection, keeping it open unless asked to close."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 431, {'error': "Request head too large"}, False)
+                    break
+
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, _ = lines[0].split(' ', 2)
+                except ValueError:
+                    await self._respond(writer, 400, {'error': "Malformed request line"}, False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    await self._respond(writer, 400, {'error': "Invalid Content-Length"}, False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': "Request body too large"}, False)
+                    break
+                if length:
+                    await reader.readexactly(length)
+
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                status, body = await self.dispatch(method, target)
+                await self._respond(writer, status, body, keep_alive)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _respond(self, writer, status, body, keep_alive):
+        reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                   413: 'Payload Too Large', 431: 'Request Header Fields Too Large', 500: 'Internal Server Error'}
+        payload = json.dumps(body, default=str).encode()
+        writer.write(f"HTTP/1.1 {status} {reasons.get(status, '')}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(payload)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload)
+        await writer.drain()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        """
+        Listens on a TCP address, or on a Unix socket when unix_path is given, until cancelled.
+        """
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_path, limit=MAX_HEAD_BYTES)
+            where = unix_path
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEAD_BYTES)
+            where = f"http://{host}:{server.sockets[0].getsockname()[1]}"
+        print(f"Serving on {where}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            if unix_path and os.path.exists(unix_path):
+                os.remove(unix_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local query server for the Game of Thrones network.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"Address to listen on (default: {DEFAULT_HOST}).")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"TCP port (default: {DEFAULT_PORT}).")
+    parser.add_argument('--unix', default=None, metavar='PATH', help="Listen on this Unix socket instead of TCP.")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes for heavy queries and the startup centralities (default: number of CPUs).")
+    parser.add_argument('--nodes', default=None, help="Nodes CSV (default: dataset/got-nodes.csv).")
+    parser.add_argument('--edges', default=None, help="Edges CSV (default: dataset/got-edges.csv).")
+    args = parser.parse_args()
+
+    try:
+        G = load_graph_from_dataset(args.nodes, args.edges)
+        index = GraphIndex(G, n_workers=args.workers)
+        print(f"Indexed {G.number_of_nodes()} nodes and {G.number_of_edges()} edges")
+        server = GraphServer(index, n_workers=args.workers, nodes_path=args.nodes, edges_path=args.edges)
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"Error: {e}")
@@ -0,0 +1,111 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+
+# Bump when the on-disk layout changes so stale snapshots are rebuilt
+SNAPSHOT_VERSION = 1
+
+# Label states stored per node: no 'label' attribute, a string label, or a missing (NA) label
+NO_LABEL, HAS_LABEL, MISSING_LABEL = 0, 1, 2
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """
+    Computes the SHA-256 digest of a file's contents.
+
+    Args:
+        path (str): Path to the file.
+        chunk_size (int, optional): Number of bytes read at a time. Defaults to 1 MiB.
+
+    Returns:
+        str: The hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_dir(nodes_path, edges_path):
+    """
+    Returns the folder holding the binary snapshot of a nodes/edges CSV pair.
+    The snapshot lives in a '.cache' folder next to the edges CSV.
+    """
+    nodes_name = os.path.splitext(os.path.basename(nodes_path))[0]
+    edges_name = os.path.splitext(os.path.basename(edges_path))[0]
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(edges_path)), '.cache')
+    return os.path.join(cache_dir, f"{nodes_name}+{edges_name}.snapshot")
+
+
+def write_snapshot(path, digests, ids, labels, sources, targets, weights):
+    """
+    Writes a graph snapshot as uncompressed .npy files so that it can be memory-mapped.
+
+    Args:
+        path (str): Snapshot folder, as returned by snapshot_dir.
+        digests (dict): Content digests of the source CSV files.
+        ids (list): Node ids, in graph insertion order.
+        labels (list): (label, label state) pairs aligned with ids. Nodes that only appear
+            in the edges file have the NO_LABEL state, NA labels have the MISSING_LABEL state.
+        sources (numpy.ndarray): Source node index of each edge row.
+        targets (numpy.ndarray): Target node index of each edge row.
+        weights (numpy.ndarray): Weight of each edge row.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    label_state = np.array([state for _, state in labels], dtype=np.int8)
+    label_text = np.array([text if state == HAS_LABEL else '' for text, state in labels], dtype=str)
+
+    index_dtype = np.int32 if len(ids) < np.iinfo(np.int32).max else np.int64
+    edges = np.column_stack([sources, targets]).astype(index_dtype, copy=False).reshape(-1, 2)
+
+    np.save(os.path.join(tmp_path, 'ids.npy'), np.array(ids, dtype=str))
+    np.save(os.path.join(tmp_path, 'labels.npy'), label_text)
+    np.save(os.path.join(tmp_path, 'label_state.npy'), label_state)
+    np.save(os.path.join(tmp_path, 'edges.npy'), edges)
+    np.save(os.path.join(tmp_path, 'weights.npy'), np.asarray(weights))
+
+    # The metadata file is written last: a snapshot without it is incomplete
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump({'version': SNAPSHOT_VERSION, 'digests': digests,
+                   'nodes': len(ids), 'edges': len(edges)}, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path, digests):
+    """
+    Memory-maps a graph snapshot if it exists and was built from CSV files with the given digests.
+
+    Args:
+        path (str): Snapshot folder, as returned by snapshot_dir.
+        digests (dict): Content digests of the current source CSV files.
+
+    Returns:
+        dict: The memory-mapped arrays ('ids', 'labels', 'label_state', 'edges', 'weights'),
+              or None if the snapshot is missing or stale.
+    """
+    meta_path = os.path.join(path, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if meta.get('version') != SNAPSHOT_VERSION or meta.get('digests') != digests:
+        return None
+
+    try:
+        return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+                for name in ('ids', 'labels', 'label_state', 'edges', 'weights')}
+    except (OSError, ValueError):
+        return None
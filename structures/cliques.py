@@ -1,55 +1,196 @@
 import sys
 import os
+import heapq
 import networkx as nx
 import matplotlib.pyplot as plt
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils import load_graph_from_dataset
+from rendering import show_figure
+from layout_cache import get_layout
+from instrumentation import traced, count
+from memo import memoize
+
+def _greedy_coloring_bound(candidates, adjacency):
+    """
+    Upper bound on the size of the largest clique among candidates: the number of colors of a
+    greedy coloring of the subgraph they induce.
+    """
+    colors = {}
+    for v in candidates:
+        used = {colors[u] for u in adjacency[v] if u in colors}
+        color = 0
+        while color in used:
+            color += 1
+        colors[v] = color
+    return max(colors.values(), default=-1) + 1
+
+
+def _extension_weight_bound(clique_weights, candidates, adjacency, weights, j):
+    """
+    Upper bound on the weight added by extending a clique with j of the candidates: each candidate
+    contributes its weight towards the clique plus half of its j - 1 heaviest edges to other candidates.
+    """
+    gains = []
+    for v in candidates:
+        inner = sorted((weights[v][u] for u in adjacency[v] if u in candidates), reverse=True)[:j - 1]
+        gains.append(clique_weights[v] + sum(inner) / 2)
+    return sum(sorted(gains, reverse=True)[:j])
+
+
+@traced
+@memoize(version=2)
+def top_k_weighted_cliques(G, k=10, min_size=3, count_all=True):
+    """
+    Streams the cliques of a graph and keeps the k best ones by (number of nodes, total edge weight).
+
+    Cliques are enumerated once each by a depth-first search over degree-ordered forward
+    neighborhoods; only a size-k heap, the largest cliques and running counters are kept in memory.
+    A branch is skipped when a greedy coloring of its candidates shows it cannot reach the current
+    maximum clique size and, for the heap, when its size bound is below the heap minimum or its
+    weight bound cannot beat it. The pruning only applies to the heap: skipped branches are still
+    walked in count-only mode, over bitset candidates and without building their cliques, so that
+    the clique count stays exact. Without count_all they are not walked and the count is a lower bound.
+    Ties go to the lexicographically first clique in node order, as in nx.enumerate_all_cliques.
+
+    Args:
+        G (networkx.Graph): Input graph with edge weights.
+        k (int, optional): Number of cliques to keep. Defaults to 10.
+        min_size (int, optional): Smallest clique size counted and ranked. Defaults to 3.
+        count_all (bool, optional): Whether to count the cliques of skipped branches. Defaults to True.
+
+    Returns:
+        tuple: (top, stats) where top is a list of (nodes, total weight) sorted best first, and stats
+               holds 'cliques' (number of cliques with at least min_size nodes, a lower bound unless
+               'exact'), 'exact', 'max_size' and 'maximum_cliques' (every clique of the maximum size,
+               if at least min_size).
+    """
+    # Rank nodes by degree so that every clique is found once, from its lowest-ranked node
+    order = sorted(G.nodes(), key=lambda v: (G.degree(v), str(v)))
+    rank = {v: i for i, v in enumerate(order)}
+    adjacency = [{rank[u] for u in G[v] if u != v} for v in order]
+    forward = [{u for u in adjacency[i] if u > i} for i in range(len(order))]
+    weights = [{rank[u]: data.get('weight', 1) for u, data in G[v].items()} for v in order]
+
+    # Cliques are reported with their nodes in graph order; ties go to the lexicographically first one
+    position = {v: i for i, v in enumerate(G.nodes())}
+
+    heap = []
+    stats = {'cliques': 0, 'exact': count_all, 'max_size': 0, 'maximum_cliques': []}
+
+    def record(clique, weight):
+        clique = sorted(clique, key=position.get)
+        size = len(clique)
+        stats['cliques'] += 1
+        if size > stats['max_size']:
+            stats['max_size'] = size
+            stats['maximum_cliques'] = [list(clique)]
+        elif size == stats['max_size']:
+            stats['maximum_cliques'].append(list(clique))
+        entry = (size, weight, tuple(-position[v] for v in clique), clique)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry[:3] > heap[0][:3]:
+            heapq.heapreplace(heap, entry)
+
+    def count_bits(size, candidates, local_forward):
+        # Counts the cliques of size + 1 nodes and more whose extra nodes are drawn from the candidate bits
+        total = 0
+        while candidates:
+            low = candidates & -candidates
+            candidates ^= low
+            if size + 1 >= min_size:
+                total += 1
+            rest = candidates & local_forward[low.bit_length() - 1]
+            if rest:
+                total += count_bits(size + 1, rest, local_forward)
+        return total
+
+    def count_only(size, candidates):
+        # Bitsets indexed within the candidate set, so their size follows the branch and not the graph
+        local = sorted(candidates)
+        index = {v: i for i, v in enumerate(local)}
+        local_forward = [sum(1 << index[u] for u in forward[v] & candidates) for v in local]
+        return count_bits(size, (1 << len(local)) - 1, local_forward)
+
+    def size_verdict(bound):
+        # True: the branch may matter; False: it cannot; None: it depends on its weight
+        if bound < min_size:
+            return False
+        if bound >= stats['max_size'] or len(heap) < k or bound > heap[0][0]:
+            return True
+        if bound < heap[0][0]:
+            return False
+        return None
+
+    def can_improve(clique, weight, candidates, clique_weights):
+        # Cheap size bound first, then the coloring bound
+        verdict = size_verdict(len(clique) + len(candidates))
+        if verdict:
+            verdict = size_verdict(len(clique) + _greedy_coloring_bound(candidates, adjacency))
+        if verdict is None:
+            # Only cliques of exactly the heap minimum size can enter: bound their weight
+            j = heap[0][0] - len(clique)
+            bound = weight + _extension_weight_bound(clique_weights, candidates, adjacency, weights, j)
+            # An equal weight may still win the tie
+            verdict = bound >= heap[0][1]
+        return verdict
+
+    def extend(clique, weight, candidates):
+        if len(clique) >= min_size:
+            record([order[v] for v in clique], weight)
+        for v in sorted(candidates):
+            child = clique + [v]
+            child_weight = weight + sum(weights[v][u] for u in clique)
+            child_candidates = candidates & forward[v]
+            clique_weights = {u: sum(weights[u][c] for c in child) for u in child_candidates}
+            if can_improve(child, child_weight, child_candidates, clique_weights):
+                extend(child, child_weight, child_candidates)
+            elif count_all:
+                if len(child) >= min_size:
+                    stats['cliques'] += 1
+                stats['cliques'] += count_only(len(child), child_candidates)
+
+    for v in range(len(order)):
+        extend([v], 0, forward[v])
+
+    stats['maximum_cliques'].sort(key=lambda clique: [position[v] for v in clique])
+    top = [(clique, weight) for _, weight, _, clique in sorted(heap, reverse=True)]
+    count('cliques', stats['cliques'])
+    return top, stats
+
 
 # Function to find and print the top 10 weighted cliques with individual contributions
-def print_top_10_weighted_cliques_with_contributions(G):
+@traced
+def print_top_10_weighted_cliques_with_contributions(G, count_all=True):
     """
     Finds cliques in the graph, calculates their comprehensive weight,
     and prints the top 10 based on the total clique weight along with individual edge weights.
-    
+    Cliques are streamed through a bounded heap (see top_k_weighted_cliques), and edge
+    contributions are computed for the 10 winners only.
+
     Args:
         G (networkx.Graph): Input graph with edge weights.
+        count_all (bool, optional): Whether to count every clique exactly; otherwise the printed
+            count is a lower bound. Defaults to True.
+
+    Returns:
+        list: The cliques of maximum size.
     """
-    cliques = []
-    maximal_cliques = []
-    max_clique_size = 0
-    
-    # Iterate through all cliques in the graph
-    for clique in nx.enumerate_all_cliques(G):
-        if len(clique) >= 3:  
-            # Check for maximal cliques 
-            if len(clique) > max_clique_size:
-                max_clique_size = len(clique)
-                maximal_cliques = [clique]
-            elif len(clique) == max_clique_size:
-                maximal_cliques.append(clique)
-            
-            # Calculate the total weight of the clique
-            total_weight = 0
-            edge_weights = []
-            for i in range(len(clique)):
-                for j in range(i + 1, len(clique)):
-                    edge_weight = G[clique[i]][clique[j]]["weight"]
-                    total_weight += edge_weight
-                    edge_weights.append((clique[i], clique[j], edge_weight))
-
-            cliques.append((clique, total_weight, edge_weights))
+    top, stats = top_k_weighted_cliques(G, k=10, min_size=3, count_all=count_all)
+    maximal_cliques = stats['maximum_cliques']
+    max_clique_size = stats['max_size']
 
     # Print the number of cliques and maximal cliques
-    print(f"\nThe number of cliques found is {len(cliques)} of which {len(maximal_cliques)} are maximal.")
+    found = stats['cliques'] if stats['exact'] else f"at least {stats['cliques']}"
+    print(f"\nThe number of cliques found is {found} of which {len(maximal_cliques)} are maximal.")
     print(f"The maximal cliques in this network are composed of {max_clique_size} elements and are {len(maximal_cliques)}.")
 
-    # Sort cliques first by number of nodes (descending) and then by total weight (descending)
-    sorted_cliques = sorted(cliques, key=lambda x: (len(x[0]), x[1]), reverse=True)[:10]
-    
     # Print the top 10 cliques with edge contributions
     print("\nTop 10 cliques ordered by number of nodes and comprehensive clique weight:")
-    for i, (nodes, total_weight, edge_weights) in enumerate(sorted_cliques, 1):
+    for i, (nodes, total_weight) in enumerate(top, 1):
+        edge_weights = [(nodes[a], nodes[b], G[nodes[a]][nodes[b]]["weight"])
+                        for a in range(len(nodes)) for b in range(a + 1, len(nodes))]
         print(f"{i}. Nodes: {nodes}")
         print(f"   Number of nodes: {len(nodes)}")
         print(f"   Comprehensive clique weight: {total_weight}")
@@ -58,10 +199,11 @@ def print_top_10_weighted_cliques_with_contributions(G):
             print(f"   {edge[0]}-{edge[1]}: {edge[2]}")
         print()
 
-    return maximal_cliques  
+    return maximal_cliques
 
 
 # Function to plot the subgraph of each maximal clique
+@traced(category='render')
 def plot_maximal_cliques(G, maximal_cliques):
     """
     Plots a subgraph for each maximal clique in the graph and displays edge weights.
@@ -73,7 +215,7 @@ def plot_maximal_cliques(G, maximal_cliques):
     for i, clique in enumerate(maximal_cliques, 1):
         subgraph = G.subgraph(clique)
         plt.figure(figsize=(8, 6))
-        pos = nx.spring_layout(subgraph)  
+        pos = get_layout(subgraph, 'spring')  
         nx.draw(subgraph, pos, with_labels=True, node_size=3000, node_color='skyblue', font_size=12, font_weight='bold')
         
         # Draw edge weights
@@ -81,7 +223,7 @@ def plot_maximal_cliques(G, maximal_cliques):
         nx.draw_networkx_edge_labels(subgraph, pos, edge_labels=edge_labels, font_size=10, font_color='red')
 
         plt.title(f"Maximal Clique {i} (Size: {len(clique)})")
-        plt.show()
+        show_figure()
 
 
 if __name__ == "__main__":
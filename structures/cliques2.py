@@ -5,13 +5,32 @@ import matplotlib.pyplot as plt
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils import load_graph_from_dataset
+from rendering import show_figure, draw_figures, GRAPH
+from layout_cache import get_layout, LARGE_GRAPH_NODES
+from instrumentation import traced
+from memo import memoize
+
+@traced
+@memoize
+def maximal_cliques(G):
+    """
+    Finds the maximal cliques of the graph using Bron-Kerbosch.
+
+    Args:
+        G (networkx.Graph): Input graph.
 
+    Returns:
+        list: The maximal cliques, as lists of nodes.
+    """
+    return list(nx.find_cliques(G))
+
+@traced
 def print_clique_analysis(G):
     """
     Finds maximal cliques using Bron-Kerbosch, identifies the largest cliques, 
     and prints their properties.
     """
-    massimal_cliques = list(nx.find_cliques(G))
+    massimal_cliques = maximal_cliques(G)
     
     max_clique_size = max(len(clique) for clique in massimal_cliques)
     
@@ -23,6 +42,7 @@ def print_clique_analysis(G):
     
     return massimal_cliques, maximal_size_cliques
 
+@traced(category='render')
 def plot_cliques(G, cliques, title):
     """
     Plots subgraphs for the given cliques.
@@ -30,13 +50,14 @@ def plot_cliques(G, cliques, title):
     for i, clique in enumerate(cliques, 1):
         subgraph = G.subgraph(clique)
         plt.figure(figsize=(8, 6))
-        pos = nx.spring_layout(subgraph)
+        pos = get_layout(subgraph, 'spring')
         nx.draw(subgraph, pos, with_labels=True, node_size=3000, node_color='skyblue', font_size=12, font_weight='bold')
         edge_labels = {(u, v): G[u][v]["weight"] for u, v in subgraph.edges()}
         nx.draw_networkx_edge_labels(subgraph, pos, edge_labels=edge_labels, font_size=10, font_color='red')
         plt.title(f"{title} {i} (Size: {len(clique)} nodes)")
-        plt.show()
+        show_figure()
 
+@traced(category='render')
 def visualize_network_with_maximal_clique_improved(G, maximal_clique):
     """
     Visualizes the entire network with the maximal clique in red.
@@ -47,7 +68,8 @@ def visualize_network_with_maximal_clique_improved(G, maximal_clique):
     """
     plt.figure(figsize=(14, 10))
 
-    pos = nx.kamada_kawai_layout(G)
+    # Kamada-Kawai needs O(n^2) memory: large graphs get the sparse stress layout instead
+    pos = get_layout(G, 'kamada_kawai' if G.number_of_nodes() <= LARGE_GRAPH_NODES else 'pivot_mds')
 
     nx.draw_networkx_nodes(
         G, pos, node_size=200, node_color="lightgray", alpha=0.6, label="Other nodes"
@@ -75,7 +97,7 @@ def visualize_network_with_maximal_clique_improved(G, maximal_clique):
     plt.legend(scatterpoints=1, loc='best')
     plt.title("Network with maximal clique", fontsize=16)
     plt.axis('off')
-    plt.show()
+    show_figure()
 
 
 
@@ -88,13 +110,13 @@ if __name__ == "__main__":
         
         maximal_clique = ["Tyrion", "Cersei", "Gregor", "Joffrey", "Sandor", "Ilyn", "Meryn"]
 
-        visualize_network_with_maximal_clique_improved(G, maximal_clique)
-
-        print("\nVisualizing maximal cliques:")
-        plot_cliques(G, massimal_cliques[:5], "Massimal clique")
-        
-        print("\nVisualizing cliques of maximal size:")
-        plot_cliques(G, maximal_size_cliques, "Maximal size xlique")
+        # The three plots are independent render jobs, drawn concurrently in headless mode
+        print("\nVisualizing the maximal clique, maximal cliques and cliques of maximal size")
+        draw_figures([
+            ('cliques2:visualize_network_with_maximal_clique_improved', (GRAPH, maximal_clique), {}),
+            ('cliques2:plot_cliques', (GRAPH, massimal_cliques[:5], "Massimal clique"), {}),
+            ('cliques2:plot_cliques', (GRAPH, maximal_size_cliques, "Maximal size xlique"), {}),
+        ], G)
 
     except Exception as e:
         print(f"Error: {e}")
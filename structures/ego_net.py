@@ -1,12 +1,28 @@
 import sys
 import os
+from concurrent.futures import ProcessPoolExecutor
 import networkx as nx
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
 import matplotlib.pyplot as plt
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils import load_graph_from_dataset
+from rendering import show_figure, draw_figures, GRAPH
+from layout_cache import get_layout
+from csr_graph import CSRGraph
+from triangles import iter_triangles, row_blocks
+from instrumentation import traced
+
+# Wedges per block of the sparse radius-2 reach computation
+REACH_BATCH_WEDGES = 1 << 22
+
+# Compact graph of the worker processes, received once through the pool initializer
+_worker_graph = None
 
 # Function to generate and display the ego network of a specific node
+@traced(category='render')
 def display_ego_network(G, node):
     """
     Creates and visualizes the ego network of a specific node.
@@ -28,22 +44,168 @@ def display_ego_network(G, node):
 
     # Plot the ego network
     plt.figure(figsize=(8, 6))
-    pos = nx.spring_layout(ego_net, seed=42)  
+    pos = get_layout(ego_net, 'spring', seed=42)  
     node_colors = ['lightcoral' if n == node else 'lightblue' for n in ego_net.nodes()]
     nx.draw(ego_net, pos, with_labels=True, node_size=1000, node_color=node_colors, font_size=12, font_weight='bold', edge_color='gray', width=2)
     plt.title(f"Ego network of {node}", fontsize=16, fontweight='bold')
     plt.axis('off')  
     plt.tight_layout()  
-    plt.show()
+    show_figure()
+
+
+def _radius_one_statistics(csr):
+    """
+    Ego statistics for radius 1 from closed forms: the ego network of v has deg(v) + 1 nodes and
+    deg(v) + triangles(v) edges, whose weight is the strength of v plus the weight of the edge
+    opposite v in each of its triangles.
+    """
+    n = csr.number_of_nodes
+    rows = np.repeat(np.arange(n), np.diff(csr.indptr))
+    not_loop = rows != csr.indices
+    degree = np.bincount(rows[not_loop], minlength=n)
+    weight = np.bincount(rows[not_loop], weights=csr.weights[not_loop].astype(np.float64), minlength=n)
+
+    triangles = np.zeros(n, dtype=np.int64)
+    for nodes, weights in iter_triangles(csr):
+        triangles += np.bincount(nodes.ravel(), minlength=n)
+        # Edge opposite a is b-c, opposite b is c-a, opposite c is a-b
+        opposite = weights[:, [1, 2, 0]].astype(np.float64)
+        weight += np.bincount(nodes.ravel(), weights=opposite.ravel(), minlength=n)
+    return degree + 1, degree + triangles, weight, degree, triangles
+
+
+def _radius_two_reach(csr):
+    """
+    Number of nodes within two hops of every node (the node itself excluded), from the nonzero
+    pattern of A + A @ A computed in row blocks.
+    """
+    n = csr.number_of_nodes
+    rows = np.repeat(np.arange(n), np.diff(csr.indptr))
+    not_loop = rows != csr.indices
+    adjacency = sp.csr_matrix((np.ones(int(not_loop.sum()), dtype=np.int32),
+                               (rows[not_loop], csr.indices[not_loop])), shape=(n, n))
+    degree = np.diff(adjacency.indptr)
+    # Work of a row: the sizes of the neighborhoods it gathers
+    work = np.bincount(rows[not_loop], weights=degree[csr.indices[not_loop]], minlength=n) + degree
+    reach = np.zeros(n, dtype=np.int64)
+    for start, end in row_blocks(work, REACH_BATCH_WEDGES):
+        block = adjacency[start:end]
+        within = (block @ adjacency + block).tocsr()
+        within.setdiag(0, k=start)
+        within.eliminate_zeros()
+        reach[start:end] = np.diff(within.indptr)
+    return reach
+
+
+def _init_worker(csr):
+    global _worker_graph
+    _worker_graph = csr
+
+
+def _ego_chunk(nodes, radius):
+    """
+    Ego statistics of a chunk of node ids for any radius: a truncated BFS gives the ball of each
+    node and an edge mask over its rows gives the edges of the ego network, without building it.
+
+    Returns:
+        numpy.ndarray: (len(nodes), 4) array with nodes, edges, total weight and radius-2 reach.
+    """
+    csr = _worker_graph
+    n = csr.number_of_nodes
+    inside = np.zeros(n, dtype=bool)
+    result = np.zeros((len(nodes), 4), dtype=np.float64)
+    for i, v in enumerate(nodes):
+        # Deep enough for the radius-2 reach too, even for radius 0
+        dist = csr.bfs(int(v), max_depth=max(radius, 2))
+        ball = np.flatnonzero((dist >= 0) & (dist <= radius))
+        inside[ball] = True
+
+        starts = csr.indptr[ball]
+        counts = csr.indptr[ball + 1] - starts
+        total = int(counts.sum())
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        positions = np.repeat(starts, counts) + offsets
+        neighbors = csr.indices[positions]
+        # Both endpoints in the ball; every edge is seen from both of its endpoints
+        kept = inside[neighbors] & (neighbors != np.repeat(ball, counts))
+        result[i] = (len(ball), kept.sum() / 2, csr.weights[positions][kept].sum() / 2,
+                     np.count_nonzero((dist >= 1) & (dist <= 2)))
+        inside[ball] = False
+    return result
+
+
+@traced
+def ego_statistics(G, radius=1, n_workers=None):
+    """
+    Computes ego-network statistics for every node, without building any ego network.
+
+    For radius 1 all statistics come from closed forms over the degree, strength and triangle
+    counts, plus one sparse product for the radius-2 reach. For larger radii each worker runs a
+    truncated BFS per node over the shared CSR arrays and counts the edges inside the ball.
+    Self-loops are ignored.
+
+    Args:
+        G (networkx.Graph or CSRGraph): Input graph with edge weights.
+        radius (int, optional): Radius of the ego networks, as in nx.ego_graph. Defaults to 1.
+        n_workers (int, optional): Worker processes for radius > 1. Defaults to None (os.cpu_count()).
+
+    Returns:
+        pandas.DataFrame: One row per node with the 'nodes', 'edges', 'density', 'total_weight' and
+                          'mean_weight' of its ego network, its 'clustering' coefficient and its
+                          'reach_2' (number of nodes within two hops).
+    """
+    csr = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+    n = csr.number_of_nodes
+    size, edges, weight, degree, triangles = _radius_one_statistics(csr)
+
+    if radius == 1:
+        reach = _radius_two_reach(csr)
+    else:
+        n_workers = max(1, min(n_workers or os.cpu_count() or 1, n))
+        chunks = [chunk for chunk in np.array_split(np.arange(n), n_workers * 4) if len(chunk)]
+        if n_workers == 1:
+            _init_worker(csr)
+            parts = [_ego_chunk(chunk, radius) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(csr,)) as executor:
+                parts = list(executor.map(_ego_chunk, chunks, [radius] * len(chunks)))
+        table = np.concatenate(parts) if parts else np.zeros((0, 4))
+        size, edges, weight, reach = table[:, 0], table[:, 1], table[:, 2], table[:, 3]
+
+    size = np.asarray(size, dtype=np.int64)
+    edges = np.asarray(edges, dtype=np.int64)
+    pairs = size * (size - 1) / 2
+    wedges = degree * (degree - 1) / 2
+    df = pd.DataFrame({
+        'nodes': size,
+        'edges': edges,
+        'density': np.divide(edges, pairs, out=np.zeros(n), where=pairs > 0),
+        'total_weight': weight,
+        'mean_weight': np.divide(weight, edges, out=np.zeros(n), where=edges > 0),
+        'clustering': np.divide(triangles, wedges, out=np.zeros(n), where=wedges > 0),
+        'reach_2': np.asarray(reach, dtype=np.int64),
+    }, index=pd.Index(csr.ids, name='node'))
+    if np.issubdtype(csr.weights.dtype, np.integer):
+        df['total_weight'] = df['total_weight'].round().astype(np.int64)
+    return df
+
 
 if __name__ == "__main__":
     try:
         G = load_graph_from_dataset()
 
+        # Ego statistics of every character
+        stats = ego_statistics(G)
+        print("Largest ego networks:")
+        print(stats.sort_values(['nodes', 'total_weight'], ascending=False).head(10).to_string())
+        print("\nHeaviest ego networks:")
+        print(stats.sort_values('total_weight', ascending=False).head(10).to_string())
+        print()
+
         nodes_of_interest = ['Jon','Daenerys']
 
-        for node in nodes_of_interest:
-            display_ego_network(G, node)
+        # One render job per ego network, drawn concurrently in headless mode
+        draw_figures([('ego_net:display_ego_network', (GRAPH, node), {}) for node in nodes_of_interest], G)
 
     except Exception as e:
         print(f"Error: {e}")
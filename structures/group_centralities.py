@@ -1,91 +1,303 @@
 import sys
 import os
-import networkx as nx
 import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
+import numpy as np
+import scipy.sparse as sp
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils import load_graph_from_dataset
+from csr_graph import CSRGraph
+from distances import DistanceMatrix
+from rendering import show_figure
+from instrumentation import traced
+from memo import memoize
+
+# Upper bound on the number of floats held per batch of groups in group_betweenness_centralities
+GROUP_BATCH_CELLS = 1 << 24
+
+# Houses
+HOUSES = {
+    'Stark': ['Eddard','Catelyn','Robb','Sansa','Arya','Bran','Rickon','Jon'],
+    'Lannister': ['Tywin','Cersei','Jaime','Tyrion','Joffrey','Lancel','Kevan','Tommen','Myrcella','Gregor','Ilyn','Meryn'],
+    'Targaryen': ['Aerys','Rhaegar','Viserys','Daenerys','Aegon','Drogo','Jorah','Missandei','Rakharo','Kraznys','Worm'],
+    'Baratheon': ['Robert','Stannis','Renly','Shireen','Davos','Melisandre','Gendry','Salladhor','Cressen'],
+    'Tyrell': ['Mace','Olenna','Margaery','Loras'],
+    'Martell': ['Doran','Oberyn','Ellaria','Elia'],
+    'Greyjoy': ['Balon','Theon'],
+    'Tully': ['Catelyn','Edmure','Hoster','Lysa','Brynden','Roslin']
+}
+
+
+def _membership_matrix(csr, groups):
+    """
+    Builds the sparse (groups x nodes) membership matrix of a dict of groups.
+    Repeated members are counted once.
+    """
+    rows, cols = [], []
+    for i, members in enumerate(groups.values()):
+        ids = np.unique(csr.node_ids(members))
+        rows.append(np.full(len(ids), i, dtype=np.int64))
+        cols.append(ids)
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    cols = np.concatenate(cols) if cols else np.zeros(0, dtype=np.int64)
+    return sp.csr_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)),
+                         shape=(len(groups), csr.number_of_nodes))
+
+
+@traced
+def group_degree_centralities(G, groups):
+    """
+    Computes the group degree centrality of many groups at once.
+
+    The neighborhood union of every group is obtained with one sparse product between the
+    membership matrix and the adjacency matrix; GDC is the fraction of non-members adjacent to the group.
+
+    Args:
+        G (networkx.Graph or CSRGraph): Input graph.
+        groups (dict): Maps group names to lists of member nodes (all members must be in G).
+
+    Returns:
+        dict: Maps group names to their group degree centrality.
+    """
+    csr = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+    n = csr.number_of_nodes
+    membership = _membership_matrix(csr, groups)
+    adjacency = sp.csr_matrix((np.ones(len(csr.indices), dtype=np.int8), csr.indices, csr.indptr), shape=(n, n))
+
+    reached = (membership.astype(np.int64) @ adjacency).tocsr()
+    reached.data[:] = 1
+    # Nodes adjacent to the group, minus the members adjacent to other members
+    connected = np.diff(reached.indptr) - np.asarray(reached.multiply(membership).sum(axis=1)).ravel()
+    non_group = n - np.diff(membership.indptr)
+
+    return {name: (float(connected[i] / non_group[i]) if non_group[i] > 0 else 0)
+            for i, name in enumerate(groups)}
+
+
+@traced
+def group_closeness_centralities(G, groups, distances=None):
+    """
+    Computes the group closeness centrality of many groups, with one multi-source BFS per group.
+
+    The BFS is seeded at all members, so it yields the distance from every non-member to its
+    nearest member directly. GCC is 0 when some non-member cannot reach the group.
+
+    Args:
+        G (networkx.Graph or CSRGraph): Input graph.
+        groups (dict): Maps group names to lists of member nodes (all members must be in G).
+        distances (numpy.ndarray or DistanceMatrix, optional): Precomputed (n, n) hop distances between
+            node ids, -1 for unreachable pairs, or a DistanceMatrix (weighted when it holds lengths); the
+            distance to the nearest member is then a column-wise minimum over the rows of the members
+            instead of a BFS. Defaults to None.
+
+    Returns:
+        dict: Maps group names to their group closeness centrality.
+    """
+    csr = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+    closeness = {}
+    for name, members in groups.items():
+        if distances is None:
+            dist = csr.multi_source_bfs(csr.node_ids(members))
+        elif isinstance(distances, DistanceMatrix):
+            dist = distances.nearest(csr.node_ids(members))
+        else:
+            rows = distances[np.unique(csr.node_ids(members))]
+            unreachable = np.all(rows < 0, axis=0)
+            dist = np.where(rows < 0, np.iinfo(rows.dtype).max, rows).min(axis=0)
+            dist[unreachable] = -1
+        outside = dist[dist != 0]
+        if np.any(outside < 0):
+            # An unreachable non-member makes the total distance infinite
+            closeness[name] = 0.0
+            continue
+        total_distance = outside.sum().item()
+        closeness[name] = len(outside) / total_distance if total_distance > 0 else 0
+    return closeness
+
+
+@traced
+@memoize(version=2)
+def group_centralities_table(G, groups, betweenness=True, distances=None):
+    """
+    Scores a batch of candidate groups (e.g. every house plus generated variants) in one call.
+
+    Args:
+        G (networkx.Graph or CSRGraph): Input graph.
+        groups (dict): Maps group names to lists of member nodes (all members must be in G).
+        betweenness (bool, optional): Whether to also compute GBC, the most expensive measure. Defaults to True.
+        distances (DistanceMatrix, optional): Precomputed shortest paths, read by GCC and GBC instead of
+            their own traversals (weighted when the matrix holds lengths). Defaults to None.
+
+    Returns:
+        pandas.DataFrame: One row per group with the 'GDC', 'GCC' (and 'GBC') columns.
+    """
+    csr = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+    columns = {'GDC': group_degree_centralities(csr, groups),
+               'GCC': group_closeness_centralities(csr, groups, distances)}
+    if betweenness:
+        dags = distances.dag if distances is not None else None
+        columns['GBC'] = group_betweenness_centralities(csr, groups, dags=dags)
+    return pd.DataFrame(columns, index=list(groups))
+
+
+def leave_one_out_variants(groups):
+    """
+    Generates, for every group, the variants obtained by removing one member at a time.
+
+    Args:
+        groups (dict): Maps group names to lists of member nodes.
+
+    Returns:
+        dict: Maps '<group> - <member>' to the remaining members, for groups with at least two members.
+    """
+    variants = {}
+    for name, members in groups.items():
+        unique_members = list(dict.fromkeys(members))
+        if len(unique_members) < 2:
+            continue
+        for member in unique_members:
+            variants[f"{name} - {member}"] = [m for m in unique_members if m != member]
+    return variants
+
 
 def group_degree_centrality(G, group):
-    non_group_nodes = set(G.nodes()) - set(group)
-    connected_nodes = set()
-    for node in non_group_nodes:
-        neighbors = set(G.neighbors(node))
-        if neighbors.intersection(group):
-            connected_nodes.add(node)
-    return len(connected_nodes) / len(non_group_nodes) if len(non_group_nodes) > 0 else 0
+    """
+    Computes the group degree centrality: the fraction of non-members adjacent to at least one member.
+    """
+    return group_degree_centralities(G, {'group': group})['group']
+
 
 def group_closeness_centrality(G, group):
-    non_group_nodes = set(G.nodes()) - set(group)
-    total_distance = 0
-    for node in non_group_nodes:
-        shortest_paths = nx.single_source_shortest_path_length(G, node)
-        distances = [shortest_paths.get(member, float('inf')) for member in group]
-        min_distance = min(distances) if distances else float('inf')
-        total_distance += min_distance
-    return len(non_group_nodes) / total_distance if total_distance > 0 else 0
+    """
+    Computes the group closeness centrality: the number of non-members divided by the sum of
+    their distances to the nearest member.
+    """
+    return group_closeness_centralities(G, {'group': group})['group']
 
-def group_betweenness_centrality(G, group):
-    passing_through_group = 0
+
+@traced
+def group_betweenness_centralities(G, groups, sources=None, dags=None):
+    """
+    Computes the exact group betweenness centrality of many groups with Brandes-style path counting.
+
+    For every ordered pair (s, t) of distinct nodes with t reachable from s, the pair contributes the
+    fraction of shortest s-t paths that contain at least one group member (1 when s or t is a member).
+    The result is the average of that fraction over all such pairs. The number of shortest paths that
+    avoid the group is counted on the shortest-path DAG of each source, so one BFS per source is shared
+    by all groups and the cost is O(n*m) per group instead of one extra BFS per pair.
+
+    Args:
+        G (networkx.Graph or CSRGraph): Input graph.
+        groups (dict): Maps group names to lists of member nodes (all members must be in G).
+        sources (array-like, optional): Node ids of the sources to traverse from. Defaults to None (all
+            nodes, exact); a sample of sources gives an estimate restricted to pairs starting there.
+        dags (callable, optional): Maps a source id to its (dist, sigma, levels), as returned by
+            CSRGraph.shortest_path_dag, e.g. DistanceMatrix.dag (weighted when the matrix holds lengths).
+            Defaults to None (one BFS per source).
+
+    Returns:
+        dict: Maps group names to their group betweenness centrality.
+    """
+    csr = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+    n = csr.number_of_nodes
+    sources = range(n) if sources is None else sources
+    dags = dags or csr.shortest_path_dag
+    names = list(groups)
+    if not names:
+        return {}
+
+    members = np.zeros((len(names), n), dtype=bool)
+    for i, name in enumerate(names):
+        members[i, csr.node_ids(groups[name])] = True
+
+    batch = max(1, GROUP_BATCH_CELLS // max(n, 1))
+    passing = np.zeros(len(names), dtype=np.float64)
     total_paths = 0
-    all_pairs = dict(nx.all_pairs_shortest_path_length(G))
-    
-    for source in all_pairs:
-        for target, _ in all_pairs[source].items():
-            if source == target:
-                continue
-            total_paths += 1
-            path = nx.shortest_path(G, source, target)
-            if any(node in group for node in path):
-                passing_through_group += 1
-    
-    return passing_through_group / total_paths if total_paths > 0 else 0
+
+    for source in sources:
+        dist, sigma, levels = dags(source)
+        reached = np.flatnonzero(dist > 0)
+        total_paths += len(reached)
+        if len(reached) == 0:
+            continue
+
+        # DAG edges of each level grouped by child, shared by every batch of groups
+        level_runs = []
+        for parents, children in levels:
+            starts = np.flatnonzero(np.r_[True, children[1:] != children[:-1]])
+            level_runs.append((parents, starts, children[starts]))
+
+        for lo in range(0, len(names), batch):
+            group_mask = members[lo:lo + batch]
+            outside = ~group_mask
+
+            # Shortest paths from the source that avoid every group member
+            avoiding = np.zeros(group_mask.shape, dtype=np.float64)
+            avoiding[:, source] = outside[:, source]
+            for parents, starts, level_nodes in level_runs:
+                avoiding[:, level_nodes] = np.add.reduceat(avoiding[:, parents], starts, axis=1) \
+                    * outside[:, level_nodes]
+
+            passing[lo:lo + batch] += len(reached) - (avoiding[:, reached] / sigma[reached]).sum(axis=1)
+
+    return {name: (float(passing[i] / total_paths) if total_paths > 0 else 0) for i, name in enumerate(names)}
+
+
+def group_betweenness_centrality(G, group):
+    """
+    Computes the exact group betweenness centrality of a single group.
+    See group_betweenness_centralities for the definition.
+    """
+    return group_betweenness_centralities(G, {'group': group})['group']
+
+
+@traced(category='render')
+def plot_group_centralities_heatmap(df):
+    """
+    Plots the group centralities table as an annotated heatmap.
+
+    Args:
+        df (pandas.DataFrame): Groups as rows and centralities as columns, e.g. from group_centralities_table.
+    """
+    plt.figure(figsize=(6, 5))
+    sns.heatmap(df, annot=True, cmap='Blues', vmin=0, vmax=1, fmt='.3f')
+    plt.title("Group centralities heatmap")
+    plt.yticks(rotation=0)
+    show_figure()
 
 if __name__ == "__main__":
     
     G = load_graph_from_dataset()
 
-    # Houses
-    groups = {
-        'Stark': ['Eddard','Catelyn','Robb','Sansa','Arya','Bran','Rickon','Jon'],
-        'Lannister': ['Tywin','Cersei','Jaime','Tyrion','Joffrey','Lancel','Kevan','Tommen','Myrcella','Gregor','Ilyn','Meryn'],
-        'Targaryen': ['Aerys','Rhaegar','Viserys','Daenerys','Aegon','Drogo','Jorah','Missandei','Rakharo','Kraznys','Worm'],
-        'Baratheon': ['Robert','Stannis','Renly','Shireen','Davos','Melisandre','Gendry','Salladhor','Cressen'],
-        'Tyrell': ['Mace','Olenna','Margaery','Loras'],
-        'Martell': ['Doran','Oberyn','Ellaria','Elia'],
-        'Greyjoy': ['Balon','Theon'],
-        'Tully': ['Catelyn','Edmure','Hoster','Lysa','Brynden','Roslin']
-    }
+    groups = HOUSES
 
     # It calculates and collects the centrality values (GDC, GCC, GBC) for each group
-    group_centralities = {}
+    valid_groups = {}
     for group_name, members in groups.items():
         # Filter the valid members (present in the graph)
         valid_members = [m for m in members if m in G.nodes()]
         if not valid_members:
             # If no member is in the graph skip
             continue
-        
-        gdc = group_degree_centrality(G, valid_members)
-        gcc = group_closeness_centrality(G, valid_members)
-        gbc = group_betweenness_centrality(G, valid_members)
-        
-        group_centralities[group_name] = (gdc, gcc, gbc)
+        valid_groups[group_name] = valid_members
 
+    # Centrality values of every house from batched traversals
+    df = group_centralities_table(G, valid_groups)
 
-    df = pd.DataFrame.from_dict(
-        group_centralities,
-        orient='index',
-        columns=['GDC','GCC','GBC']
-    )
+    # Member whose removal costs each house the most group closeness
+    variants = group_centralities_table(G, leave_one_out_variants(valid_groups), betweenness=False)
+    print("\nMost central member of each house (largest GCC drop when removed):")
+    for group_name in valid_groups:
+        house_variants = variants[variants.index.str.startswith(f"{group_name} - ")]
+        if house_variants.empty:
+            continue
+        weakest = house_variants['GCC'].idxmin()
+        drop = df.loc[group_name, 'GCC'] - house_variants.loc[weakest, 'GCC']
+        print(f"{group_name}: {weakest.split(' - ', 1)[1]} (GCC drop {drop:.3f})")
 
     df = df.reindex(['Stark','Lannister','Targaryen','Baratheon','Tyrell','Martell','Greyjoy','Tully'])
 
     # Heatmap
-    plt.figure(figsize=(6, 5))
-    sns.heatmap(df, annot=True, cmap='Blues', vmin=0, vmax=1, fmt='.3f')
-    plt.title("Group centralities heatmap")
-    plt.yticks(rotation=0)  
-    plt.show()
+    plot_group_centralities_heatmap(df)
@@ -0,0 +1,316 @@
+import sys
+import os
+import heapq
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import load_graph_from_dataset
+from csr_graph import CSRGraph
+from group_centralities import (group_degree_centralities, group_closeness_centralities,
+                                group_betweenness_centralities, HOUSES)
+from instrumentation import traced
+
+# Default number of sampled BFS sources of the betweenness objective
+MAX_SOURCES = 256
+
+# Shortest-path DAG edges kept in memory by the betweenness objective across rounds
+DAG_CACHE_EDGES = 1 << 24
+
+
+class _DegreeObjective:
+    """
+    Number of non-members adjacent to the group, |N(S) minus S|. GDC is this count over n - k.
+    """
+
+    def __init__(self, csr):
+        self.csr = csr
+        self.covered = np.zeros(csr.number_of_nodes, dtype=bool)
+        self.in_group = np.zeros(csr.number_of_nodes, dtype=bool)
+
+    def initial_gains(self, candidates):
+        return self.csr.degree()[candidates].astype(np.float64)
+
+    def gains(self, candidates):
+        gains = []
+        for c in candidates:
+            neighbors = self.csr.neighbors(c)
+            newly_covered = np.count_nonzero(~(self.covered[neighbors] | self.in_group[neighbors]))
+            # A covered candidate stops counting as a covered non-member once it joins
+            gains.append(newly_covered - int(self.covered[c]))
+        return gains
+
+    def add(self, c):
+        self.in_group[c] = True
+        self.covered[self.csr.neighbors(c)] = True
+
+
+class _ClosenessObjective:
+    """
+    Sum over all nodes of (n - distance to the nearest member), a facility-location objective
+    whose maximization minimizes the total distance in group closeness. Nodes that no member
+    reaches are kept at distance n.
+    """
+
+    def __init__(self, csr):
+        self.csr = csr
+        self.n = csr.number_of_nodes
+        self.distance = np.full(self.n, self.n, dtype=np.int64)
+
+    def _improvements(self, c):
+        """
+        BFS from c pruned at nodes that are already at least as close to the group.
+        If d(c, v) >= d(S, v), every node reached through v is at least as close to S too,
+        so only strictly improved nodes are expanded.
+
+        Returns:
+            tuple: (nodes, new distances) of the nodes that get closer to the group by adding c.
+        """
+        csr, distance = self.csr, self.distance
+        visited = np.zeros(self.n, dtype=bool)
+        visited[c] = True
+        if distance[c] == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        nodes, depths = [np.array([c])], [np.array([0])]
+        frontier = np.array([c], dtype=np.int64)
+        depth = 0
+        while len(frontier):
+            depth += 1
+            _, reached = csr.expand(frontier)
+            reached = np.unique(reached[~visited[reached]])
+            visited[reached] = True
+            reached = reached[depth < distance[reached]].astype(np.int64)
+            nodes.append(reached)
+            depths.append(np.full(len(reached), depth))
+            frontier = reached
+        return np.concatenate(nodes), np.concatenate(depths)
+
+    def initial_gains(self, candidates):
+        return np.array(self.gains(candidates), dtype=np.float64)
+
+    def gains(self, candidates):
+        gains = []
+        for c in candidates:
+            nodes, depths = self._improvements(c)
+            gains.append(int((self.distance[nodes] - depths).sum()))
+        return gains
+
+    def add(self, c):
+        nodes, depths = self._improvements(c)
+        self.distance[nodes] = depths
+
+
+class _BetweennessObjective:
+    """
+    Group betweenness over a set of sources, by successive group betweenness (Puzis et al.).
+
+    On the shortest-path DAG of each source s, avoiding[v] counts the shortest s-v paths that avoid
+    the group, and dependency[v] sums, over the targets t below v, the avoiding v-t paths divided by
+    sigma[t]. Adding v covers avoiding[v] * dependency[v] of the pairs from s that the group missed,
+    so one sweep over the sources per added member refreshes the gain of every node and the gains
+    of the lazy heap are lookups.
+    """
+
+    def __init__(self, csr, sources):
+        self.csr = csr
+        self.sources = sources
+        self.in_group = np.zeros(csr.number_of_nodes, dtype=bool)
+        self.total_paths = 0
+        self.gain = None
+        self.value = 0.0
+        self._dags = {}
+        self._cached_edges = 0
+
+    def _dag(self, source):
+        """Shortest-path DAG of a source as (sigma, levels), kept while it fits in DAG_CACHE_EDGES."""
+        if source in self._dags:
+            return self._dags[source]
+        dist, sigma, levels = self.csr.shortest_path_dag(source)
+        if self.gain is None:
+            self.total_paths += np.count_nonzero(dist > 0)
+        # Level nodes and the start of their parent runs, for the forward reduceat
+        levels = [(parents, children, starts, children[starts]) for parents, children in levels
+                  for starts in [np.flatnonzero(np.r_[True, children[1:] != children[:-1]])]]
+        size = sum(len(parents) for parents, *_ in levels)
+        if self._cached_edges + size <= DAG_CACHE_EDGES:
+            self._dags[source] = (sigma, levels)
+            self._cached_edges += size
+        return sigma, levels
+
+    def _sweep(self):
+        n = self.csr.number_of_nodes
+        outside = ~self.in_group
+        gain = np.zeros(n, dtype=np.float64)
+        for source in self.sources:
+            sigma, levels = self._dag(source)
+            avoiding = np.zeros(n, dtype=np.float64)
+            avoiding[source] = outside[source]
+            for parents, _, starts, nodes in levels:
+                avoiding[nodes] = np.add.reduceat(avoiding[parents], starts) * outside[nodes]
+            # Each node also ends its own pair, except the source
+            dependency = np.zeros(n, dtype=np.float64)
+            for parents, children, _, nodes in reversed(levels):
+                dependency[nodes] = (dependency[nodes] + 1.0 / sigma[nodes]) * outside[nodes]
+                dependency += np.bincount(parents, weights=dependency[children], minlength=n)
+            dependency[source] *= outside[source]
+            gain += avoiding * dependency
+        return gain
+
+    def initial_gains(self, candidates):
+        self.gain = self._sweep()
+        return self.gains(candidates)
+
+    def gains(self, candidates):
+        if self.total_paths == 0:
+            return np.zeros(len(candidates))
+        return self.gain[candidates] / self.total_paths
+
+    def add(self, c):
+        self.value += float(self.gains([c])[0])
+        self.in_group[c] = True
+        self.gain = self._sweep()
+
+
+def _betweenness_sources(n, max_sources=MAX_SOURCES, seed=42):
+    """Source ids of the betweenness objective: all nodes, or a seeded sample of max_sources of them."""
+    if max_sources is not None and max_sources < n:
+        return np.sort(np.random.default_rng(seed).choice(n, size=max_sources, replace=False))
+    return np.arange(n)
+
+
+@traced
+def greedy_group_search(G, k, measure='degree', max_candidates=2000, max_sources=MAX_SOURCES, seed=42):
+    """
+    Finds a size-k group with high group degree, closeness or betweenness centrality by greedy
+    selection with lazy (CELF) marginal-gain evaluation.
+
+    All three objectives have diminishing returns, so a marginal gain computed in an earlier round
+    is an upper bound for the current one: candidates are kept in a max-heap and only re-evaluated
+    when they reach the top with a stale gain. Greedy selection guarantees at least (1 - 1/e) of the
+    optimal objective value.
+
+    Args:
+        G (networkx.Graph or CSRGraph): Input graph.
+        k (int): Size of the group.
+        measure (str, optional): 'degree', 'closeness' or 'betweenness'. Defaults to 'degree'.
+        max_candidates (int, optional): Only the highest-degree nodes are considered as members.
+            Defaults to 2000; None considers every node.
+        max_sources (int, optional): Number of sampled BFS sources for 'betweenness' on graphs with more
+            nodes. Defaults to MAX_SOURCES; None uses every node (exact).
+        seed (int, optional): Seed of the source sample. Defaults to 42.
+
+    Returns:
+        tuple: (members, score) with the selected node names in selection order and their group centrality.
+    """
+    csr = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+    n = csr.number_of_nodes
+    k = min(k, n)
+
+    candidates = np.argsort(-csr.degree(), kind='stable')
+    if max_candidates is not None:
+        candidates = candidates[:max_candidates]
+
+    if measure == 'degree':
+        objective = _DegreeObjective(csr)
+    elif measure == 'closeness':
+        objective = _ClosenessObjective(csr)
+    elif measure == 'betweenness':
+        objective = _BetweennessObjective(csr, _betweenness_sources(n, max_sources, seed))
+    else:
+        raise ValueError(f"Unknown measure '{measure}', expected 'degree', 'closeness' or 'betweenness'.")
+
+    # Max-heap of (-gain, candidate, round in which the gain was computed)
+    heap = [(-gain, int(c), 0) for gain, c in zip(objective.initial_gains(candidates), candidates)]
+    heapq.heapify(heap)
+
+    selected = []
+    for round_number in range(k):
+        while heap:
+            if heap[0][2] == round_number:
+                # The top gain is fresh, so no other candidate can beat it
+                _, best, _ = heapq.heappop(heap)
+                break
+            _, c, _ = heapq.heappop(heap)
+            heapq.heappush(heap, (-objective.gains([c])[0], c, round_number))
+        else:
+            break
+        objective.add(best)
+        selected.append(best)
+
+    members = csr.ids[selected].tolist()
+    group = {'group': members}
+    if measure == 'degree':
+        score = group_degree_centralities(csr, group)['group']
+    elif measure == 'closeness':
+        score = group_closeness_centralities(csr, group)['group']
+    else:
+        # The sum of the exact marginal gains, over the same sources
+        score = objective.value
+    return members, score
+
+
+def compare_groups_with_greedy(G, groups, measure='degree', **kwargs):
+    """
+    Compares each group with the greedy group of the same size.
+
+    The greedy score is a lower bound on the optimum, so the reported shortfall is a lower bound
+    on how far each group is from the best possible group of its size.
+
+    Args:
+        G (networkx.Graph or CSRGraph): Input graph.
+        groups (dict): Maps group names to lists of member nodes (all members must be in G).
+        measure (str, optional): 'degree', 'closeness' or 'betweenness'. Defaults to 'degree'.
+        **kwargs: Passed to greedy_group_search.
+
+    Returns:
+        dict: Maps group names to (group score, greedy score, greedy members).
+    """
+    csr = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+    scorers = {'degree': group_degree_centralities,
+               'closeness': group_closeness_centralities,
+               'betweenness': group_betweenness_centralities}
+    if measure == 'betweenness':
+        # Scored over the same sources as the greedy groups
+        sources = _betweenness_sources(csr.number_of_nodes, kwargs.get('max_sources', MAX_SOURCES),
+                                       kwargs.get('seed', 42))
+        group_scores = group_betweenness_centralities(csr, groups, sources=sources)
+    else:
+        group_scores = scorers[measure](csr, groups)
+
+    greedy_by_size = {}
+    comparison = {}
+    for name, members in groups.items():
+        size = len(set(members))
+        if size not in greedy_by_size:
+            greedy_by_size[size] = greedy_group_search(csr, size, measure, **kwargs)
+        greedy_members, greedy_score = greedy_by_size[size]
+        comparison[name] = (group_scores[name], greedy_score, greedy_members)
+    return comparison
+
+
+if __name__ == "__main__":
+    try:
+        G = load_graph_from_dataset()
+
+        groups = HOUSES
+        groups = {name: [m for m in members if m in G.nodes()] for name, members in groups.items()}
+        groups = {name: members for name, members in groups.items() if members}
+
+        csr = CSRGraph.from_networkx(G)
+        for measure in ['degree', 'closeness', 'betweenness']:
+            comparison = compare_groups_with_greedy(csr, groups, measure)
+            print(f"\nGroup {measure} centrality: houses vs greedy groups of the same size")
+            for name, (house_score, greedy_score, greedy_members) in comparison.items():
+                if house_score >= greedy_score:
+                    print(f"{name} ({len(groups[name])} members): {house_score:.3f} vs {greedy_score:.3f} "
+                          f"(matches or beats the greedy group)")
+                    continue
+                shortfall = 1 - house_score / greedy_score
+                print(f"{name} ({len(groups[name])} members): {house_score:.3f} vs {greedy_score:.3f} "
+                      f"(at least {shortfall:.1%} below the optimum)")
+
+            best_house = max(comparison, key=lambda name: comparison[name][0])
+            _, greedy_score, greedy_members = comparison[best_house]
+            print(f"Best house: {best_house}; greedy group of the same size: {greedy_members} ({greedy_score:.3f})")
+
+    except Exception as e:
+        print(f"Error: {e}")
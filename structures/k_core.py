@@ -5,29 +5,30 @@ import matplotlib.pyplot as plt
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils import load_graph_from_dataset
+from rendering import show_figure, draw_figures, GRAPH
+from layout_cache import get_layout
+from core_decomposition import core_numbers, k_core_subgraph, shell_hierarchy, weighted_core_numbers
+from instrumentation import traced
 
-def print_k_core_details(G):
+@traced
+def print_k_core_details(G, core=None):
     """
     Automatically selects the k-core with the highest degree, calculates its comprehensive weight, 
     and prints details such as the number of nodes, total weight, and edge contributions.
     
     Args:
         G (networkx.Graph): Input graph with edge weights.
+        core (dict, optional): Core numbers, as returned by core_numbers. Defaults to None (computed).
     """
-    # Find the maximum degree of the graph
-    degrees = dict(G.degree())
-    max_degree = max(degrees.values())
-    
-    # Try progressively lower k values until a non-empty k-core is found
-    for k in range(max_degree, 0, -1):
-        k_core = nx.k_core(G, k)
-        if len(k_core.nodes()) > 0:
-            break
-
-    # If no non-empty k-core is found (which should not happen unless the graph is disconnected with low degrees)
-    if len(k_core.nodes()) == 0:
+    # One core decomposition gives the largest k with a non-empty k-core
+    core = core if core is not None else core_numbers(G)
+    k = max(core.values(), default=0)
+
+    # If no non-empty k-core is found (which should not happen unless the graph has no edges)
+    if k == 0:
         print("No k-core subgraph found with the given degree threshold.")
         return None
+    k_core = k_core_subgraph(G, k, core)
 
     # Calculate the total weight of the k-core subgraph
     total_weight = 0
@@ -48,6 +49,27 @@ def print_k_core_details(G):
     return k_core, k  
 
 
+@traced
+def print_shell_hierarchy(G, core=None):
+    """
+    Prints the size, edges, weight and density of every k-core, and the heaviest weighted s-core.
+
+    Args:
+        G (networkx.Graph): Input graph with edge weights.
+        core (dict, optional): Core numbers, as returned by core_numbers. Defaults to None (computed).
+    """
+    print("Core hierarchy (k-shell size, then size, edges, weight and density of the k-core):")
+    print(shell_hierarchy(G, core).to_string())
+
+    # Weighted s-cores: heavy-interaction cores, which can differ from the degree-only ones
+    s_core = weighted_core_numbers(G)
+    s = max(s_core.values(), default=0)
+    members = [v for v in G if s_core[v] >= s]
+    print(f"\nThe heaviest s-core (strength at least {s}) has {len(members)} nodes: {members}")
+    print()
+
+
+@traced(category='render')
 def plot_k_core(G, k_core, k):
     """
     Plots the k-core subgraph and displays edge weights.
@@ -58,7 +80,7 @@ def plot_k_core(G, k_core, k):
         k (int): The degree threshold for the k-core.
     """
     plt.figure(figsize=(8, 6))
-    pos = nx.spring_layout(k_core)  
+    pos = get_layout(k_core, 'spring')  
     nx.draw(k_core, pos, with_labels=True, node_size=3000, node_color='lightgreen', font_size=12, font_weight='bold')
 
     # Draw edge labels (edge weights)
@@ -66,16 +88,18 @@ def plot_k_core(G, k_core, k):
     #nx.draw_networkx_edge_labels(k_core, pos, edge_labels=edge_labels, font_size=10, font_color='red')
 
     plt.title(f"K-core subgraph (degree {k})")
-    plt.show()
+    show_figure()
 
 
 if __name__ == "__main__":
     try:
         G = load_graph_from_dataset()
-        k_core, k = print_k_core_details(G)
+        core = core_numbers(G)
+        result = print_k_core_details(G, core)
+        print_shell_hierarchy(G, core)
 
-        if k_core:
-            plot_k_core(G, k_core, k)
+        if result:
+            draw_figures([('k_core:plot_k_core', (GRAPH, *result), {})], G)
 
     except Exception as e:
         print(f"Error: {e}")
@@ -1,32 +1,25 @@
 import sys
 import os
-import networkx as nx
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils import load_graph_from_dataset
+from triangles import top_k_weighted_triangles
+from instrumentation import traced
 
+@traced
 def print_top_10_weighted_triads_with_contributions(G):
     """
     Finds triangles (triads) in the graph, calculates their comprehensive weight,
     and prints the top 10 based on the total triad weight along with individual edge weights.
-    
+    Triangles come from the forward enumeration of the triangle engine and are streamed
+    into a bounded heap (see triangles.top_k_weighted_triangles).
+
     Args:
         G (networkx.Graph): Input graph with edge weights.
     """
-    triangles = []
-    
-    for triangle in nx.enumerate_all_cliques(G):
-        if len(triangle) == 3:  
-            weight1 = G[triangle[0]][triangle[1]]["weight"]
-            weight2 = G[triangle[1]][triangle[2]]["weight"]
-            weight3 = G[triangle[2]][triangle[0]]["weight"]
-            weight_sum = weight1 + weight2 + weight3  
-            triangles.append((triangle, weight_sum, weight1, weight2, weight3))
-
-   
-    print(f"\nTotal closed triads (triangles) found: {len(triangles)}")
-    sorted_triangles = sorted(triangles, key=lambda x: x[1], reverse=True)[:10]
-    
+    sorted_triangles, total_triangles = top_k_weighted_triangles(G, k=10)
+
+    print(f"\nTotal closed triads (triangles) found: {total_triangles}")
 
     print("\nTop 10 triads ordered by comprehensive triad weight:")
     for i, (nodes, weight_sum, weight1, weight2, weight3) in enumerate(sorted_triangles, 1):
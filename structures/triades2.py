@@ -1,4 +1,3 @@
-import networkx as nx
 import matplotlib.pyplot as plt
 import sys
 import os
@@ -6,75 +5,221 @@ import numpy as np
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils import load_graph_from_dataset
+from rendering import show_figure
+from csr_graph import CSRGraph
+from triangles import iter_triangles
+from instrumentation import traced
+from memo import memoize
+
+
+@traced(category='render')
+def plot_clustering_distribution(clustering_per_node):
+    """
+    Plots the histogram of the clustering coefficients, with the count above each bar.
+
+    Args:
+        clustering_per_node (dict): Maps nodes to their clustering coefficient.
+    """
+    plt.figure(figsize=(10, 6))
+    bins = np.linspace(0, 1, 10)
+    counts, edges, bars = plt.hist(
+        list(clustering_per_node.values()),
+        bins=bins,
+        color="#4CAF50",
+        alpha=0.85,
+        edgecolor="black",
+        rwidth=0.85,
+    )
+
+    for count, edge in zip(counts, edges):
+        if count > 0:
+            plt.text(edge + (bins[1] - bins[0]) / 2, count + 0.5, int(count), ha="center", fontsize=10)
+
+    plt.title("Distribution of the clustering coefficient", fontsize=16)
+    plt.xlabel("Clustering coefficient", fontsize=14)
+    plt.ylabel("Number of nodes", fontsize=14)
+    plt.xticks(bins, [f"{b:.1f}" for b in bins], fontsize=12)
+    plt.yticks(fontsize=12)
+    plt.grid(axis="y", linestyle="--", alpha=0.7)
+
+    plt.tight_layout()
+    show_figure()
+
+
+@traced(category='render')
+def plot_triads_pie(closed_triads, open_triads):
+    """
+    Plots the share of closed and open triads as a pie chart.
+
+    Args:
+        closed_triads (int): Number of closed triads.
+        open_triads (int): Number of open triads.
+    """
+    plt.figure()
+    labels = ['Closed triads', 'Open triads']
+    sizes = [closed_triads, open_triads]
+    plt.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140)
+    plt.title("Closed triads vs open triads")
+    show_figure()
+
+
+@traced
+def triad_arrays(G, weight='weight'):
+    """
+    Computes every triad statistic from a single triangle enumeration (iter_triangles, over the
+    degree-ordered sorted adjacency), as NumPy arrays indexed by node id.
+
+    Each batch of triangles adds to the per-node triangle counts, to the geometric means of the
+    normalized triangle weights (Onnela et al., as nx.clustering with weights) and to the weights of the
+    two triangle edges at each corner (Barrat et al.). Clustering, transitivity and the open and closed
+    triad counts then follow from the degrees. Self-loops are ignored.
+
+    A triad is a path of two edges centered on a node: closed when its ends are adjacent (each
+    triangle closes three triads, one per corner), open otherwise.
+
+    Args:
+        G (networkx.Graph or CSRGraph): Input graph.
+        weight (str, optional): Edge attribute holding the weights of the weighted clustering
+            coefficients (with a CSRGraph, any value uses its weights). Defaults to 'weight'; None gives
+            every edge weight 1.
+
+    Returns:
+        dict: 'nodes' (node of every id), then per node 'degree', 'strength', 'triangles', 'clustering',
+              'onnela_clustering', 'barrat_clustering', 'closed_triads' and 'open_triads', and the
+              totals 'total_triangles', 'average_clustering', 'transitivity', 'total_closed_triads'
+              and 'total_open_triads'.
+    """
+    csr = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G, weight=weight or 'weight')
+    n = csr.number_of_nodes
+    tails = np.repeat(np.arange(n, dtype=np.int64), np.diff(csr.indptr))
+    edge_weights = csr.weights.astype(np.float64) if weight else np.ones(len(csr.indices))
+    links = csr.indices != tails
+    degree = np.bincount(tails[links], minlength=n)
+    strength = np.bincount(tails[links], weights=edge_weights[links], minlength=n)
+    # Onnela's weights are normalized by the largest edge weight, as in nx.clustering
+    max_weight = edge_weights.max(initial=1)
+
+    triangles = np.zeros(n, dtype=np.int64)
+    geometric = np.zeros(n, dtype=np.float64)
+    corner_weight = np.zeros(n, dtype=np.float64)
+    for nodes, weights in iter_triangles(csr):
+        corners = nodes.ravel()
+        if not weight:
+            weights = np.ones(weights.shape)
+        triangles += np.bincount(corners, minlength=n)
+        geometric += np.bincount(corners, weights=np.repeat(np.cbrt(weights.prod(axis=1)) / max_weight, 3),
+                                 minlength=n)
+        # Edges at each corner: a-b and c-a at a, a-b and b-c at b, b-c and c-a at c
+        corner_weight += np.bincount(corners, weights=(weights[:, [0, 0, 1]] + weights[:, [2, 1, 2]]).ravel(),
+                                     minlength=n)
+
+    triads = degree * (degree - 1) // 2
+    pairs = np.maximum(degree * (degree - 1), 1)
+    clustering = np.where(degree > 1, 2 * triangles / pairs, 0.0)
+    onnela = np.where(degree > 1, 2 * geometric / pairs, 0.0)
+    barrat_norm = strength * (degree - 1)
+    barrat = np.divide(corner_weight, barrat_norm, out=np.zeros(n), where=(degree > 1) & (barrat_norm > 0))
+
+    total_closed = int(triangles.sum())
+    total_triads = int(triads.sum())
+    return {
+        'nodes': csr.ids,
+        'degree': degree,
+        'strength': strength,
+        'triangles': triangles,
+        'clustering': clustering,
+        'onnela_clustering': onnela,
+        'barrat_clustering': barrat,
+        'closed_triads': triangles,
+        'open_triads': triads - triangles,
+        'total_triangles': total_closed // 3,
+        # Summed in node order, as nx.average_clustering does
+        'average_clustering': sum(clustering.tolist()) / n if n else 0,
+        'transitivity': total_closed / total_triads if total_closed else 0,
+        'total_closed_triads': total_closed,
+        'total_open_triads': total_triads - total_closed,
+    }
+
+
+@traced
+@memoize(ignore=('arrays',), version=2)
+def triad_statistics(G, arrays=None):
+    """
+    Computes the clustering coefficients, the transitivity and the triangle and triad counts.
+
+    Args:
+        G (networkx.Graph): Input graph.
+        arrays (dict, optional): Triad arrays of G, as returned by triad_arrays. Defaults to None (computed).
+
+    Returns:
+        dict: 'triangles', 'clustering', 'onnela_clustering' and 'barrat_clustering' (per node),
+              'average_clustering', 'transitivity', 'total_triangles', 'closed_triads' and 'open_triads'.
+    """
+    if arrays is None:
+        arrays = triad_arrays(G)
+    nodes = arrays['nodes'].tolist()
+
+    def per_node(key):
+        return dict(zip(nodes, arrays[key].tolist()))
+
+    return {
+        'triangles': per_node('triangles'),
+        'clustering': per_node('clustering'),
+        'onnela_clustering': per_node('onnela_clustering'),
+        'barrat_clustering': per_node('barrat_clustering'),
+        'average_clustering': arrays['average_clustering'],
+        'transitivity': arrays['transitivity'],
+        'total_triangles': arrays['total_triangles'],
+        'closed_triads': arrays['total_closed_triads'],
+        'open_triads': arrays['total_open_triads'],
+    }
+
+
+@traced
+def print_triad_statistics(G, arrays=None):
+    """
+    Prints the average and per-node clustering coefficients, the transitivity and the number of
+    triangles per node, of closed and of open triads.
+
+    Args:
+        G (networkx.Graph): Input graph.
+        arrays (dict, optional): Triad arrays of G, as returned by triad_arrays. Defaults to None (computed).
+
+    Returns:
+        tuple: (clustering_per_node, closed_triads, open_triads).
+    """
+    stats = triad_statistics(G, arrays)
+    clustering_per_node = stats['clustering']
+    print(f"Average clustering coefficient: {stats['average_clustering']:.4f}")
+    n = len(clustering_per_node)
+    for name, key in (("Onnela", 'onnela_clustering'), ("Barrat", 'barrat_clustering')):
+        average = sum(stats[key].values()) / n if n else 0
+        print(f"Average weighted clustering coefficient ({name}): {average:.4f}")
+    print("\nClustering coefficient of node (ordered):")
+    for node, coef in sorted(clustering_per_node.items(), key=lambda x: x[1], reverse=True):
+        print(f"Node {node}: {coef:.4f}")
+
+    print(f"\nTransitivity: {stats['transitivity']:.4f}")
+
+    print(f"\n N. of triads for node (ordered):")
+    for node, count in sorted(stats['triangles'].items(), key=lambda x: x[1], reverse=True):
+        print(f"Node {node}: {count}")
+    print(f"\n Total triads: {stats['total_triangles']}")
+
+    print(f"\n N. of open triads: {stats['open_triads']}")
+    print(f"Number of closed triads: {stats['closed_triads']}")
+
+    return clustering_per_node, stats['closed_triads'], stats['open_triads']
 
 
 if __name__ == "__main__":
     try:
         G = load_graph_from_dataset()
 
-        average_clustering = nx.average_clustering(G)
-        clustering_per_node = nx.clustering(G)
-        print(f"Average clustering coefficient: {average_clustering:.4f}")
-        print("\nClustering coefficient of node (ordered):")
-        for node, coef in sorted(clustering_per_node.items(), key=lambda x: x[1], reverse=True):
-            print(f"Node {node}: {coef:.4f}")
-
-    
-        transitivity = nx.transitivity(G)
-        print(f"\nTransitivity: {transitivity:.4f}")
-
-
-        triangles_per_node = nx.triangles(G)
-        total_triangles = sum(triangles_per_node.values()) // 3
-        print(f"\n N. of triads for node (ordered):")
-        for node, count in sorted(triangles_per_node.items(), key=lambda x: x[1], reverse=True):
-            print(f"Node {node}: {count}")
-        print(f"\n Total triads: {total_triangles}")
-
-      
-        open_triads_estimated = 0
-        for node in G.nodes():
-            degree = G.degree(node)
-            possible_triads = degree * (degree - 1) // 2  
-            closed_triads = triangles_per_node[node]
-            open_triads_estimated += possible_triads - closed_triads
-
-        print(f"\n N. of open triads: {open_triads_estimated}")
-        print(f"Number of closed triads: {total_triangles}")
-
-
-        
-        plt.figure(figsize=(10, 6))
-        bins = np.linspace(0, 1, 10)  
-        counts, edges, bars = plt.hist(
-            clustering_per_node.values(),
-            bins=bins,
-            color="#4CAF50",  
-            alpha=0.85,
-            edgecolor="black",  
-            rwidth=0.85,  
-        )
-
-    
-        for count, edge in zip(counts, edges):
-            if count > 0:
-                plt.text(edge + (bins[1] - bins[0]) / 2, count + 0.5, int(count), ha="center", fontsize=10)
-
-        plt.title("Distribution of the clustering coefficient", fontsize=16)
-        plt.xlabel("Clustering coefficient", fontsize=14)
-        plt.ylabel("Number of nodes", fontsize=14)
-        plt.xticks(bins, [f"{b:.1f}" for b in bins], fontsize=12)
-        plt.yticks(fontsize=12)
-        plt.grid(axis="y", linestyle="--", alpha=0.7)  
-
-    
-        plt.tight_layout()
-        plt.show()
-        labels = ['Closed triads', 'Closed triads']
-        sizes = [total_triangles, open_triads_estimated]
-        plt.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140)
-        plt.title("Closed triads vs open triads")
-        plt.show()
+        clustering_per_node, closed_triads, open_triads = print_triad_statistics(G)
+
+        plot_clustering_distribution(clustering_per_node)
+        plot_triads_pie(closed_triads, open_triads)
 
     except Exception as e:
         print(f"Error: {e}")
@@ -0,0 +1,364 @@
+import os
+import glob
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+from utils import NODE_DTYPES, EDGE_DTYPES, DATASET_DIR
+from csr_graph import CSRGraph
+from eccentricity import eccentricity_summary
+from triangles import triangle_counts
+from core_decomposition import core_numbers
+from spectral_centrality import SpectralCentrality
+from instrumentation import traced
+
+# Most central nodes listed per centrality and snapshot
+TOP_K = 3
+
+# Temporal graph of the worker processes, received once through the pool initializer
+_worker_temporal = None
+
+
+class TemporalGraph:
+    """
+    Several versions (snapshots) of a graph, e.g. one per book or season, stored once.
+
+    All snapshots share one node index and one union edge list; each snapshot is a boolean mask over
+    the union edges plus the matching weights, so nodes and edges present in several snapshots are not
+    duplicated. A snapshot contains the nodes incident to its edges.
+
+    Attributes:
+        names (list): Snapshot names, in order.
+        ids (numpy.ndarray): Node names (object array), indexed by node id.
+        labels (numpy.ndarray): Node labels (object array), indexed by node id.
+        sources (numpy.ndarray): Lower node id of every union edge.
+        targets (numpy.ndarray): Higher node id of every union edge.
+        masks (numpy.ndarray): (snapshots, edges) boolean presence of every edge in every snapshot.
+        weights (numpy.ndarray): (snapshots, edges) weight of every edge in every snapshot, 0 if absent.
+    """
+
+    def __init__(self, names, ids, labels, sources, targets, masks, weights):
+        self.names = list(names)
+        self.ids = np.asarray(ids, dtype=object)
+        self.labels = np.asarray(labels, dtype=object)
+        self.sources = np.asarray(sources, dtype=np.int64)
+        self.targets = np.asarray(targets, dtype=np.int64)
+        self.masks = np.asarray(masks, dtype=bool)
+        self.weights = np.asarray(weights)
+
+    @classmethod
+    def from_frames(cls, edge_frames, nodes_df=None):
+        """
+        Builds the shared structure from one edges DataFrame per snapshot.
+
+        Args:
+            edge_frames (dict): Maps snapshot names, in order, to DataFrames with 'Source', 'Target' and 'Weight'.
+            nodes_df (pandas.DataFrame, optional): Nodes with 'Id' and 'Label', shared by all snapshots.
+                Nodes missing from it are added without label. Defaults to None.
+
+        Returns:
+            TemporalGraph: The temporal graph.
+        """
+        ids = [] if nodes_df is None else nodes_df['Id'].astype(object).tolist()
+        labels = {} if nodes_df is None else dict(zip(ids, nodes_df['Label'].astype(object)
+                                                      .where(nodes_df['Label'].notna(), None)))
+        known = set(ids)
+        for edges_df in edge_frames.values():
+            for node in pd.unique(edges_df[['Source', 'Target']].to_numpy().ravel()):
+                if node not in known:
+                    known.add(node)
+                    ids.append(node)
+        index = pd.Index(ids)
+        n = len(ids)
+
+        keys = []
+        for edges_df in edge_frames.values():
+            u = index.get_indexer(edges_df['Source'])
+            v = index.get_indexer(edges_df['Target'])
+            keys.append(np.minimum(u, v).astype(np.int64) * n + np.maximum(u, v))
+        union = np.unique(np.concatenate(keys)) if keys else np.zeros(0, dtype=np.int64)
+
+        dtype = np.result_type(*[df['Weight'].dtype for df in edge_frames.values()]) if edge_frames else np.int64
+        masks = np.zeros((len(edge_frames), len(union)), dtype=bool)
+        weights = np.zeros((len(edge_frames), len(union)), dtype=dtype)
+        for s, (snapshot_keys, edges_df) in enumerate(zip(keys, edge_frames.values())):
+            positions = np.searchsorted(union, snapshot_keys)
+            masks[s, positions] = True
+            # Duplicated edges keep the last weight, as nx.Graph.add_edge does
+            weights[s, positions] = edges_df['Weight'].to_numpy()
+
+        return cls(edge_frames.keys(), ids, [labels.get(node) for node in ids],
+                   union // max(n, 1), union % max(n, 1), masks, weights)
+
+    @property
+    def number_of_snapshots(self):
+        return len(self.names)
+
+    def _snapshot_index(self, snapshot):
+        return self.names.index(snapshot) if isinstance(snapshot, str) else snapshot
+
+    def _snapshot_arrays(self, snapshot):
+        s = self._snapshot_index(snapshot)
+        mask = self.masks[s]
+        return self.sources[mask], self.targets[mask], self.weights[s, mask]
+
+    def snapshot(self, snapshot):
+        """
+        Builds one snapshot as a NetworkX graph.
+
+        Args:
+            snapshot (int or str): Snapshot position or name.
+
+        Returns:
+            networkx.Graph: Graph with the 'label' node attribute and the 'weight' edge attribute.
+        """
+        u, v, w = self._snapshot_arrays(snapshot)
+        present = np.unique(np.concatenate([u, v]))
+        G = nx.Graph()
+        G.add_nodes_from((node, {'label': label})
+                         for node, label in zip(self.ids[present].tolist(), self.labels[present].tolist()))
+        G.add_weighted_edges_from(zip(self.ids[u].tolist(), self.ids[v].tolist(), w.tolist()))
+        return G
+
+    def snapshot_csr(self, snapshot):
+        """
+        Builds one snapshot as a CSRGraph over its own nodes, without going through NetworkX.
+        """
+        u, v, w = self._snapshot_arrays(snapshot)
+        present = np.unique(np.concatenate([u, v]))
+        local = np.searchsorted(present, np.concatenate([u, v]))
+        return CSRGraph.from_edges(self.ids[present], self.labels[present],
+                                   local[:len(u)], local[len(u):], w)
+
+    def delta(self, a, b):
+        """
+        Lists the edge changes from snapshot a to snapshot b, in the format of IncrementalGraph.apply_batch.
+
+        Returns:
+            tuple: (added, removed, reweighted) where added and reweighted are lists of (u, v, weight)
+                   and removed is a list of (u, v).
+        """
+        a, b = self._snapshot_index(a), self._snapshot_index(b)
+        ids = self.ids
+        in_a, in_b = self.masks[a], self.masks[b]
+        added = np.flatnonzero(in_b & ~in_a)
+        removed = np.flatnonzero(in_a & ~in_b)
+        reweighted = np.flatnonzero(in_a & in_b & (self.weights[a] != self.weights[b]))
+        edge = lambda e: (ids[self.sources[e]], ids[self.targets[e]])
+        return ([(*edge(e), self.weights[b, e].item()) for e in added],
+                [edge(e) for e in removed],
+                [(*edge(e), self.weights[b, e].item()) for e in reweighted])
+
+    def diff(self, a, b):
+        """
+        Describes the changed edges from snapshot a to snapshot b.
+
+        Returns:
+            pandas.DataFrame: One row per added, removed or reweighted edge with 'Source', 'Target',
+                              'weight_before', 'weight_after' and 'change'.
+        """
+        a, b = self._snapshot_index(a), self._snapshot_index(b)
+        in_a, in_b = self.masks[a], self.masks[b]
+        changed = (in_a != in_b) | (in_a & in_b & (self.weights[a] != self.weights[b]))
+        edges = np.flatnonzero(changed)
+        change = np.where(~in_a[edges], 'added', np.where(~in_b[edges], 'removed', 'reweighted'))
+        return pd.DataFrame({
+            'Source': self.ids[self.sources[edges]],
+            'Target': self.ids[self.targets[edges]],
+            'weight_before': np.where(in_a[edges], self.weights[a, edges], 0),
+            'weight_after': np.where(in_b[edges], self.weights[b, edges], 0),
+            'change': change,
+        })
+
+
+@traced(category='io')
+def load_temporal_graph(directory, pattern='*edges*.csv', nodes_path=None):
+    """
+    Loads a directory of edge files, one per snapshot, into a TemporalGraph.
+
+    Snapshots are named after their file (without extension) and ordered by file name.
+
+    Args:
+        directory (str): Folder of the snapshot edge files.
+        pattern (str, optional): Glob pattern of the edge files. Defaults to '*edges*.csv'.
+        nodes_path (str, optional): Shared nodes CSV. Defaults to None (the folder's '*nodes*.csv' file, if any).
+
+    Returns:
+        TemporalGraph: The temporal graph, or None if no edge file matches.
+    """
+    paths = sorted(glob.glob(os.path.join(directory, pattern)))
+    if not paths:
+        print(f"Error: no file matching {pattern} in {directory}.")
+        return None
+    if nodes_path is None:
+        candidates = sorted(glob.glob(os.path.join(directory, '*nodes*.csv')))
+        nodes_path = candidates[0] if candidates else None
+
+    nodes_df = pd.read_csv(nodes_path, usecols=list(NODE_DTYPES), dtype=NODE_DTYPES) if nodes_path else None
+    edge_frames = {os.path.splitext(os.path.basename(path))[0]:
+                   pd.read_csv(path, usecols=list(EDGE_DTYPES), dtype=EDGE_DTYPES) for path in paths}
+    return TemporalGraph.from_frames(edge_frames, nodes_df)
+
+
+def _init_worker(temporal):
+    global _worker_temporal
+    _worker_temporal = temporal
+
+
+def _path_centralities(csr):
+    """
+    Computes closeness and betweenness centrality on the CSR graph, with one shortest-path BFS per
+    source shared by both measures. The formulas are those of nx.closeness_centrality and
+    nx.betweenness_centrality (normalized); snapshots already run in parallel, so this runs serially.
+
+    Returns:
+        tuple: (closeness, betweenness) arrays indexed by node id.
+    """
+    n = csr.number_of_nodes
+    closeness = np.zeros(n, dtype=np.float64)
+    betweenness = np.zeros(n, dtype=np.float64)
+    for source in range(n):
+        dist, sigma, levels = csr.shortest_path_dag(source)
+        reached = dist[dist >= 0]
+        total_distance = int(reached.sum(dtype=np.int64))
+        if total_distance > 0:
+            closeness[source] = (len(reached) - 1.0) ** 2 / (total_distance * (n - 1))
+        delta = csr.dependencies(sigma, levels)
+        delta[source] = 0.0
+        betweenness += delta
+    # Each undirected pair was counted from both ends
+    if n > 2:
+        betweenness /= (n - 1) * (n - 2)
+    return closeness, betweenness
+
+
+def _summarize(name, ids, values, k):
+    """
+    Summarizes one centrality as its mean, its maximum and its k most central nodes.
+
+    Returns:
+        dict: '<name>_mean', '<name>_max' and 'top_<name>' (comma-separated node names, best first).
+    """
+    if not len(values):
+        return {f'{name}_mean': float('nan'), f'{name}_max': float('nan'), f'top_{name}': ''}
+    top = np.lexsort((np.arange(len(values)), -values))[:k]
+    return {
+        f'{name}_mean': float(values.mean()),
+        f'{name}_max': float(values.max()),
+        f'top_{name}': ', '.join(str(node) for node in ids[top]),
+    }
+
+
+def snapshot_metrics(temporal, snapshot, top_k=TOP_K):
+    """
+    Computes the metrics of graph.py, centrality.py, triades2.py and k_core.py for one snapshot.
+
+    Degree, closeness, betweenness and eigenvector centrality are each summarized by their mean,
+    their maximum and their top_k nodes.
+
+    Args:
+        temporal (TemporalGraph): The snapshots.
+        snapshot (int or str): Snapshot position or name.
+        top_k (int, optional): Number of most central nodes listed per centrality. Defaults to TOP_K.
+
+    Returns:
+        dict: Metric name -> value. Radius and diameter are those of the largest component.
+    """
+    G = temporal.snapshot(snapshot)
+    csr = temporal.snapshot_csr(snapshot)
+    n, m = G.number_of_nodes(), G.number_of_edges()
+    pairs = n * (n - 1) / 2 if n > 1 else 1
+
+    summary = eccentricity_summary(csr)
+    largest = summary['components'][0] if summary['components'] else {'nodes': 0, 'radius': 0, 'diameter': 0}
+    triangles, total_triangles = triangle_counts(csr)
+    degrees = dict(G.degree())
+    triples = sum(d * (d - 1) // 2 for d in degrees.values())
+    clustering = {v: 2 * triangles[v] / (d * (d - 1)) if d > 1 else 0 for v, d in degrees.items()}
+    core = core_numbers(csr)
+    max_core = max(core.values(), default=0)
+
+    degree_centrality = csr.degree() / (n - 1) if n > 1 else np.zeros(n)
+    closeness, betweenness = _path_centralities(csr)
+    eigenvector = SpectralCentrality(G).eigenvector(max_iter=1000) if n else {}
+    eigenvector = np.array([eigenvector.get(node, 0.0) for node in csr.ids.tolist()], dtype=np.float64)
+
+    metrics = {
+        'snapshot': temporal.names[temporal._snapshot_index(snapshot)],
+        'nodes': n,
+        'edges': m,
+        'density': m / pairs if n > 1 else 0,
+        'weighted_density': float(csr.edge_arrays()[2].sum()) / pairs,
+        'components': len(summary['components']),
+        'largest_component': largest['nodes'],
+        'radius': largest['radius'],
+        'diameter': largest['diameter'],
+        'average_clustering': sum(clustering.values()) / n if n else 0,
+        'transitivity': 3 * total_triangles / triples if triples else 0,
+        'triangles': total_triangles,
+        'open_triads': triples - 3 * total_triangles,
+        'max_core': max_core,
+        'max_core_size': sum(1 for k in core.values() if k == max_core),
+    }
+    for name, values in (('degree', degree_centrality), ('closeness', closeness),
+                         ('betweenness', betweenness), ('eigenvector', eigenvector)):
+        metrics.update(_summarize(name, csr.ids, values, top_k))
+    return metrics
+
+
+def _worker_snapshot_metrics(snapshot):
+    return snapshot_metrics(_worker_temporal, snapshot)
+
+
+@traced
+def temporal_metrics(temporal, n_workers=None):
+    """
+    Evaluates snapshot_metrics over all snapshots concurrently, one snapshot per task.
+
+    The temporal graph is sent once to each worker process through the pool initializer.
+
+    Args:
+        temporal (TemporalGraph): The snapshots.
+        n_workers (int, optional): Number of worker processes. Defaults to None (os.cpu_count()).
+
+    Returns:
+        pandas.DataFrame: One row per snapshot (index 'snapshot'), one column per metric.
+    """
+    n_workers = max(1, min(n_workers or os.cpu_count() or 1, temporal.number_of_snapshots))
+    snapshots = range(temporal.number_of_snapshots)
+    if n_workers == 1:
+        rows = [snapshot_metrics(temporal, s) for s in snapshots]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                 initargs=(temporal,)) as executor:
+            rows = list(executor.map(_worker_snapshot_metrics, snapshots))
+    return pd.DataFrame(rows).set_index('snapshot')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-snapshot metrics of a directory of graph versions.")
+    parser.add_argument('directory', nargs='?', default=DATASET_DIR,
+                        help="Folder with one edges CSV per snapshot (default: the dataset folder).")
+    parser.add_argument('--pattern', default='*edges*.csv', help="Glob pattern of the edge files.")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: number of CPUs).")
+    args = parser.parse_args()
+
+    temporal = load_temporal_graph(args.directory, args.pattern)
+    if temporal:
+        metrics = temporal_metrics(temporal, n_workers=args.workers)
+        with pd.option_context('display.max_columns', None, 'display.width', 200):
+            print("\nPer-snapshot metrics:")
+            print(metrics.T)
+
+            # Changes between consecutive snapshots
+            for before, after in zip(temporal.names, temporal.names[1:]):
+                diff = temporal.diff(before, after)
+                counts = diff['change'].value_counts()
+                print(f"\n{before} -> {after}: {counts.get('added', 0)} edges added, "
+                      f"{counts.get('removed', 0)} removed, {counts.get('reweighted', 0)} reweighted")
+                numeric = metrics.select_dtypes('number')
+                print((numeric.loc[after] - numeric.loc[before]).to_string())
+    else:
+        print("Error: Snapshots not loaded successfully.")
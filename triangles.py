@@ -0,0 +1,228 @@
+import heapq
+import numpy as np
+import scipy.sparse as sp
+
+from csr_graph import CSRGraph
+from instrumentation import traced, count
+
+# Wedges (u, v, w) checked per vectorized step of the triangle enumeration
+TRIANGLE_BATCH_WEDGES = 1 << 22
+
+
+def _forward_graph(csr):
+    """
+    Orients every edge from the endpoint of lower (degree, id) rank to the higher one.
+
+    Returns:
+        tuple: (indptr, indices, weights, keys) of the oriented graph in CSR form, rows and neighbors
+               sorted by id, with keys = u * n + v sorted so that (u, v) lookups are a binary search.
+    """
+    n = csr.number_of_nodes
+    u, v, w = csr.edge_arrays()
+    u = u.astype(np.int64)
+    not_loop = u != v
+    u, v, w = u[not_loop], v[not_loop], w[not_loop]
+
+    degree = csr.degree()
+    # Rank by degree, ties by id: out-degrees in the oriented graph are O(sqrt(m))
+    forward = (degree[u] < degree[v]) | ((degree[u] == degree[v]) & (u < v))
+    tails = np.where(forward, u, v)
+    heads = np.where(forward, v, u)
+
+    keys = tails * n + heads
+    order = np.argsort(keys, kind='stable')
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tails, minlength=n), out=indptr[1:])
+    return indptr, heads[order], w[order], keys[order]
+
+
+def row_blocks(work, budget):
+    """
+    Splits rows into contiguous blocks whose total work is at most budget, so batched numpy steps
+    keep a bounded memory footprint.
+
+    Args:
+        work (numpy.ndarray): Work of every row, e.g. its number of wedges.
+        budget (int): Largest total work of a block; a block holds one row at least.
+
+    Yields:
+        tuple: (start, end) row range of each block.
+    """
+    boundaries = np.cumsum(work)
+    start = 0
+    while start < len(work):
+        limit = (boundaries[start - 1] if start else 0) + budget
+        end = max(start + 1, int(np.searchsorted(boundaries, limit, side='right')))
+        yield start, end
+        start = end
+
+
+def iter_triangles(G, batch_wedges=TRIANGLE_BATCH_WEDGES):
+    """
+    Lists every triangle once with degree-ordered forward enumeration.
+
+    Edges are oriented from lower to higher (degree, id) rank, so that each triangle is found exactly
+    once, as an oriented wedge u -> v -> w closed by the oriented edge u -> w. Wedges are generated
+    in batches by gathering the forward neighborhoods of the heads of a block of edges, and closed
+    by binary search in the sorted oriented edge keys, so that the work is vectorized and memory is
+    bounded by batch_wedges.
+
+    Args:
+        G (networkx.Graph or CSRGraph): Input graph.
+        batch_wedges (int, optional): Wedges checked per step. Defaults to TRIANGLE_BATCH_WEDGES.
+
+    Yields:
+        tuple: (nodes, weights) arrays for a batch of triangles; nodes has shape (t, 3) with node ids
+               in increasing order (a, b, c), and weights has shape (t, 3) with the weights of the
+               edges a-b, b-c and c-a.
+    """
+    csr = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+    n = csr.number_of_nodes
+    indptr, heads, weights, keys = _forward_graph(csr)
+    tails = np.repeat(np.arange(n, dtype=np.int64), np.diff(indptr))
+    out_degree = np.diff(indptr)
+
+    # Blocks of oriented edges whose heads have at most batch_wedges forward neighbors in total
+    for start, end in row_blocks(out_degree[heads], batch_wedges):
+        u, v, w_uv = tails[start:end], heads[start:end], weights[start:end]
+
+        counts = out_degree[v]
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        # Gather the forward neighborhood of every head v: wedges u -> v -> w
+        edge = np.repeat(np.arange(len(v)), counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        positions = np.repeat(indptr[v], counts) + offsets
+        w = heads[positions]
+        w_vw = weights[positions]
+
+        # The wedge is a triangle if u -> w is an oriented edge
+        wanted = u[edge] * n + w
+        found = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+        closed = keys[found] == wanted
+        if not closed.any():
+            continue
+        edge, w, w_vw, found = edge[closed], w[closed], w_vw[closed], found[closed]
+
+        nodes = np.column_stack([u[edge], v[edge], w])
+        # Weight of the edge opposite each node: v-w opposite u, u-w opposite v, u-v opposite w
+        opposite = np.column_stack([w_vw, weights[found], w_uv[edge]])
+        order = np.argsort(nodes, axis=1, kind='stable')
+        nodes = np.take_along_axis(nodes, order, axis=1)
+        opposite = np.take_along_axis(opposite, order, axis=1)
+        # a-b is opposite c, b-c opposite a, c-a opposite b
+        yield nodes, opposite[:, [2, 0, 1]]
+
+
+def _sparse_triangle_counts(csr, batch_wedges=TRIANGLE_BATCH_WEDGES):
+    """
+    Counts the triangles through every node with sparse matrix products over the oriented adjacency
+    matrix U (see _forward_graph), in row blocks of at most batch_wedges wedges.
+
+    ((U @ U) * U)[u, w] counts the triangles whose lowest-ranked node is u and highest-ranked node is w,
+    giving the first and last corner of every triangle; ((U.T @ U) * U)[v, w] counts those whose
+    middle node is v.
+
+    Returns:
+        numpy.ndarray: Number of triangles through every node id.
+    """
+    n = csr.number_of_nodes
+    indptr, heads, _, _ = _forward_graph(csr)
+    tails = np.repeat(np.arange(n, dtype=np.int64), np.diff(indptr))
+    out_degree = np.diff(indptr)
+    oriented = sp.csr_matrix((np.ones(len(heads), dtype=np.int32), heads, indptr), shape=(n, n))
+    transposed = oriented.T.tocsr()
+
+    counts = np.zeros(n, dtype=np.int64)
+    # Wedges u -> v -> w starting at each row, then wedges with each row as middle node
+    first = np.bincount(tails, weights=out_degree[heads], minlength=n)
+    for lo, hi in row_blocks(first, batch_wedges):
+        block = oriented[lo:hi]
+        closing = (block @ oriented).multiply(block)
+        counts[lo:hi] += np.asarray(closing.sum(axis=1), dtype=np.int64).ravel()
+        counts += np.asarray(closing.sum(axis=0), dtype=np.int64).ravel()
+
+    middle = np.bincount(heads, weights=out_degree[tails], minlength=n)
+    for lo, hi in row_blocks(middle, batch_wedges):
+        block = (transposed[lo:hi] @ oriented).multiply(oriented[lo:hi])
+        counts[lo:hi] += np.asarray(block.sum(axis=1), dtype=np.int64).ravel()
+    return counts
+
+
+@traced
+def triangle_counts(G, method='forward'):
+    """
+    Counts the triangles through every node.
+
+    Args:
+        G (networkx.Graph or CSRGraph): Input graph.
+        method (str, optional): 'forward' for the forward enumeration of iter_triangles, or 'sparse'
+            for sparse matrix products over the oriented adjacency matrix (see _sparse_triangle_counts).
+            Defaults to 'forward'.
+
+    Returns:
+        tuple: (per_node, total) where per_node maps nodes to their number of triangles, as
+               nx.triangles does, and total is the number of triangles of the graph.
+    """
+    csr = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+    n = csr.number_of_nodes
+
+    if method == 'sparse':
+        counts = _sparse_triangle_counts(csr)
+    elif method == 'forward':
+        counts = np.zeros(n, dtype=np.int64)
+        for nodes, _ in iter_triangles(csr):
+            counts += np.bincount(nodes.ravel(), minlength=n)
+    else:
+        raise ValueError(f"Unknown method '{method}', expected 'forward' or 'sparse'")
+
+    total = int(counts.sum() // 3)
+    count('triangles', total)
+    return dict(zip(csr.ids.tolist(), counts.tolist())), total
+
+
+@traced
+def top_k_weighted_triangles(G, k=10):
+    """
+    Streams the triangles of a graph into a bounded heap of the k heaviest ones.
+
+    The weight of a triangle is the sum of its three edge weights. Ties go to the lexicographically
+    first triangle in node order, as with nx.enumerate_all_cliques.
+
+    Args:
+        G (networkx.Graph or CSRGraph): Input graph with edge weights.
+        k (int, optional): Number of triangles to keep. Defaults to 10.
+
+    Returns:
+        tuple: (top, total) where top is a list of (nodes, weight_sum, weight1, weight2, weight3)
+               sorted by decreasing weight, nodes being [a, b, c] in graph order and weight1, weight2,
+               weight3 the weights of a-b, b-c and c-a, and total is the number of triangles.
+    """
+    csr = G if isinstance(G, CSRGraph) else CSRGraph.from_networkx(G)
+    heap = []
+    total = 0
+    for nodes, weights in iter_triangles(csr):
+        total += len(nodes)
+        weight_sum = weights.sum(axis=1)
+        # Only triangles at least as heavy as the k-th heaviest of the batch can enter the heap
+        if len(weight_sum) > k:
+            threshold = np.partition(weight_sum, len(weight_sum) - k)[len(weight_sum) - k]
+            if len(heap) == k:
+                threshold = max(threshold, heap[0][0])
+            candidates = np.flatnonzero(weight_sum >= threshold)
+        else:
+            candidates = np.arange(len(weight_sum))
+        for i in candidates.tolist():
+            # Negated ids: on equal weights the lexicographically first triangle ranks higher
+            entry = (weight_sum[i].item(), tuple((-nodes[i]).tolist()), nodes[i].tolist(), weights[i].tolist())
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
+
+    count('triangles', total)
+    ids = csr.ids
+    top = [(ids[nodes].tolist(), weight_sum, *edge_weights)
+           for weight_sum, _, nodes, edge_weights in sorted(heap, reverse=True)]
+    return top, total
@@ -1,39 +1,219 @@
 import os
+import time
+import hashlib
 import pandas as pd
 import networkx as nx
+from snapshot import (file_digest, snapshot_dir, read_snapshot, write_snapshot,
+                      NO_LABEL, HAS_LABEL, MISSING_LABEL)
+from instrumentation import traced
 
-def load_graph_from_dataset():
+# Automatically find the 'dataset' folder in the root of the current directory
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_DIR = os.path.join(ROOT_DIR, 'dataset')
+
+# Column layout and dtypes of the node and edge CSV files
+NODE_DTYPES = {'Id': 'string', 'Label': 'string'}
+EDGE_DTYPES = {'Source': 'string', 'Target': 'string', 'Weight': 'int64'}
+
+
+@traced(category='io')
+def read_dataset_frames(nodes_path, edges_path, weight_dtype='int64'):
     """
-    Loads a graph from the 'got-nodes.csv' and 'got-edges.csv' files in the dataset folder.
+    Reads the nodes and edges CSV files, keeping only the needed columns with explicit dtypes.
+
+    Returns:
+        tuple: The nodes DataFrame ('Id', 'Label') and the edges DataFrame ('Source', 'Target', 'Weight').
+    """
+    nodes_df = pd.read_csv(nodes_path, usecols=list(NODE_DTYPES), dtype=NODE_DTYPES)
+    edges_df = pd.read_csv(edges_path, usecols=list(EDGE_DTYPES),
+                           dtype={**EDGE_DTYPES, 'Weight': weight_dtype})
+    return nodes_df, edges_df
+
+
+@traced(category='io')
+def graph_from_frames(nodes_df, edges_df):
+    """
+    Builds a graph from the nodes and edges DataFrames with one bulk insertion each.
+
     Returns:
         G (networkx.Graph): A NetworkX graph with nodes and weighted edges.
     """
-    # Automatically find the 'dataset' folder in the root of the current directory
-    root_dir = os.path.dirname(os.path.abspath(__file__))
-    dataset_dir = os.path.join(root_dir, 'dataset')
+    # Create a NetworkX graph
+    G = nx.Graph()
 
-    # Define the paths to the CSV files in the 'dataset' folder
-    nodes_path = os.path.join(dataset_dir, 'got-nodes.csv')
-    edges_path = os.path.join(dataset_dir, 'got-edges.csv')
+    # Add nodes with attributes (Id and Label)
+    ids = nodes_df['Id'].astype(object).tolist()
+    labels = nodes_df['Label'].astype(object).where(nodes_df['Label'].notna(), None).tolist()
+    G.add_nodes_from((node, {'label': label}) for node, label in zip(ids, labels))
+
+    # Add edges with weights
+    G.add_weighted_edges_from(zip(edges_df['Source'].astype(object).tolist(),
+                                  edges_df['Target'].astype(object).tolist(),
+                                  edges_df['Weight'].tolist()))
+    return G
+
+
+@traced(category='io')
+def load_graph_bulk(nodes_path=None, edges_path=None, weight_dtype='int64', report=True):
+    """
+    Loads a graph from a nodes CSV and an edges CSV, inserting nodes and weighted edges in bulk.
+
+    Only the 'Id', 'Label', 'Source', 'Target' and 'Weight' columns are read, with explicit dtypes,
+    and the graph is filled with a single add_nodes_from / add_weighted_edges_from call each.
+
+    Args:
+        nodes_path (str, optional): Path to the nodes CSV. Defaults to 'dataset/got-nodes.csv'.
+        edges_path (str, optional): Path to the edges CSV. Defaults to 'dataset/got-edges.csv'.
+        weight_dtype (str, optional): dtype of the 'Weight' column. Defaults to 'int64'.
+        report (bool, optional): Whether to print the load throughput. Defaults to True.
+
+    Returns:
+        G (networkx.Graph): A NetworkX graph with nodes and weighted edges, or None if a file is missing.
+    """
+    nodes_path = nodes_path or os.path.join(DATASET_DIR, 'got-nodes.csv')
+    edges_path = edges_path or os.path.join(DATASET_DIR, 'got-edges.csv')
 
     # Check if the paths exist
     if not os.path.exists(nodes_path) or not os.path.exists(edges_path):
         print(f"Error: One or both of the files {nodes_path} and {edges_path} do not exist.")
         return None  # If files are missing, return None
 
-    # Load the datasets
-    nodes_df = pd.read_csv(nodes_path)
-    edges_df = pd.read_csv(edges_path)
+    start = time.perf_counter()
+    nodes_df, edges_df = read_dataset_frames(nodes_path, edges_path, weight_dtype)
+    G = graph_from_frames(nodes_df, edges_df)
+
+    elapsed = time.perf_counter() - start
+    G.graph['dataset'] = (os.path.abspath(nodes_path), os.path.abspath(edges_path))
+    if report:
+        rate = len(edges_df) / elapsed if elapsed > 0 else float('inf')
+        print(f"Loaded {len(nodes_df)} nodes and {len(edges_df)} edges in {elapsed:.3f}s "
+              f"({rate:,.0f} edges/s)")
+
+    return G
+
+
+@traced(category='io')
+def graph_from_snapshot(snapshot):
+    """
+    Rebuilds a NetworkX graph from the arrays of a graph snapshot.
+
+    Args:
+        snapshot (dict): The arrays returned by snapshot.read_snapshot.
+
+    Returns:
+        G (networkx.Graph): A NetworkX graph with nodes and weighted edges.
+    """
+    ids = snapshot['ids'].tolist()
+    labels = snapshot['labels'].tolist()
+    label_state = snapshot['label_state'].tolist()
+    attributes = {HAS_LABEL: lambda label: {'label': label},
+                  MISSING_LABEL: lambda label: {'label': None},
+                  NO_LABEL: lambda label: {}}
 
-    # Create a NetworkX graph
     G = nx.Graph()
+    G.add_nodes_from((node, attributes[state](label)) for node, label, state in zip(ids, labels, label_state))
 
-    # Add nodes with attributes (Id and Label)
-    for _, row in nodes_df.iterrows():
-        G.add_node(row['Id'], label=row['Label'])
+    edges = snapshot['edges']
+    G.add_weighted_edges_from(zip((ids[i] for i in edges[:, 0].tolist()),
+                                  (ids[i] for i in edges[:, 1].tolist()),
+                                  snapshot['weights'].tolist()))
+    return G
 
-    # Add edges with weights
-    for _, row in edges_df.iterrows():
-        G.add_edge(row['Source'], row['Target'], weight=row['Weight'])
 
+def save_graph_snapshot(G, edges_df, path, digests):
+    """
+    Writes the binary snapshot of a graph built from an edges DataFrame.
+    Edges are stored in file order so that the rebuilt graph matches the loaded one exactly.
+
+    Args:
+        G (networkx.Graph): The graph built from the CSV files.
+        edges_df (pandas.DataFrame): The edges DataFrame the graph was built from.
+        path (str): Snapshot folder, as returned by snapshot.snapshot_dir.
+        digests (dict): Content digests of the CSV files.
+    """
+    ids = list(G.nodes())
+    labels = []
+    for _, data in G.nodes(data=True):
+        if 'label' not in data:
+            labels.append(('', NO_LABEL))
+        elif data['label'] is None:
+            labels.append(('', MISSING_LABEL))
+        else:
+            labels.append((data['label'], HAS_LABEL))
+
+    index = pd.Index(ids)
+    write_snapshot(path, digests, ids, labels,
+                   index.get_indexer(edges_df['Source']),
+                   index.get_indexer(edges_df['Target']),
+                   edges_df['Weight'].to_numpy())
+
+
+@traced(category='io')
+def load_graph_from_dataset(nodes_path=None, edges_path=None, use_cache=True):
+    """
+    Loads a graph from the 'got-nodes.csv' and 'got-edges.csv' files in the dataset folder.
+
+    The first load writes a binary snapshot of the graph next to the dataset; later loads
+    memory-map it as long as the content of both CSV files is unchanged, and rebuild it otherwise.
+
+    Args:
+        nodes_path (str, optional): Path to the nodes CSV. Defaults to 'dataset/got-nodes.csv'.
+        edges_path (str, optional): Path to the edges CSV. Defaults to 'dataset/got-edges.csv'.
+        use_cache (bool, optional): Whether to read and write the snapshot cache. Defaults to True.
+
+    Returns:
+        G (networkx.Graph): A NetworkX graph with nodes and weighted edges.
+    """
+    nodes_path = nodes_path or os.path.join(DATASET_DIR, 'got-nodes.csv')
+    edges_path = edges_path or os.path.join(DATASET_DIR, 'got-edges.csv')
+
+    if not use_cache or not os.path.exists(nodes_path) or not os.path.exists(edges_path):
+        return load_graph_bulk(nodes_path, edges_path, report=False)
+
+    digests = {'nodes': file_digest(nodes_path), 'edges': file_digest(edges_path),
+               'weight_dtype': EDGE_DTYPES['Weight']}
+    path = snapshot_dir(nodes_path, edges_path)
+
+    snapshot = read_snapshot(path, digests)
+    if snapshot is not None:
+        G = graph_from_snapshot(snapshot)
+        G.graph['dataset'] = (os.path.abspath(nodes_path), os.path.abspath(edges_path))
+        return G
+
+    nodes_df, edges_df = read_dataset_frames(nodes_path, edges_path)
+    G = graph_from_frames(nodes_df, edges_df)
+    # Lets memoized results of a previous version of the dataset be dropped (see memo.py)
+    G.graph['dataset'] = (os.path.abspath(nodes_path), os.path.abspath(edges_path))
+    try:
+        save_graph_snapshot(G, edges_df, path, digests)
+    except OSError as e:
+        # A read-only dataset folder only costs the cache, not the load
+        print(f"Warning: could not write the graph snapshot to {path}: {e}")
     return G
+
+
+def graph_fingerprint(G, weight='weight'):
+    """
+    Computes a content hash of a graph that does not depend on node or edge insertion order.
+
+    Args:
+        G (networkx.Graph): The graph object.
+        weight (str, optional): Edge attribute included in the hash, or None to hash the structure only.
+            Defaults to 'weight'.
+
+    Returns:
+        str: Hex SHA-256 digest of the sorted node list and the sorted (u, v, weight) edge list.
+    """
+    digest = hashlib.sha256()
+    for node in sorted(map(repr, G.nodes())):
+        digest.update(node.encode())
+        digest.update(b'\0')
+    digest.update(b'\1')
+    edges = []
+    for u, v, w in G.edges(data=weight, default=None) if weight else ((u, v, None) for u, v in G.edges()):
+        u, v = sorted((repr(u), repr(v)))
+        edges.append(f"{u}\0{v}\0{w!r}")
+    for edge in sorted(edges):
+        digest.update(edge.encode())
+        digest.update(b'\1')
+    return digest.hexdigest()